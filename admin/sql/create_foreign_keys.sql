@@ -90,6 +90,18 @@ ALTER TABLE hide_user_timeline_event
     REFERENCES "user" (id)
     ON DELETE CASCADE;
 
+ALTER TABLE user_feed_event
+    ADD CONSTRAINT user_feed_event_user_id_foreign_key
+    FOREIGN KEY (user_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
+ALTER TABLE user_feed_event
+    ADD CONSTRAINT user_feed_event_author_id_foreign_key
+    FOREIGN KEY (author_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
 ALTER TABLE recording_feedback
     ADD CONSTRAINT recording_feedback_user_id_foreign_key
     FOREIGN KEY (user_id)
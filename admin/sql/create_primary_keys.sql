@@ -14,6 +14,8 @@ ALTER TABLE user_timeline_event ADD CONSTRAINT user_timeline_event_pkey PRIMARY
 
 ALTER TABLE hide_user_timeline_event ADD CONSTRAINT hide_user_timeline_event_pkey PRIMARY KEY (id);
 
+ALTER TABLE user_feed_event ADD CONSTRAINT user_feed_event_pkey PRIMARY KEY (user_id, event_type, author_id, event_id);
+
 ALTER TABLE recording_feedback ADD CONSTRAINT recording_feedback_pkey PRIMARY KEY (id);
 
 ALTER TABLE missing_musicbrainz_data ADD CONSTRAINT missing_mb_data_pkey PRIMARY KEY (id);
@@ -109,6 +109,14 @@ CREATE TABLE hide_user_timeline_event (
     created      TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
 );
 
+CREATE TABLE user_feed_event (
+    user_id      INTEGER NOT NULL, -- FK to "user".id, the user in whose feed the event is shown
+    author_id    INTEGER NOT NULL, -- FK to "user".id, the user who created the event
+    event_type   user_feed_event_type_enum NOT NULL,
+    event_id     INTEGER NOT NULL, -- Row ID of the timeline event or pin, "user".id of the followed user for follows
+    created      TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 CREATE TABLE spotify_auth (
   user_id                   INTEGER NOT NULL, -- PK and FK to user.id
   user_token                VARCHAR NOT NULL,
@@ -10,6 +10,8 @@ CREATE TYPE user_timeline_event_type_enum AS ENUM('recording_recommendation', 'n
 
 CREATE TYPE hide_user_timeline_event_type_enum AS ENUM('recording_recommendation', 'recording_pin');
 
+CREATE TYPE user_feed_event_type_enum AS ENUM('follow', 'recording_recommendation', 'notification', 'critiquebrainz_review', 'personal_recording_recommendation', 'recording_pin');
+
 CREATE TYPE external_service_oauth_type AS ENUM ('spotify', 'youtube', 'critiquebrainz', 'lastfm', 'librefm', 'musicbrainz', 'soundcloud', 'apple', 'musicbrainz-prod', 'musicbrainz-beta', 'musicbrainz-test');
 
 CREATE TYPE stats_range_type AS ENUM ('week', 'month', 'quarter', 'half_yearly', 'year', 'all_time',
@@ -0,0 +1,72 @@
+CREATE TYPE user_feed_event_type_enum AS ENUM('follow', 'recording_recommendation', 'notification', 'critiquebrainz_review', 'personal_recording_recommendation', 'recording_pin');
+
+BEGIN;
+
+CREATE TABLE user_feed_event (
+    user_id      INTEGER NOT NULL, -- FK to "user".id, the user in whose feed the event is shown
+    author_id    INTEGER NOT NULL, -- FK to "user".id, the user who created the event
+    event_type   user_feed_event_type_enum NOT NULL,
+    event_id     INTEGER NOT NULL, -- Row ID of the timeline event or pin, "user".id of the followed user for follows
+    created      TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- follows, recording recommendations, reviews and pins are shown to their author and the author's followers
+WITH followed_events (author_id, event_type, event_id, created) AS (
+    SELECT user_id, CAST(CAST(event_type AS TEXT) AS user_feed_event_type_enum), id, created
+      FROM user_timeline_event
+     WHERE event_type IN ('recording_recommendation', 'critiquebrainz_review')
+ UNION ALL
+    SELECT user_id, 'recording_pin', id, created
+      FROM pinned_recording
+ UNION ALL
+    SELECT user_0, 'follow', user_1, created
+      FROM user_relationship
+     WHERE relationship_type = 'follow'
+)
+INSERT INTO user_feed_event (user_id, author_id, event_type, event_id, created)
+     SELECT author_id, author_id, event_type, event_id, created
+       FROM followed_events
+      UNION
+     SELECT ur.user_0, author_id, event_type, event_id, fe.created
+       FROM followed_events fe
+       JOIN user_relationship ur
+         ON ur.user_1 = fe.author_id
+        AND ur.relationship_type = 'follow';
+
+-- notifications are only shown to the user they are posted for
+INSERT INTO user_feed_event (user_id, author_id, event_type, event_id, created)
+     SELECT user_id, user_id, 'notification', id, created
+       FROM user_timeline_event
+      WHERE event_type = 'notification';
+
+-- personal recommendations are only shown to the recommender and the recommendees
+INSERT INTO user_feed_event (user_id, author_id, event_type, event_id, created)
+     SELECT DISTINCT recipient, user_id, 'personal_recording_recommendation', id, created
+       FROM user_timeline_event
+ CROSS JOIN LATERAL (
+                SELECT user_id AS recipient
+             UNION ALL
+                SELECT value::int
+                  FROM jsonb_array_elements_text(metadata->'users')
+            ) recipients
+      WHERE event_type = 'personal_recording_recommendation'
+        AND recipient IN (SELECT id FROM "user");
+
+ALTER TABLE user_feed_event ADD CONSTRAINT user_feed_event_pkey PRIMARY KEY (user_id, event_type, author_id, event_id);
+
+ALTER TABLE user_feed_event
+    ADD CONSTRAINT user_feed_event_user_id_foreign_key
+    FOREIGN KEY (user_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
+ALTER TABLE user_feed_event
+    ADD CONSTRAINT user_feed_event_author_id_foreign_key
+    FOREIGN KEY (author_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
+CREATE INDEX user_id_created_ndx_user_feed_event ON user_feed_event (user_id, created DESC);
+CREATE INDEX event_type_event_id_ndx_user_feed_event ON user_feed_event (event_type, event_id);
+
+COMMIT;
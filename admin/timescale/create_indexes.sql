@@ -3,6 +3,8 @@ BEGIN;
 CREATE INDEX listened_at_user_id_ndx_listen ON listen (listened_at DESC, user_id);
 CREATE INDEX created_ndx_listen ON listen (created);
 CREATE UNIQUE INDEX listened_at_user_id_recording_msid_ndx_listen ON listen (listened_at DESC, user_id, recording_msid);
+-- used to seek directly to a page of a user's listens in fetch_listens_page
+CREATE INDEX user_id_listened_at_recording_msid_ndx_listen ON listen (user_id, listened_at DESC, recording_msid DESC);
 
 CREATE INDEX recording_msid_ndx_listen on listen (recording_msid);
 
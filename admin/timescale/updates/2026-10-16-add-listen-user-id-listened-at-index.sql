@@ -0,0 +1,5 @@
+-- used to seek directly to a page of a user's listens in fetch_listens_page
+-- Timescale doesn't support CREATE INDEX CONCURRENTLY, transaction_per_chunk creates the index one chunk at a
+-- time in its own transaction so that inserts and selects keep working on the table while it's running.
+-- This operation doesn't support being run inside a transaction.
+CREATE INDEX user_id_listened_at_recording_msid_ndx_listen ON listen (user_id, listened_at DESC, recording_msid DESC) WITH (timescaledb.transaction_per_chunk);
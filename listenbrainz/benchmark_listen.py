@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+""" Memory and CPU benchmark of the slotted, lazily converted Listen against the previous dict based class.
+
+Creates the given number of listens from submission json, as the timescale writer does, and then
+serializes them again with to_json, reporting the time taken and the memory held by the listens.
+
+    python3 -m listenbrainz.benchmark_listen --count 1000000
+"""
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+import click
+
+from listenbrainz.listen import Listen, flatten_dict
+
+
+class DictListen(object):
+    """ The Listen class before __slots__ and lazy conversions, kept for comparison. """
+
+    def __init__(self, user_id=None, user_name=None, timestamp=None, recording_msid=None, inserted_timestamp=None, data=None):
+        self.user_id = user_id
+        self.user_name = user_name
+
+        if isinstance(timestamp, int) or isinstance(timestamp, float):
+            self.ts_since_epoch = int(timestamp)
+            self.timestamp = datetime.utcfromtimestamp(self.ts_since_epoch)
+        else:
+            if timestamp:
+                self.timestamp = timestamp
+                self.ts_since_epoch = int(self.timestamp.timestamp())
+            else:
+                self.timestamp = None
+                self.ts_since_epoch = None
+
+        self.recording_msid = recording_msid
+        self.inserted_timestamp = inserted_timestamp
+        if data is None:
+            self.data = {'additional_info': {}}
+        else:
+            try:
+                flattened_data = flatten_dict(data['additional_info'])
+                data['additional_info'] = flattened_data
+            except TypeError:
+                pass
+
+            self.data = data
+
+    @classmethod
+    def from_json(cls, j):
+        j['listened_at'] = datetime.utcfromtimestamp(float(j['listened_at']))
+        return cls(
+            user_id=j.get('user_id'),
+            user_name=j.get('user_name'),
+            timestamp=j['listened_at'],
+            recording_msid=j.get('recording_msid'),
+            data=j.get('track_metadata')
+        )
+
+    def to_json(self):
+        return {
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'timestamp': int(self.timestamp.timestamp()) if self.timestamp else None,
+            'track_metadata': self.data,
+            'recording_msid': self.recording_msid
+        }
+
+
+def generate_json(count: int) -> list[dict]:
+    msid = str(uuid.uuid4())
+    return [
+        {
+            "user_id": i % 10000,
+            "user_name": "benchmark",
+            "listened_at": 1400000000 + i,
+            "recording_msid": msid,
+            "track_metadata": {
+                "artist_name": "Frank Ocean",
+                "track_name": "Pretty Sweet",
+                "release_name": "Blond",
+                "additional_info": {"track_number": "5", "duration_ms": 158000, "submission_client": "benchmark"},
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def run(cls, count: int):
+    data = generate_json(count)
+    gc.collect()
+
+    tracemalloc.start()
+    start = time.monotonic()
+    listens = [cls.from_json(j) for j in data]
+    created = time.monotonic() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.monotonic()
+    for listen in listens:
+        listen.to_json()
+    serialized = time.monotonic() - start
+
+    print(f"{cls.__name__:>10} {created:>12.3f} {serialized:>12.3f} {memory / 1024 / 1024:>12.1f}")
+
+
+@click.command()
+@click.option("--count", default=1000000, help="number of listens to create")
+def main(count):
+    print(f"{'class':>10} {'create (s)':>12} {'to_json (s)':>12} {'memory (MB)':>12}")
+    for cls in [DictListen, Listen]:
+        run(cls, count)
+
+
+if __name__ == "__main__":
+    main()
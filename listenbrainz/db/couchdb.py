@@ -1,6 +1,10 @@
 import json
 import re
-from typing import BinaryIO
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, Optional
 
 import requests
 import orjson
@@ -14,11 +18,33 @@ DATABASE_NAME_PATTERN = re.compile(r"([a-zA-Z]+)_(\w+)_(\d{8})")
 
 DATABASE_LOCK_FILE = "LOCK"
 
+# how long to keep the list of databases for a prefix in memory. creating or deleting a database through this
+# module clears the affected listings immediately, other processes pick up the change after this many seconds.
+DATABASES_CACHE_EXPIRY = 60
+
+# the number of keep-alive connections to couchdb to pool for reading data
+SESSION_POOL_SIZE = 20
+
+# maximum size of the serialized documents sent in one _bulk_docs request by the bulk writer
+BULK_WRITER_MAX_BATCH_BYTES = 4 * 1024 * 1024
+# number of _bulk_docs requests the bulk writer keeps in flight at once
+BULK_WRITER_MAX_IN_FLIGHT = 4
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# the number of items of the data list stored in each page of a paged document, the same as the default number
+# of items the stats endpoints return so that a default request reads a single document
+DATA_PAGE_SIZE = 25
+
 _user = None
 _admin_key = None
 _host = None
 _port = None
 
+_session = None
+_databases_cache: dict[str, tuple[float, list[str]]] = {}
+_databases_cache_lock = threading.Lock()
+
 
 def init(user, password, host, port):
     """
@@ -30,12 +56,18 @@ def init(user, password, host, port):
         host: couchdb service host
         port: couchdb service port
     """
-    global _user, _admin_key, _host, _port
+    global _user, _admin_key, _host, _port, _session
     _user = user
     _admin_key = password
     _host = host
     _port = port
 
+    _session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=SESSION_POOL_SIZE, pool_maxsize=SESSION_POOL_SIZE)
+    _session.mount("http://", adapter)
+    _session.mount("https://", adapter)
+    clear_databases_cache()
+
 
 def get_base_url():
     return f"http://{_user}:{_admin_key}@{_host}:{_port}"
@@ -53,6 +85,7 @@ def create_database(database: str):
     databases_url = f"{get_base_url()}/{database}"
     response = requests.put(databases_url)
     response.raise_for_status()
+    clear_databases_cache(database)
 
 
 def list_databases(prefix: str) -> list[str]:
@@ -66,7 +99,7 @@ def list_databases(prefix: str) -> list[str]:
     with the given prefix.
     """
     databases_url = f"{get_base_url()}/_all_dbs"
-    response = requests.get(databases_url)
+    response = _session.get(databases_url)
     response.raise_for_status()
     all_databases = response.json()
 
@@ -75,6 +108,30 @@ def list_databases(prefix: str) -> list[str]:
     return databases
 
 
+def get_cached_databases(prefix: str) -> list[str]:
+    """ Same as :func:`list_databases` but the list is kept in memory for DATABASES_CACHE_EXPIRY seconds. """
+    with _databases_cache_lock:
+        cached = _databases_cache.get(prefix)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    databases = list_databases(prefix)
+    with _databases_cache_lock:
+        _databases_cache[prefix] = (time.monotonic() + DATABASES_CACHE_EXPIRY, databases)
+    return databases
+
+
+def clear_databases_cache(database: Optional[str] = None):
+    """ Remove the cached listings of the prefixes matching the given database, or all listings if None. """
+    with _databases_cache_lock:
+        if database is None:
+            _databases_cache.clear()
+            return
+        for prefix in list(_databases_cache.keys()):
+            if database.startswith(prefix):
+                del _databases_cache[prefix]
+
+
 def delete_database(prefix: str):
     """ Delete all but the latest database whose name starts with the given prefix.
 
@@ -100,83 +157,267 @@ def delete_database(prefix: str):
         else:
             response = requests.delete(f"{get_base_url()}/{database}")
             response.raise_for_status()
+            clear_databases_cache(database)
             deleted.append(database)
 
     return deleted, retained
 
 
-def fetch_data(prefix: str, user_id: int):
+def split_into_pages(doc: dict, page_size: int = DATA_PAGE_SIZE) -> list[dict]:
+    """ Split the data list of a document into pages stored as separate documents, so that reading a slice of
+    the data only transfers the pages it overlaps.
+
+    The first page is kept in the document itself along with the other fields, the following pages are stored
+    in documents with the id ``<id>:<page number>``. Documents with no more than page_size items are returned
+    unchanged. :func:`fetch_data` and :func:`dump_database` put the pages back together.
+
+    Returns:
+        the documents to insert in place of the given document
+    """
+    data = doc["data"]
+    if len(data) <= page_size:
+        return [doc]
+
+    pages = [data[start:start + page_size] for start in range(0, len(data), page_size)]
+    first_page = {**doc, "data": pages[0], "page_size": page_size, "pages": len(pages)}
+    other_pages = [{"_id": f"{doc['_id']}:{number}", "data": page} for number, page in enumerate(pages[1:], 1)]
+    return [first_page, *other_pages]
+
+
+def is_page_id(doc_id: str) -> bool:
+    """ Whether the document id is the id of a page created by :func:`split_into_pages` """
+    return ":" in doc_id
+
+
+def _load_pages(session: requests.Session, database_url: str, doc: dict,
+                offset: Optional[int] = None, count: Optional[int] = None):
+    """ Replace the data of a paged document with the data of its pages overlapping data[offset:offset + count],
+    or with the data of all its pages if offset or count is None. The pages are fetched in one request. """
+    page_size = doc.pop("page_size")
+    pages = doc.pop("pages")
+    if offset is None or count is None:
+        first, end = 0, pages
+    else:
+        first = min(offset // page_size, pages)
+        end = min((offset + count + page_size - 1) // page_size, pages)
+
+    data = list(doc["data"]) if first == 0 and end > 0 else []
+    keys = [f"{doc['_id']}:{number}" for number in range(max(first, 1), end)]
+    if keys:
+        response = session.post(
+            f"{database_url}/_all_docs",
+            params={"include_docs": "true"},
+            data=orjson.dumps({"keys": keys}),
+            headers=JSON_HEADERS
+        )
+        response.raise_for_status()
+        for row in orjson.loads(response.content)["rows"]:
+            if row.get("doc"):
+                data.extend(row["doc"]["data"])
+
+    if offset is not None and count is not None:
+        start = offset - first * page_size
+        data = data[start:start + count]
+    doc["data"] = data
+
+
+def fetch_data(prefix: str, user_id: int, offset: Optional[int] = None, count: Optional[int] = None):
     """ Retrieve data from couchdb for given stat type and user.
 
     For each stat type, a database is created daily. We do not have a way to do this atomically so the latest
     database for a type may be incomplete when we query it. So, query all databases for given stat 1 by 1 in
-    descending order of their creation until user data is found.
+    descending order of their creation until user data is found. Outside of the time the stats are being
+    generated only one database exists for a stat type, so this usually takes a single request.
+
+    The list of databases is cached in memory, if a database has been deleted in the meantime the list is
+    refreshed and the lookup is retried.
+
+    If both offset and count are specified, only data[offset:offset + count] of the document is returned. For
+    documents split into pages by :func:`split_into_pages` only the pages overlapping the slice are transferred,
+    other documents are transferred whole and sliced before the data is validated by callers.
 
     Args:
          prefix: the string to match database names with
          user_id: the user to retrieve data for
+         offset: number of items of the data list to skip
+         count: number of items of the data list to return
     """
-    databases = list_databases(prefix)
     base_url = get_base_url()
+    sliced = offset is not None and count is not None
+
+    # retry once with a fresh list of databases if a cached database has been deleted
+    for _ in range(2):
+        databases = get_cached_databases(prefix)
+        stale = False
+        for database in databases:
+            response = _session.get(f"{base_url}/{database}/{user_id}")
+            if response.status_code == 404:
+                if response.json().get("reason") == "Database does not exist.":
+                    clear_databases_cache(database)
+                    stale = True
+                    break
+                continue
+            response.raise_for_status()
 
-    for database in databases:
-        document_url = f"{base_url}/{database}/{user_id}"
-        response = requests.get(document_url)
-        if response.status_code == 404:
-            continue
-        response.raise_for_status()
-        return response.json()
+            doc = orjson.loads(response.content)
+            if "pages" in doc:
+                _load_pages(_session, f"{base_url}/{database}", doc, offset, count)
+            elif sliced and isinstance(doc.get("data"), list):
+                doc["data"] = doc["data"][offset:offset + count]
+            return doc
+
+        if not stale:
+            break
 
     return None
 
 
-def insert_data(database: str, data: list[dict]):
-    """ Insert the given data into the specified database. """
-    with start_span(op="serializing", description="serialize data to json"):
-        docs = orjson.dumps({"docs": data})
+class BulkWriter:
+    """ Stream documents into a couchdb database using pipelined _bulk_docs requests.
 
-    with start_span(op="http", description="insert docs in couchdb using api"):
-        couchdb_url = f"{get_base_url()}/{database}/_bulk_docs"
-        response = requests.post(couchdb_url, data=docs, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
+    Documents are serialized as they are added and grouped into batches of at most max_batch_bytes. Up to
+    max_in_flight batches are posted concurrently over the pooled session, adding a document blocks while
+    that many batches are in flight so that memory use stays bounded. Documents rejected because of a
+    conflict are updated with their latest revisions in bulk once their batch completes.
 
-    with start_span(op="deserializing", description="checking response for conflicts"):
-        conflict_doc_ids = []
-        for doc_status in response.json():
-            if doc_status.get("error") == "conflict":
-                conflict_doc_ids.append(doc_status["id"])
+    All pending batches are written when the writer is used as a context manager and the block exits:
 
-        if not conflict_doc_ids:
-            return
+        with BulkWriter(database) as writer:
+            for doc in docs:
+                writer.add(doc)
+        print(writer.metrics)
 
-        conflict_docs = orjson.dumps({"docs": [{"id": doc_id} for doc_id in conflict_doc_ids]})
+    Args:
+        database: the database to write the documents to
+        max_batch_bytes: the maximum size of the documents in one _bulk_docs request
+        max_in_flight: the maximum number of concurrent _bulk_docs requests
+    """
 
-    with start_span(op="http", description="retrieving conflicts from database"):
-        response = requests.post(
-            f"{get_base_url()}/{database}/_bulk_get",
-            data=conflict_docs,
-            headers={"Content-Type": "application/json"}
-        )
+    def __init__(self, database: str, max_batch_bytes: int = BULK_WRITER_MAX_BATCH_BYTES,
+                 max_in_flight: int = BULK_WRITER_MAX_IN_FLIGHT):
+        self.database_url = f"{get_base_url()}/{database}"
+        self.max_batch_bytes = max_batch_bytes
+        self.max_in_flight = max_in_flight
+
+        self._batch = []
+        self._batch_bytes = 0
+        self._in_flight = deque()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._end = None
+        self.documents = 0
+        self.bytes = 0
+        self.requests = 0
+        self.conflicts = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def add(self, doc: dict):
+        """ Queue the document for writing, blocks if too many batches are in flight. """
+        serialized = orjson.dumps(doc)
+        if self._batch and self._batch_bytes + len(serialized) > self.max_batch_bytes:
+            self._submit_batch()
+        self._batch.append((doc["_id"], serialized))
+        self._batch_bytes += len(serialized)
+
+    def flush(self):
+        """ Write the pending documents and wait for all requests to complete. """
+        if self._batch:
+            self._submit_batch()
+        while self._in_flight:
+            self._in_flight.popleft().result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._end = time.monotonic()
+
+    @property
+    def metrics(self) -> dict:
+        """ Throughput metrics of the documents written so far """
+        elapsed = (self._end or time.monotonic()) - self._start
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "bytes": self.bytes,
+                "requests": self.requests,
+                "conflicts": self.conflicts,
+                "seconds": elapsed,
+                "documents_per_second": self.documents / elapsed if elapsed else 0,
+            }
+
+    def _submit_batch(self):
+        # wait for the oldest batch to complete before submitting another one, this bounds the memory used
+        # and propagates any error from the writes.
+        while len(self._in_flight) >= self.max_in_flight:
+            self._in_flight.popleft().result()
+
+        batch = self._batch
+        self._batch = []
+        self._batch_bytes = 0
+        self._in_flight.append(self._executor.submit(self._write_batch, batch))
+
+    def _post_docs(self, docs: list[bytes]) -> list[dict]:
+        body = b'{"docs":[' + b",".join(docs) + b"]}"
+        response = _session.post(f"{self.database_url}/_bulk_docs", data=body, headers=JSON_HEADERS)
         response.raise_for_status()
+        with self._lock:
+            self.requests += 1
+            self.bytes += len(body)
+        return orjson.loads(response.content)
+
+    def _write_batch(self, batch: list[tuple[str, bytes]]):
+        with start_span(op="http", description="insert docs in couchdb using api"):
+            statuses = self._post_docs([serialized for _, serialized in batch])
+
+        conflict_doc_ids = {status["id"] for status in statuses if status.get("error") == "conflict"}
+        if conflict_doc_ids:
+            self._resolve_conflicts(batch, conflict_doc_ids)
+
+        with self._lock:
+            self.documents += len(batch)
+            self.conflicts += len(conflict_doc_ids)
+
+    def _resolve_conflicts(self, batch: list[tuple[str, bytes]], conflict_doc_ids: set[str]):
+        """ Retrieve the latest revisions of the conflicting documents in bulk and update them. """
+        with start_span(op="http", description="retrieving conflicts from database"):
+            conflict_docs = orjson.dumps({"docs": [{"id": doc_id} for doc_id in conflict_doc_ids]})
+            response = _session.post(f"{self.database_url}/_bulk_get", data=conflict_docs, headers=JSON_HEADERS)
+            response.raise_for_status()
 
-    with start_span(op="deserializing", description="processing conflicting revisions"):
         revs_map = {}
-        for result in response.json()["results"]:
+        for result in orjson.loads(response.content)["results"]:
             existing_doc = result["docs"][0]["ok"]
             revs_map[existing_doc["_id"]] = existing_doc["_rev"]
 
         docs_to_update = []
-        for doc in data:
-            if doc["_id"] in revs_map:
-                doc["_rev"] = revs_map[doc["_id"]]
-            docs_to_update.append(doc)
+        for doc_id, serialized in batch:
+            if doc_id in conflict_doc_ids:
+                doc = orjson.loads(serialized)
+                doc["_rev"] = revs_map[doc_id]
+                docs_to_update.append(orjson.dumps(doc))
 
-    with start_span(op="serializing", description="serialize conflicting docs to update"):
-        docs_to_update = orjson.dumps({"docs": docs_to_update})
+        with start_span(op="http", description="retry updating conflicts in database"):
+            self._post_docs(docs_to_update)
 
-    with start_span(op="http", description="retry updating conflicts in database"):
-        response = requests.post(couchdb_url, data=docs_to_update, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
+
+def insert_data(database: str, data: Iterable[dict]) -> dict:
+    """ Insert the given data into the specified database and return the throughput metrics of the write. """
+    with BulkWriter(database) as writer:
+        for doc in data:
+            writer.add(doc)
+    return writer.metrics
 
 
 def delete_data(database: str, doc_id: int | str):
@@ -279,7 +520,12 @@ def dump_database(prefix: str, fp: BinaryIO):
                 })
                 rows = orjson.loads(response.content)["rows"]
                 for row in rows:
+                    # the following pages of a paged document are dumped along with its first page
+                    if row["id"].startswith("_design/") or is_page_id(row["id"]):
+                        continue
                     doc = row["doc"]
+                    if "pages" in doc:
+                        _load_pages(http, database_url, doc)
                     doc.pop("_id", None)
                     doc.pop("key", None)
                     doc.pop("_rev", None)
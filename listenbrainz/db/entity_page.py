@@ -0,0 +1,67 @@
+""" Cache of the assembled props of the artist and album pages.
+
+The props of an entity page combine the metadata cache with the popularity, similar artist and entity listener
+datasets. They are cached per entity mbid under a datasets version which is incremented whenever one of these
+datasets is rotated or updated, so that the pages show the new data as soon as it has been imported without having
+to find and delete the props of every entity. Props cached under an older version are never read again and expire.
+The metadata cache is updated independently of the datasets, hence the expiry.
+"""
+from typing import Optional
+
+from brainzutils import cache
+
+from listenbrainz.utils import cache_available
+
+ENTITY_PAGE_PROPS_CACHE_KEY_PREFIX = "entity_page_props."
+ENTITY_PAGE_PROPS_CACHE_EXPIRY = 24 * 60 * 60  # 1 day
+ENTITY_PAGE_DATASETS_VERSION_KEY = "entity_page_datasets_version"
+
+
+def _props_key(version: int, entity: str, mbid: str) -> str:
+    return f"{ENTITY_PAGE_PROPS_CACHE_KEY_PREFIX}{version}.{entity}.{mbid}"
+
+
+def get_datasets_version() -> Optional[int]:
+    """ Get the current version of the datasets the entity pages are built from.
+
+    The version should be read before loading the data of a page and the props cached under it, so that props
+    built from a dataset which is rotated in the meantime are cached under the outdated version.
+
+    Returns:
+        the version, or ``None`` if the cache is not available
+    """
+    if not cache_available():
+        return None
+    version = cache.get(ENTITY_PAGE_DATASETS_VERSION_KEY, decode=False)
+    return int(version) if version else 0
+
+
+def get_cached_props(version: Optional[int], entity: str, mbid: str) -> Optional[dict]:
+    """ Get the cached props of an entity page, serialized to JSON, along with the title of the page.
+
+    Args:
+        version: the datasets version returned by get_datasets_version
+        entity: the type of the page, artist or album
+        mbid: the mbid of the artist or release group
+
+    Returns:
+        a dict with the serialized props and the title, or ``None`` if they aren't cached for the given
+        datasets version
+    """
+    if version is None:
+        return None
+    return cache.get(_props_key(version, entity, mbid))
+
+
+def set_cached_props(version: Optional[int], entity: str, mbid: str, page: dict):
+    """ Cache the serialized props and the title of an entity page under the datasets version they were
+    loaded with. """
+    if version is None:
+        return
+    cache.set(_props_key(version, entity, mbid), page, expirein=ENTITY_PAGE_PROPS_CACHE_EXPIRY)
+
+
+def invalidate_cached_props():
+    """ Invalidate the cached props of all entity pages, called when a dataset they are built from changes. """
+    if cache_available():
+        cache.increment(ENTITY_PAGE_DATASETS_VERSION_KEY)
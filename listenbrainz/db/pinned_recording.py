@@ -1,8 +1,9 @@
 import sqlalchemy
-from datetime import datetime
 
 from listenbrainz import db
+from listenbrainz.db import user_feed as db_user_feed
 from listenbrainz.db.model.pinned_recording import PinnedRecording, WritablePinnedRecording
+from listenbrainz.db.model.user_timeline_event import UserTimelineEventType
 from typing import List, Iterable
 
 PINNED_REC_GET_COLUMNS = [
@@ -45,9 +46,11 @@ def pin(db_conn, pinned_recording: WritablePinnedRecording):
     result = db_conn.execute(sqlalchemy.text("""
         INSERT INTO pinned_recording (user_id, recording_msid, recording_mbid, blurb_content, pinned_until, created)
              VALUES (:user_id, :recording_msid, :recording_mbid, :blurb_content, :pinned_until, :created)
-          RETURNING (id)
+          RETURNING id, created
         """), args)
-    row_id = result.fetchone().id
+    row = result.fetchone()
+    row_id = row.id
+    db_user_feed.add_event(db_conn, pinned_recording.user_id, UserTimelineEventType.RECORDING_PIN, row_id, row.created)
     db_conn.commit()
 
     pinned_recording.row_id = row_id
@@ -99,6 +102,8 @@ def delete(db_conn, row_id: int, user_id: int):
         'user_id': user_id
         }
     )
+    if result.rowcount == 1:
+        db_user_feed.remove_event(db_conn, user_id, UserTimelineEventType.RECORDING_PIN, row_id)
     db_conn.commit()
     return result.rowcount == 1
 
@@ -187,36 +192,6 @@ def get_pins_for_user_following(db_conn, user_id: int, count: int, offset: int)
     return [PinnedRecording(**row) for row in result.mappings()]
 
 
-def get_pins_for_feed(db_conn, user_ids: Iterable[int], min_ts: int, max_ts: int, count: int) -> List[PinnedRecording]:
-    """ Gets a list of PinnedRecordings for specified users in descending order of their created date.
-
-    Args:
-        db_conn: database connection
-        user_ids: a list of user row IDs
-        min_ts: History before this timestamp will not be returned
-        max_ts: History after this timestamp will not be returned
-        count: Maximum amount of objects to be returned
-
-    Returns:
-        A list of PinnedRecording objects.
-    """
-    result = db_conn.execute(sqlalchemy.text("""
-        SELECT {columns}
-          FROM pinned_recording as pin
-         WHERE pin.user_id IN :user_ids
-           AND pin.created > :min_ts
-           AND pin.created < :max_ts
-      ORDER BY pin.created DESC
-         LIMIT :count
-    """.format(columns=','.join(PINNED_REC_GET_COLUMNS))), {
-        "user_ids": tuple(user_ids),
-        "min_ts": datetime.utcfromtimestamp(min_ts),
-        "max_ts": datetime.utcfromtimestamp(max_ts),
-        "count": count,
-    })
-    return [PinnedRecording(**row) for row in result.mappings()]
-
-
 def get_pin_by_id(db_conn, row_id: int) -> PinnedRecording:
     """ Get a pinned_recording by id
         Args:
@@ -236,6 +211,27 @@ def get_pin_by_id(db_conn, row_id: int) -> PinnedRecording:
     return PinnedRecording(**row) if row else None
 
 
+def get_pins_by_ids(db_conn, row_ids: Iterable[int]) -> List[PinnedRecording]:
+    """ Get the pinned_recordings with the given ids
+        Args:
+            db_conn: database connection
+            row_ids: the row IDs of the pinned_recordings
+        Returns:
+            A list of PinnedRecording objects.
+    """
+    row_ids = tuple(row_ids)
+    if not row_ids:
+        return []
+    result = db_conn.execute(sqlalchemy.text("""
+        SELECT {columns}
+          FROM pinned_recording as pin
+         WHERE pin.id IN :row_ids
+    """.format(columns=','.join(PINNED_REC_GET_COLUMNS))), {
+        "row_ids": row_ids,
+    })
+    return [PinnedRecording(**row) for row in result.mappings()]
+
+
 def get_pin_count_for_user(db_conn, user_id: int) -> int:
     """ Get the total number pinned_recordings for the user.
 
@@ -5,12 +5,14 @@ from uuid import UUID
 
 import sqlalchemy
 import orjson
+from brainzutils import cache
 from sqlalchemy import text
 
 from listenbrainz.db.model import playlist as model_playlist
 from listenbrainz.db import user as db_user
 from listenbrainz.db.model.playlist import Playlist
 from listenbrainz.db.recording import load_recordings_from_mbids_with_redirects
+from listenbrainz.utils import cache_available
 
 TROI_BOT_USER_ID = 12939
 TROI_BOT_DEBUG_USER_ID = 19055
@@ -27,6 +29,13 @@ RECOMMENDATION_PATCHES = (
     'top-missed-recordings-of-2023'
 )
 
+# the serialized JSPF of a playlist with the metadata of its recordings, keyed on playlist id. the cached render
+# is only served while the last_updated of the playlist matches the one it was rendered from, so a render cached
+# by a concurrent read just before a write is committed is never served. the recording metadata comes from
+# MusicBrainz and users can be renamed, hence the expiry.
+PLAYLIST_JSPF_CACHE_KEY_PREFIX = "playlist_jspf."
+PLAYLIST_JSPF_CACHE_EXPIRY = 24 * 60 * 60  # 1 day
+
 
 def get_by_mbid(db_conn, ts_conn, playlist_id: str, load_recordings: bool = True) -> Optional[model_playlist.Playlist]:
     """Get a playlist given its mbid
@@ -66,26 +75,62 @@ def get_by_mbid(db_conn, ts_conn, playlist_id: str, load_recordings: bool = True
     if not obj:
         return None
     obj = dict(obj)
-    user_id = obj['creator_id']
-    user = db_user.get(db_conn, user_id)
-    obj['creator'] = user['musicbrainz_id']
-    if obj['created_for_id']:
-        created_for_user = db_user.get(db_conn, obj['created_for_id'])
-        if created_for_user:
-            obj['created_for'] = created_for_user['musicbrainz_id']
+    playlist_collaborator_ids = get_collaborators_for_playlists(ts_conn, [obj['id']])
+    collaborator_ids_list = playlist_collaborator_ids.get(obj['id'], [])
+
+    user_names = db_user.get_user_names_by_id(db_conn, [obj['creator_id'], obj['created_for_id'], *collaborator_ids_list])
+    obj['creator'] = user_names[obj['creator_id']]
+    if obj['created_for_id'] in user_names:
+        obj['created_for'] = user_names[obj['created_for_id']]
 
     if load_recordings:
         playlist_map = get_recordings_for_playlists(db_conn, ts_conn, [obj['id']])
         obj['recordings'] = playlist_map.get(obj['id'], [])
     else:
         obj['recordings'] = []
-    playlist_collaborator_ids = get_collaborators_for_playlists(ts_conn, [obj['id']])
-    collaborator_ids_list = playlist_collaborator_ids.get(obj['id'], [])
     obj['collaborator_ids'] = collaborator_ids_list
-    obj['collaborators'] = get_collaborators_names_from_ids(db_conn, collaborator_ids_list)
+    obj['collaborators'] = _get_collaborator_names(user_names, collaborator_ids_list)
     return model_playlist.Playlist.parse_obj(obj)
 
 
+def get_cached_jspf(playlist: Playlist) -> Optional[dict]:
+    """Get the cached JSPF render of the playlist, with the metadata of its recordings.
+
+    Arguments:
+        playlist: the playlist, only its id and last_updated are needed
+
+    Returns:
+        the serialized playlist, or ``None`` if it isn't cached or the playlist changed since it was cached
+    """
+    if not cache_available():
+        return None
+    cached = cache.get(PLAYLIST_JSPF_CACHE_KEY_PREFIX + str(playlist.id))
+    if cached is None or cached["last_updated"] != _last_updated_key(playlist):
+        return None
+    return cached["jspf"]
+
+
+def set_cached_jspf(playlist: Playlist, jspf: dict):
+    """Cache the JSPF render of the playlist, the recording metadata must have been loaded into it."""
+    if not cache_available():
+        return
+    cache.set(
+        PLAYLIST_JSPF_CACHE_KEY_PREFIX + str(playlist.id),
+        {"last_updated": _last_updated_key(playlist), "jspf": jspf},
+        expirein=PLAYLIST_JSPF_CACHE_EXPIRY
+    )
+
+
+def invalidate_cached_jspf(playlist_ids: List[int]):
+    """Remove the cached JSPF renders of the given playlists."""
+    if playlist_ids and cache_available():
+        cache.delete_many([PLAYLIST_JSPF_CACHE_KEY_PREFIX + str(playlist_id) for playlist_id in playlist_ids])
+
+
+def _last_updated_key(playlist: Playlist) -> Optional[str]:
+    return playlist.last_updated.isoformat() if playlist.last_updated else None
+
+
 def get_playlists_for_user(db_conn, ts_conn, user_id: int, include_private: bool = False,
                            load_recordings: bool = False, count: int = 0, offset: int = 0):
     """Get all playlists that a user created
@@ -199,34 +244,36 @@ def _playlist_resultset_to_model(db_conn, ts_conn, result, load_recordings):
 
     Fill in related data (username, created_for username) and collaborators
     """
+    rows = [dict(row) for row in result.mappings()]
+    if not rows:
+        return []
+
+    playlist_ids = [row["id"] for row in rows]
+    playlist_collaborator_ids = get_collaborators_for_playlists(ts_conn, playlist_ids)
+
+    # resolve the names of all creators, created_for users and collaborators of the page at once
+    user_ids = set()
+    for row in rows:
+        user_ids.add(row["creator_id"])
+        user_ids.add(row["created_for_id"])
+        user_ids.update(playlist_collaborator_ids.get(row["id"], []))
+    user_names = db_user.get_user_names_by_id(db_conn, user_ids)
+
     playlists = []
-    user_id_map = {}
-    for row in result.mappings():
-        row = dict(row)
-        creator_id = row["creator_id"]
-        if creator_id not in user_id_map:
-            # TODO: Do this lookup in bulk
-            user_id_map[creator_id] = db_user.get(db_conn, creator_id)
-        created_for_id = row["created_for_id"]
-        if created_for_id and created_for_id not in user_id_map:
-            user_id_map[created_for_id] = db_user.get(db_conn, created_for_id)
-        row["creator"] = user_id_map[creator_id]["musicbrainz_id"]
-        if created_for_id:
-            row["created_for"] = user_id_map[created_for_id]["musicbrainz_id"]
+    for row in rows:
+        row["creator"] = user_names[row["creator_id"]]
+        if row["created_for_id"]:
+            row["created_for"] = user_names[row["created_for_id"]]
         row["recordings"] = []
         playlist = model_playlist.Playlist.parse_obj(row)
+        playlist.collaborator_ids = playlist_collaborator_ids.get(playlist.id, [])
+        playlist.collaborators = _get_collaborator_names(user_names, playlist.collaborator_ids)
         playlists.append(playlist)
 
-    playlist_ids = [p.id for p in playlists]
-    if playlist_ids:
-        if load_recordings:
-            playlist_recordings = get_recordings_for_playlists(db_conn, ts_conn, playlist_ids)
-            for p in playlists:
-                p.recordings = playlist_recordings.get(p.id, [])
-        playlist_collaborator_ids = get_collaborators_for_playlists(ts_conn, playlist_ids)
+    if load_recordings:
+        playlist_recordings = get_recordings_for_playlists(db_conn, ts_conn, playlist_ids)
         for p in playlists:
-            p.collaborator_ids = playlist_collaborator_ids.get(p.id, [])
-            p.collaborators = get_collaborators_names_from_ids(db_conn, p.collaborator_ids)
+            p.recordings = playlist_recordings.get(p.id, [])
 
     return playlists
 
@@ -400,15 +447,11 @@ def get_recordings_for_playlists(db_conn, ts_conn, playlist_ids: List[int]):
       ORDER BY playlist_id, position
     """)
     result = ts_conn.execute(query, {"playlist_ids": tuple(playlist_ids)})
-    user_id_map = {}
+    rows = [dict(row) for row in result.mappings()]
+    user_names = db_user.get_user_names_by_id(db_conn, [row["added_by_id"] for row in rows])
     playlist_recordings_map = collections.defaultdict(list)
-    for row in result.mappings():
-        row = dict(row)
-        added_by_id = row["added_by_id"]
-        if added_by_id not in user_id_map:
-            # TODO: Do this lookup in bulk
-            user_id_map[added_by_id] = db_user.get(db_conn, added_by_id)
-        row["added_by"] = user_id_map[added_by_id]["musicbrainz_id"]
+    for row in rows:
+        row["added_by"] = user_names[row["added_by_id"]]
         playlist_recording = model_playlist.PlaylistRecording.parse_obj(row)
         playlist_recordings_map[playlist_recording.playlist_id].append(playlist_recording)
     for playlist_id in playlist_ids:
@@ -428,12 +471,14 @@ def _remove_old_collaborative_playlists(ts_conn, creator_id: int, created_for_id
               WHERE creator_id = :creator_id
                 AND additional_metadata->'algorithm_metadata'->>'source_patch' = :source_patch
                 AND created_for_id = :created_for_id
+          RETURNING id
     """)
-    ts_conn.execute(del_query, {
+    result = ts_conn.execute(del_query, {
         "creator_id": creator_id,
         "created_for_id": created_for_id,
         "source_patch": source_patch
     })
+    invalidate_cached_jspf([row.id for row in result])
 
 
 def create(db_conn, ts_conn, playlist: model_playlist.WritablePlaylist) -> model_playlist.Playlist:
@@ -452,18 +497,15 @@ def create(db_conn, ts_conn, playlist: model_playlist.WritablePlaylist) -> model
         a Playlist, representing the playlist that was inserted, with the id, mbid, and created date added.
 
     """
-    # TODO: These two gets should be done in a single query
-    creator = db_user.get(db_conn, playlist.creator_id)
-    if creator is None:
+    user_names = db_user.get_user_names_by_id(db_conn, [playlist.creator_id, playlist.created_for_id])
+    if playlist.creator_id not in user_names:
         raise Exception("TODO: Custom exception")
 
     # TODO: In a way this is less than ideal -- the caller must take the string name and find the ID,
     # and then the name is fetched for verification again. Should we accept created_for here and do
     # lookup only here and not he in the API call validation?
-    if playlist.created_for_id:
-        created_for = db_user.get(db_conn, playlist.created_for_id)
-        if created_for is None:
-            raise Exception("TODO: Custom exception")
+    if playlist.created_for_id and playlist.created_for_id not in user_names:
+        raise Exception("TODO: Custom exception")
 
     query = text("""
         INSERT INTO playlist.playlist (creator_id
@@ -504,7 +546,7 @@ def create(db_conn, ts_conn, playlist: model_playlist.WritablePlaylist) -> model
     playlist.id = row.id
     playlist.mbid = row.mbid
     playlist.created = row.created
-    playlist.creator = creator["musicbrainz_id"]
+    playlist.creator = user_names[playlist.creator_id]
     playlist.recordings = insert_recordings(db_conn, ts_conn, playlist.id, playlist.recordings, 0)
 
     if playlist.collaborator_ids:
@@ -535,14 +577,13 @@ def add_playlist_collaborators(ts_conn, playlist_id, collaborator_ids):
 
 
 def get_collaborators_names_from_ids(db_conn, collaborator_ids: List[int]):
-    collaborators = []
-    # TODO: Look this up in one query
-    for user_id in collaborator_ids:
-        user = db_user.get(db_conn, user_id)
-        if user:
-            collaborators.append(user["musicbrainz_id"])
-    collaborators.sort()
-    return collaborators
+    user_names = db_user.get_user_names_by_id(db_conn, collaborator_ids)
+    return _get_collaborator_names(user_names, collaborator_ids)
+
+
+def _get_collaborator_names(user_names: dict[int, str], collaborator_ids: List[int]):
+    """ Return the sorted names of the collaborators, skipping those which don't exist anymore """
+    return sorted(user_names[user_id] for user_id in collaborator_ids if user_id in user_names)
 
 
 def update_playlist(db_conn, ts_conn, playlist: model_playlist.Playlist):
@@ -581,6 +622,7 @@ def set_last_updated(ts_conn, playlist_id):
          WHERE id = :playlist_id
      RETURNING last_updated""")
     result = ts_conn.execute(query, {"playlist_id": playlist_id})
+    invalidate_cached_jspf([playlist_id])
     return result.fetchone()[0]
 
 
@@ -624,10 +666,13 @@ def delete_playlist_by_mbid(ts_conn, playlist_mbid: str):
     query = text("""
         DELETE FROM playlist.playlist
               WHERE playlist.mbid = :playlist_mbid
+          RETURNING id
     """)
     result = ts_conn.execute(query, {"playlist_mbid": playlist_mbid})
+    deleted_ids = [row.id for row in result]
     ts_conn.commit()
-    return result.rowcount == 1
+    invalidate_cached_jspf(deleted_ids)
+    return len(deleted_ids) == 1
 
 
 def insert_recordings(db_conn, ts_conn, playlist_id: int, recordings: List[model_playlist.WritablePlaylistRecording],
@@ -652,19 +697,17 @@ def insert_recordings(db_conn, ts_conn, playlist_id: int, recordings: List[model
                                       RETURNING id, created
     """)
     return_recordings = []
-    user_id_map = {}
+    invalidate_cached_jspf([playlist_id])
+    user_names = db_user.get_user_names_by_id(db_conn, [recording.added_by_id for recording in recordings])
     insert_ts = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
     for recording in recordings:
         if not recording.created:
             recording.created = insert_ts
         result = ts_conn.execute(query, recording.dict(include={'playlist_id', 'position', 'mbid', 'added_by_id', 'created'}))
-        if recording.added_by_id not in user_id_map:
-            # TODO: Do this lookup in bulk
-            user_id_map[recording.added_by_id] = db_user.get(db_conn, recording.added_by_id)
         row = result.fetchone()
         recording.id = row.id
         recording.created = row.created
-        recording.added_by = user_id_map[recording.added_by_id]["musicbrainz_id"]
+        recording.added_by = user_names[recording.added_by_id]
         return_recordings.append(model_playlist.PlaylistRecording.parse_obj(recording.dict()))
     return return_recordings
 
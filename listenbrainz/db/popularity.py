@@ -1,10 +1,9 @@
-import psycopg2
-from flask import current_app
+from brainzutils import musicbrainz_db
 from psycopg2.extras import DictCursor, execute_values
 from psycopg2.sql import SQL, Identifier
 from sqlalchemy import text
 
-from listenbrainz.db import color
+from listenbrainz.db import color, entity_page
 from listenbrainz.db.recording import load_recordings_from_mbids_with_redirects
 from listenbrainz.spark.spark_dataset import DatabaseDataset
 from listenbrainz.webserver.views.metadata_api import fetch_release_group_metadata
@@ -35,10 +34,9 @@ class PopularityDataset(DatabaseDataset):
             )
         """
 
-    def get_inserts(self, message):
-        query = f"INSERT INTO {{table}} ({self.entity_mbid}, total_listen_count, total_user_count) VALUES %s"
+    def get_copy(self, message):
         values = [(r[self.entity_mbid], r["total_listen_count"], r["total_user_count"]) for r in message["data"]]
-        return query, None, values
+        return [self.entity_mbid, "total_listen_count", "total_user_count"], values
 
     def get_indices(self):
         if self.mlhd:
@@ -50,6 +48,11 @@ class PopularityDataset(DatabaseDataset):
             f"CREATE INDEX {prefix}_{self.entity}_user_count_idx_{{suffix}} ON {{table}} (total_user_count) INCLUDE ({self.entity_mbid})"
         ]
 
+    def handle_end(self, message):
+        super().handle_end(message)
+        # only invalidate once the rotated tables have been committed, pages loaded before that read the old data
+        entity_page.invalidate_cached_props()
+
 
 class PopularityTopDataset(DatabaseDataset):
     """ Dataset class for all recordings and releases with popularity info (total listen count and unique listener
@@ -77,10 +80,9 @@ class PopularityTopDataset(DatabaseDataset):
             )
         """
 
-    def get_inserts(self, message):
-        query = f"INSERT INTO {{table}} (artist_mbid, {self.entity_mbid}, total_listen_count, total_user_count) VALUES %s"
+    def get_copy(self, message):
         values = [(r["artist_mbid"], r[self.entity_mbid], r["total_listen_count"], r["total_user_count"]) for r in message["data"]]
-        return query, None, values
+        return ["artist_mbid", self.entity_mbid, "total_listen_count", "total_user_count"], values
 
     def get_indices(self):
         if self.mlhd:
@@ -92,6 +94,11 @@ class PopularityTopDataset(DatabaseDataset):
             f"CREATE INDEX {prefix}_{self.entity}_artist_mbid_user_count_idx_{{suffix}} ON {{table}} (artist_mbid, total_user_count) INCLUDE ({self.entity_mbid})"
         ]
 
+    def handle_end(self, message):
+        super().handle_end(message)
+        # only invalidate once the rotated tables have been committed, pages loaded before that read the old data
+        entity_page.invalidate_cached_props()
+
 
 def get_all_popularity_datasets():
     """ Return all possible popularity datasets """
@@ -202,8 +209,8 @@ def get_top_recordings_for_artist(db_conn, ts_conn, artist_mbid, count=None):
     """ Get the top recordings for a given artist mbid """
     recordings = get_top_entity_for_artist(ts_conn, "recording", artist_mbid, count)
     recording_mbids = [str(r["recording_mbid"]) for r in recordings]
-    with psycopg2.connect(current_app.config["MB_DATABASE_URI"]) as mb_conn, \
-            mb_conn.cursor(cursor_factory=DictCursor) as mb_curs, \
+    with musicbrainz_db.engine.connect() as mb_conn, \
+            mb_conn.connection.cursor(cursor_factory=DictCursor) as mb_curs, \
             ts_conn.connection.cursor(cursor_factory=DictCursor) as ts_curs:
         recordings_data = load_recordings_from_mbids_with_redirects(mb_curs, ts_curs, recording_mbids)
         release_mbids = [str(r["release_mbid"]) for r in recordings_data if r["release_mbid"] is not None]
@@ -3,6 +3,8 @@ from typing import Iterable
 from psycopg2.extras import execute_values
 from psycopg2.sql import SQL, Identifier
 
+from listenbrainz.db.recording_metadata import get_recording_metadata
+
 
 def _resolve_mbids_helper(curs, query, mbids):
     """ Helper to extract common code for resolving redirect and canonical mbids """
@@ -71,53 +73,32 @@ def load_recordings_from_mbids(ts_curs, mbids: Iterable[str]) -> dict:
     if not mbids:
         return {}
 
-    query = """
-        SELECT mbc.recording_mbid::TEXT
-             , release_mbid::TEXT
-             , artist_mbids::TEXT[]
-             , artist_data->>'name' AS artist
-             , (artist_data->>'artist_credit_id')::bigint AS artist_credit_id
-             , recording_data->>'name' AS title
-             , (recording_data->>'length')::bigint AS length
-             , release_data->>'name' AS release
-             , (release_data->>'caa_id')::bigint AS caa_id
-             , release_data->>'caa_release_mbid' AS caa_release_mbid
-             , array_agg(artist->>'name' ORDER BY position) AS ac_names
-             , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases
-          FROM (VALUES %s) AS m (recording_mbid)
-          JOIN mapping.mb_metadata_cache mbc
-            ON mbc.recording_mbid = m.recording_mbid::uuid
-  JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
-            ON TRUE
-      GROUP BY mbc.recording_mbid
-             , release_mbid
-             , artist_mbids
-             , artist_data->>'name'
-             , artist_data->>'artist_credit_id'
-             , recording_data->>'name'
-             , recording_data->>'length'
-             , release_data->>'name'
-             , release_data->>'caa_id'
-             , release_data->>'caa_release_mbid'
-    """
-    results = execute_values(ts_curs, query, [(mbid,) for mbid in mbids], fetch=True)
     rows = {}
-    for row in results:
-        data = dict(row)
-        recording_mbid = data["recording_mbid"]
-
-        ac_names = data.pop("ac_names")
-        ac_join_phrases = data.pop("ac_join_phrases")
+    for recording_mbid, metadata in get_recording_metadata(ts_curs.connection, mbids).items():
+        # recordings without any artists in their artist credit are skipped
+        if not metadata["ac_names"]:
+            continue
 
         artists = []
-        for (mbid, name, join_phrase) in zip(data["artist_mbids"], ac_names, ac_join_phrases):
+        for (mbid, name, join_phrase) in zip(metadata["artist_mbids"], metadata["ac_names"], metadata["ac_join_phrases"]):
             artists.append({
                 "artist_mbid": mbid,
                 "artist_credit_name": name,
                 "join_phrase": join_phrase
             })
-        data["artists"] = artists
-        rows[recording_mbid] = data
+        rows[recording_mbid] = {
+            "recording_mbid": recording_mbid,
+            "release_mbid": metadata["release_mbid"],
+            "artist_mbids": list(metadata["artist_mbids"]),
+            "artist": metadata["artist_credit_name"],
+            "artist_credit_id": metadata["artist_credit_id"],
+            "title": metadata["recording_name"],
+            "length": metadata["length"],
+            "release": metadata["release_name"],
+            "caa_id": metadata["caa_id"],
+            "caa_release_mbid": metadata["caa_release_mbid"],
+            "artists": artists,
+        }
 
     return rows
 
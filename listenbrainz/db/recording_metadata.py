@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import psycopg2.extras
+from brainzutils import cache
+
+from listenbrainz.utils import cache_available
+
+# the mb_metadata_cache builder in mbid_mapping/mapping/mb_metadata_cache.py deletes these keys when it updates
+# a recording and increments the version when it rebuilds the whole table, remember to keep the keys in sync with it.
+# the keys of the recordings are RECORDING_METADATA_CACHE_KEY_PREFIX + "<version>." + recording_mbid.
+RECORDING_METADATA_CACHE_KEY_PREFIX = "recording_metadata."
+RECORDING_METADATA_CACHE_VERSION_KEY = "recording_metadata_version"
+RECORDING_METADATA_CACHE_EXPIRY = 24 * 60 * 60  # 1 day
+
+# the process local tier cannot be invalidated by the builder so its entries are only kept for a short while
+RECORDING_METADATA_LOCAL_CACHE_MAX_ITEMS = 10000
+RECORDING_METADATA_LOCAL_CACHE_EXPIRY = 60  # 1 minute
+
+
+class LocalRecordingMetadataCache:
+    """ A small process local LRU cache of shaped recording metadata, keyed on recording mbid.
+
+    Entries expire after a fixed number of seconds so that updates made by the mb_metadata_cache
+    builder, which only invalidates the shared redis tier, become visible in all processes quickly.
+    All entries are dropped when the version of the redis tier changes after a full rebuild.
+
+    Args:
+        max_items: the maximum number of recordings to keep in the cache
+        expiry: the number of seconds after which an entry expires
+    """
+
+    def __init__(self, max_items: int, expiry: int):
+        self.max_items = max_items
+        self.expiry = expiry
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, recording_mbid: str) -> Optional[dict]:
+        """ Return the cached metadata for the recording and mark it as recently used, None if not cached. """
+        with self._lock:
+            entry = self._entries.get(recording_mbid)
+            if entry is None:
+                return None
+            expires_at, metadata = entry
+            if expires_at < time.monotonic():
+                del self._entries[recording_mbid]
+                return None
+            self._entries.move_to_end(recording_mbid)
+            return metadata
+
+    def put(self, recording_mbid: str, metadata: dict):
+        """ Cache the metadata of the recording, evicting the least recently used entries if needed. """
+        with self._lock:
+            self._entries[recording_mbid] = (time.monotonic() + self.expiry, metadata)
+            self._entries.move_to_end(recording_mbid)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def set_version(self, version: int):
+        """ Drop all the entries if they were cached for a different version of the redis tier. """
+        with self._lock:
+            if self._version != version:
+                self._entries.clear()
+                self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalRecordingMetadataCache(RECORDING_METADATA_LOCAL_CACHE_MAX_ITEMS, RECORDING_METADATA_LOCAL_CACHE_EXPIRY)
+
+
+def get_recording_metadata_cache_version() -> int:
+    """ Return the current version of the recording metadata cached in redis. """
+    version = cache.get(RECORDING_METADATA_CACHE_VERSION_KEY, decode=False)
+    return int(version) if version else 0
+
+
+def invalidate_recording_metadata_cache():
+    """ Invalidate all the cached recording metadata by incrementing the version of the redis tier. """
+    if cache_available():
+        cache.increment(RECORDING_METADATA_CACHE_VERSION_KEY)
+    local_cache.clear()
+
+
+def _load_recording_metadata(connection, recording_mbids: tuple) -> dict[str, dict]:
+    """ Load and shape the metadata of the given recordings from the mb_metadata_cache table. """
+    query = """
+        SELECT recording_mbid::TEXT
+             , recording_data->>'name' AS recording_name
+             , (recording_data->>'length')::bigint AS length
+             , release_mbid::TEXT
+             , release_data->>'name' AS release_name
+             , artist_mbids::TEXT[]
+             , artist_data->>'name' AS artist_credit_name
+             , (artist_data->>'artist_credit_id')::bigint AS artist_credit_id
+             , artist_data->'artists' AS artists
+             , (release_data->>'caa_id')::bigint AS caa_id
+             , release_data->>'caa_release_mbid' AS caa_release_mbid
+          FROM mapping.mb_metadata_cache
+         WHERE recording_mbid IN %s
+    """
+    with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as curs:
+        curs.execute(query, (recording_mbids,))
+        metadata = {}
+        for row in curs.fetchall():
+            artists = row["artists"] or []
+            metadata[row["recording_mbid"]] = {
+                "recording_name": row["recording_name"],
+                "length": row["length"],
+                "release_mbid": row["release_mbid"],
+                "release_name": row["release_name"],
+                "artist_mbids": row["artist_mbids"],
+                "artist_credit_name": row["artist_credit_name"],
+                "artist_credit_id": row["artist_credit_id"],
+                "ac_names": [artist.get("name") for artist in artists],
+                "ac_join_phrases": [artist.get("join_phrase") for artist in artists],
+                "caa_id": row["caa_id"],
+                "caa_release_mbid": row["caa_release_mbid"],
+            }
+        return metadata
+
+
+def get_recording_metadata(connection, recording_mbids: Iterable[str]) -> dict[str, dict]:
+    """ Get the shaped metadata of the given recordings from the mb_metadata_cache.
+
+        The metadata is read through a process local LRU cache and a shared redis cache before falling
+        back to the database for the remaining recordings. The returned dicts are shared with the caches
+        and must not be modified.
+
+        Args:
+            connection: a raw psycopg2 connection to the timescale database
+            recording_mbids: the recording mbids to fetch metadata for
+
+        Returns:
+            A dict of recording mbid to its metadata: recording_name, length, release_mbid, release_name,
+            artist_mbids, artist_credit_name, artist_credit_id, ac_names, ac_join_phrases, caa_id and
+            caa_release_mbid. Recordings missing from the mb_metadata_cache are omitted.
+    """
+    version = None
+    if cache_available():
+        version = get_recording_metadata_cache_version()
+        local_cache.set_version(version)
+
+    metadata = {}
+    missing = []
+    for mbid in set(recording_mbids):
+        cached = local_cache.get(mbid)
+        if cached is None:
+            missing.append(mbid)
+        else:
+            metadata[mbid] = cached
+
+    prefix = f"{RECORDING_METADATA_CACHE_KEY_PREFIX}{version}."
+    if missing and version is not None:
+        cached = cache.get_many([prefix + mbid for mbid in missing])
+        remaining = []
+        for mbid in missing:
+            item = cached.get(prefix + mbid)
+            if item is None:
+                remaining.append(mbid)
+            else:
+                metadata[mbid] = item
+                local_cache.put(mbid, item)
+        missing = remaining
+
+    if not missing:
+        return metadata
+
+    loaded = _load_recording_metadata(connection, tuple(missing))
+    if loaded and version is not None:
+        cache.set_many(
+            {prefix + mbid: item for mbid, item in loaded.items()},
+            expirein=RECORDING_METADATA_CACHE_EXPIRY
+        )
+    for mbid, item in loaded.items():
+        local_cache.put(mbid, item)
+    metadata.update(loaded)
+    return metadata
+
+
+def get_metadata_for_listens(ts_conn, recording_mbids: Iterable[str]) -> dict[str, dict]:
+    """ Get the metadata added to listens mapped to the given recordings from the mb_metadata_cache, in one batch.
+
+        Args:
+            ts_conn: timescale database connection
+            recording_mbids: the recording mbids to fetch metadata for
+
+        Returns:
+            A dict of recording mbid to the keyword arguments for Listen.from_timescale describing the recording:
+            recording_name, release_mbid, artist_mbids, ac_names, ac_join_phrases, caa_id and caa_release_mbid.
+            Recordings missing from the cache are omitted.
+    """
+    recording_mbids = tuple(recording_mbids)
+    if not recording_mbids:
+        return {}
+
+    metadata = {}
+    for mbid, item in get_recording_metadata(ts_conn.connection, recording_mbids).items():
+        # copy the lists because the listens may be modified after creation
+        metadata[mbid] = {
+            "recording_name": item["recording_name"],
+            "release_mbid": item["release_mbid"],
+            "artist_mbids": list(item["artist_mbids"]),
+            "ac_names": list(item["ac_names"]),
+            "ac_join_phrases": list(item["ac_join_phrases"]),
+            "caa_id": item["caa_id"],
+            "caa_release_mbid": item["caa_release_mbid"],
+        }
+    return metadata
@@ -22,10 +22,9 @@ class SimilarityDataset(DatabaseDataset):
             f"CREATE UNIQUE INDEX similar_{self.entity}s_reverse_uniq_idx_{{suffix}} ON {{table}} (mbid1, mbid0)"
         ]
 
-    def get_inserts(self, message):
-        query = "INSERT INTO {table} (mbid0, mbid1, score) VALUES %s"
+    def get_copy(self, message):
         values = [(x["mbid0"], x["mbid1"], x["score"]) for x in message["data"]]
-        return query, None, values
+        return ["mbid0", "mbid1", "score"], values
 
     def run_post_processing(self, cursor, message):
         query = SQL("COMMENT ON TABLE {table} IS {comment}").format(
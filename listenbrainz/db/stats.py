@@ -41,7 +41,7 @@ from listenbrainz.db.user import get_users_by_id
 SITEWIDE_STATS_USER_ID = 15753
 
 
-def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="user_id"):
+def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="user_id", paged=False):
     """ Insert stats in couchdb.
 
         Args:
@@ -50,6 +50,10 @@ def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="use
             to_ts: the end of the time period for which the stat is
             values: list with each item as stat for 1 user
             key: the key of the value to user as _id of the document
+            paged: whether to split the data of the stats into pages, for stats which are read a slice at a time
+
+        Returns:
+            the throughput metrics of the couchdb bulk writer
     """
     with start_span(op="processing", description="add _id, from_ts, to_ts and last_updated to docs"):
         for doc in values:
@@ -59,10 +63,13 @@ def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="use
             doc["to_ts"] = to_ts
             doc["last_updated"] = int(datetime.now().timestamp())
 
-    couchdb.insert_data(database, values)
+    if paged:
+        values = [page for doc in values for page in couchdb.split_into_pages(doc)]
+
+    return couchdb.insert_data(database, values)
 
 
-def get(user_id, stats_type, stats_range, stats_model) -> Optional[StatApi]:
+def get(user_id, stats_type, stats_range, stats_model, offset=None, count=None) -> Optional[StatApi]:
     """ Retrieve stats for the given user, stats range and stats type.
 
         Args:
@@ -70,10 +77,12 @@ def get(user_id, stats_type, stats_range, stats_model) -> Optional[StatApi]:
             stats_range: time period to retrieve stats for
             stats_type: the stat to retrieve
             stats_model: the pydantic model for the stats
+            offset: if specified along with count, only retrieve the items of the stat from this position
+            count: if specified along with offset, only retrieve this many items of the stat
     """
     prefix = f"{stats_type}_{stats_range}"
     try:
-        data = couchdb.fetch_data(prefix, user_id)
+        data = couchdb.fetch_data(prefix, user_id, offset, count)
         if data is not None:
             return StatApi[stats_model](
                 user_id=user_id,
@@ -147,7 +156,7 @@ def insert_artist_map(user_id: int, stats_range: str, from_ts: int, to_ts: int,
     insert(databases[0], from_ts, to_ts, [{"user_id": user_id, "data": [x.dict() for x in data]}])
 
 
-def insert_sitewide_stats(database: str, from_ts: int, to_ts: int, data: dict):
+def insert_sitewide_stats(database: str, from_ts: int, to_ts: int, data: dict, paged=False):
     """ Insert sitewide stats in couchdb.
 
         Args:
@@ -155,6 +164,7 @@ def insert_sitewide_stats(database: str, from_ts: int, to_ts: int, data: dict):
             from_ts: the start of the time period for which the stat is
             to_ts: the end of the time period for which the stat is
             data: sitewide stat to insert
+            paged: whether to split the data of the stat into pages
     """
     data["user_id"] = SITEWIDE_STATS_USER_ID
-    insert(database, from_ts, to_ts, [data])
+    insert(database, from_ts, to_ts, [data], paged=paged)
@@ -1,5 +1,4 @@
 from flask import current_app
-from psycopg2.sql import Literal, SQL
 from sqlalchemy import text
 
 from listenbrainz.db import timescale
@@ -30,16 +29,14 @@ class _TagsDataset(DatabaseDataset):
             """
         ]
 
-    def get_inserts(self, message):
-        query = "INSERT INTO {table} (recording_mbid, tag, tag_count, percent, source) VALUES %s"
-
-        template = SQL("(%s, %s, %s, %s, {source})").format(source=Literal(message["source"]))
+    def get_copy(self, message):
+        source = message["source"]
         values = []
         for rec in message["data"]:
-            tags = [(rec["recording_mbid"], tag["tag"], tag["tag_count"], tag["_percent"]) for tag in rec["tags"]]
+            tags = [(rec["recording_mbid"], tag["tag"], tag["tag_count"], tag["_percent"], source) for tag in rec["tags"]]
             values.extend(tags)
 
-        return query, template, values
+        return ["recording_mbid", "tag", "tag_count", "percent", "source"], values
 
 
 TagsDataset = _TagsDataset()
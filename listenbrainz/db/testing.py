@@ -8,6 +8,7 @@ import uuid
 from listenbrainz import config
 from listenbrainz import db
 from listenbrainz.db import timescale as ts, create_test_database_connect_strings
+from listenbrainz.db.recording_metadata import invalidate_recording_metadata_cache
 from listenbrainz.db.timescale import create_test_timescale_connect_strings
 
 ADMIN_SQL_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'admin', 'sql')
@@ -68,3 +69,8 @@ class TimescaleTestCase(unittest.TestCase):
 
     def reset_timescale_db(self):
         ts.run_sql_script(os.path.join(TIMESCALE_SQL_DIR, 'reset_tables.sql'))
+        self.reset_recording_metadata_cache()
+
+    def reset_recording_metadata_cache(self):
+        """ Invalidate the recording metadata cached from the mb_metadata_cache table by earlier tests. """
+        invalidate_recording_metadata_cache()
@@ -106,3 +106,91 @@ class CouchdbTestCase(unittest.TestCase):
         self.assertEqual(response["data"], "bar")
         response = couchdb.fetch_data(database, 3)
         self.assertEqual(response["data"], "foobar")
+
+    def test_fetch_data_refreshes_cached_databases(self):
+        old_database = "couchdb_cache_test_db_20240204"
+        couchdb.create_database(old_database)
+        couchdb.insert_data(old_database, [{"_id": "1", "data": "foo"}])
+
+        self.assertEqual(couchdb.fetch_data("couchdb_cache_test_db", 1)["data"], "foo")
+        self.assertEqual(couchdb.get_cached_databases("couchdb_cache_test_db"), [old_database])
+
+        # rotate the databases behind the back of the cache, like a different process would do
+        new_database = "couchdb_cache_test_db_20240205"
+        requests.put(f"{get_base_url()}/{new_database}").raise_for_status()
+        requests.post(f"{get_base_url()}/{new_database}", json={"_id": "1", "data": "bar"}).raise_for_status()
+        requests.delete(f"{get_base_url()}/{old_database}").raise_for_status()
+
+        self.assertEqual(couchdb.fetch_data("couchdb_cache_test_db", 1)["data"], "bar")
+        self.assertEqual(couchdb.get_cached_databases("couchdb_cache_test_db"), [new_database])
+        self.assertIsNone(couchdb.fetch_data("couchdb_cache_test_db", 2))
+
+    def test_fetch_data_slice(self):
+        database = "couchdb_slice_test_db_20240204"
+        couchdb.create_database(database)
+        couchdb.insert_data(database, [{"_id": "1", "count": 5, "data": [1, 2, 3, 4, 5]}])
+
+        doc = couchdb.fetch_data("couchdb_slice_test_db", 1, offset=1, count=2)
+        self.assertEqual(doc["data"], [2, 3])
+        self.assertEqual(doc["count"], 5)
+        self.assertEqual(couchdb.fetch_data("couchdb_slice_test_db", 1)["data"], [1, 2, 3, 4, 5])
+        self.assertIsNone(couchdb.fetch_data("couchdb_slice_test_db", 2, offset=0, count=2))
+
+        # a slice past the end of the data returns the remaining items
+        self.assertEqual(couchdb.fetch_data("couchdb_slice_test_db", 1, offset=3, count=25)["data"], [4, 5])
+
+    def test_fetch_data_pages(self):
+        database = "couchdb_pages_test_db_20240204"
+        couchdb.create_database(database)
+        data = list(range(11))
+        docs = couchdb.split_into_pages({"_id": "1", "count": 11, "data": data}, page_size=3)
+        self.assertEqual(len(docs), 4)
+        self.assertEqual(docs[0]["data"], [0, 1, 2])
+        self.assertEqual(docs[3], {"_id": "1:3", "data": [9, 10]})
+        couchdb.insert_data(database, docs)
+
+        # the first page is stored in the document itself
+        with patch.object(couchdb, "_load_pages", wraps=couchdb._load_pages) as mock_load_pages, \
+                patch.object(couchdb._session, "post", wraps=couchdb._session.post) as mock_post:
+            doc = couchdb.fetch_data("couchdb_pages_test_db", 1, offset=0, count=3)
+            self.assertEqual(doc["data"], [0, 1, 2])
+            self.assertEqual(doc["count"], 11)
+            self.assertNotIn("pages", doc)
+            mock_load_pages.assert_called_once()
+            mock_post.assert_not_called()
+
+            # the other pages overlapping the slice are fetched in a single request
+            self.assertEqual(couchdb.fetch_data("couchdb_pages_test_db", 1, offset=4, count=4)["data"], [4, 5, 6, 7])
+            self.assertEqual(mock_post.call_count, 1)
+
+        self.assertEqual(couchdb.fetch_data("couchdb_pages_test_db", 1, offset=2, count=25)["data"], data[2:])
+        self.assertEqual(couchdb.fetch_data("couchdb_pages_test_db", 1, offset=20, count=5)["data"], [])
+        self.assertEqual(couchdb.fetch_data("couchdb_pages_test_db", 1)["data"], data)
+
+        # the pages are put back together in dumps
+        dumped = BytesIO()
+        couchdb.dump_database("couchdb_pages_test_db", dumped)
+        received = [json.loads(line) for line in dumped.getvalue().splitlines()]
+        self.assertEqual(received, [{"count": 11, "data": data}])
+
+        # documents smaller than a page are not split
+        doc = {"_id": "2", "data": [1, 2]}
+        self.assertEqual(couchdb.split_into_pages(doc, page_size=3), [doc])
+
+    def test_bulk_writer_batches(self):
+        database = "couchdb_bulk_writer_test_db_20240204"
+        couchdb.create_database(database)
+        couchdb.insert_data(database, [{"_id": "0", "data": "old"}])
+
+        # force a request for every few documents, with the first one conflicting
+        with couchdb.BulkWriter(database, max_batch_bytes=100, max_in_flight=2) as writer:
+            for i in range(20):
+                writer.add({"_id": str(i), "data": f"doc {i}"})
+
+        metrics = writer.metrics
+        self.assertEqual(metrics["documents"], 20)
+        self.assertEqual(metrics["conflicts"], 1)
+        self.assertGreater(metrics["requests"], 5)
+
+        for i in range(20):
+            self.assertEqual(couchdb.fetch_data("couchdb_bulk_writer_test_db", i)["data"], f"doc {i}")
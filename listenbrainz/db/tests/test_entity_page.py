@@ -0,0 +1,35 @@
+import unittest
+
+from brainzutils import cache
+
+import listenbrainz.db.entity_page as db_entity_page
+from listenbrainz import config
+from listenbrainz.utils import init_cache
+
+
+class EntityPageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        init_cache(config.REDIS_HOST, config.REDIS_PORT, config.REDIS_NAMESPACE)
+
+    def tearDown(self):
+        cache._r.flushdb()
+
+    def test_invalidate_cached_props(self):
+        mbid = "8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"
+        page = {"props": '{"artist_data": {"name": "Portishead"}}', "title": "Portishead"}
+
+        version = db_entity_page.get_datasets_version()
+        self.assertEqual(version, 0)
+        self.assertIsNone(db_entity_page.get_cached_props(version, "artist", mbid))
+        db_entity_page.set_cached_props(version, "artist", mbid, page)
+        self.assertEqual(db_entity_page.get_cached_props(version, "artist", mbid), page)
+        self.assertIsNone(db_entity_page.get_cached_props(version, "album", mbid))
+
+        # props loaded before a dataset was rotated are cached under the outdated version
+        db_entity_page.invalidate_cached_props()
+        new_version = db_entity_page.get_datasets_version()
+        self.assertEqual(new_version, 1)
+        self.assertIsNone(db_entity_page.get_cached_props(new_version, "artist", mbid))
+        db_entity_page.set_cached_props(version, "artist", mbid, page)
+        self.assertIsNone(db_entity_page.get_cached_props(new_version, "artist", mbid))
@@ -0,0 +1,119 @@
+import json
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from brainzutils import cache
+from sqlalchemy import text
+
+from listenbrainz import config
+from listenbrainz.db.recording_metadata import LocalRecordingMetadataCache, get_recording_metadata, \
+    RECORDING_METADATA_CACHE_VERSION_KEY
+from listenbrainz.db.testing import TimescaleTestCase
+from listenbrainz.utils import init_cache
+
+
+class LocalRecordingMetadataCacheTestCase(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = LocalRecordingMetadataCache(max_items=2, expiry=60)
+        cache.put("a", {"recording_name": "A"})
+        cache.put("b", {"recording_name": "B"})
+        # mark a as recently used so that b is evicted
+        self.assertEqual(cache.get("a"), {"recording_name": "A"})
+        cache.put("c", {"recording_name": "C"})
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), {"recording_name": "C"})
+
+    def test_expiry(self):
+        cache = LocalRecordingMetadataCache(max_items=2, expiry=60)
+        cache.put("a", {"recording_name": "A"})
+        with mock.patch("listenbrainz.db.recording_metadata.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_version_change(self):
+        cache = LocalRecordingMetadataCache(max_items=2, expiry=60)
+        cache.set_version(1)
+        cache.put("a", {"recording_name": "A"})
+        cache.set_version(1)
+        self.assertEqual(cache.get("a"), {"recording_name": "A"})
+        cache.set_version(2)
+        self.assertIsNone(cache.get("a"))
+
+
+class RecordingMetadataTestCase(TimescaleTestCase):
+
+    def insert_recording(self, recording_mbid, name):
+        self.ts_conn.execute(text("""
+            INSERT INTO mapping.mb_metadata_cache
+                    (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty)
+             VALUES (:recording_mbid ::UUID, :artist_mbids ::UUID[], :release_mbid ::UUID, :recording_data, :artist_data, :tag_data, :release_data, 'f')
+        """), {
+            "recording_mbid": recording_mbid,
+            "artist_mbids": ["8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"],
+            "release_mbid": "5da4af04-d796-4d07-801d-a878e83dee92",
+            "recording_data": json.dumps({"name": name, "length": 158000}),
+            "artist_data": json.dumps({
+                "name": "Portishead",
+                "artist_credit_id": 65,
+                "artists": [{"name": "Portishead", "join_phrase": ""}]
+            }),
+            "release_data": json.dumps({"name": "Dummy", "caa_id": 12345, "caa_release_mbid": "5da4af04-d796-4d07-801d-a878e83dee92"}),
+            "tag_data": json.dumps({"artist": [], "recording": [], "release_group": []})
+        })
+        self.ts_conn.commit()
+
+    def test_get_recording_metadata(self):
+        recording_mbid = str(uuid.uuid4())
+        missing_mbid = str(uuid.uuid4())
+        self.insert_recording(recording_mbid, "Strangers")
+
+        metadata = get_recording_metadata(self.ts_conn.connection, [recording_mbid, missing_mbid])
+        self.assertEqual(metadata, {
+            recording_mbid: {
+                "recording_name": "Strangers",
+                "length": 158000,
+                "release_mbid": "5da4af04-d796-4d07-801d-a878e83dee92",
+                "release_name": "Dummy",
+                "artist_mbids": ["8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"],
+                "artist_credit_name": "Portishead",
+                "artist_credit_id": 65,
+                "ac_names": ["Portishead"],
+                "ac_join_phrases": [""],
+                "caa_id": 12345,
+                "caa_release_mbid": "5da4af04-d796-4d07-801d-a878e83dee92",
+            }
+        })
+
+        # later lookups are served from the cache without querying mb_metadata_cache
+        self.ts_conn.execute(text("DELETE FROM mapping.mb_metadata_cache"))
+        self.ts_conn.commit()
+        metadata = get_recording_metadata(self.ts_conn.connection, [recording_mbid])
+        self.assertEqual(metadata[recording_mbid]["recording_name"], "Strangers")
+
+        self.reset_recording_metadata_cache()
+        self.assertEqual(get_recording_metadata(self.ts_conn.connection, [recording_mbid]), {})
+
+    def test_full_rebuild_invalidates_cache(self):
+        init_cache(config.REDIS_HOST, config.REDIS_PORT, config.REDIS_NAMESPACE)
+        recording_mbid = str(uuid.uuid4())
+        self.insert_recording(recording_mbid, "Strangers")
+        self.assertEqual(
+            get_recording_metadata(self.ts_conn.connection, [recording_mbid])[recording_mbid]["recording_name"],
+            "Strangers"
+        )
+
+        # the mb_metadata_cache builder swaps in a new table and then increments the version
+        self.ts_conn.execute(text("DELETE FROM mapping.mb_metadata_cache"))
+        self.ts_conn.commit()
+        self.insert_recording(recording_mbid, "Roads")
+        cache.increment(RECORDING_METADATA_CACHE_VERSION_KEY)
+
+        self.assertEqual(
+            get_recording_metadata(self.ts_conn.connection, [recording_mbid])[recording_mbid]["recording_name"],
+            "Roads"
+        )
@@ -158,6 +158,22 @@ class UserTestCase(DatabaseTestCase):
 
         self.assertDictEqual(users, db_user.get_users_by_id(self.db_conn, [user_id_24, user_id_25]))
 
+    def test_get_user_names_by_id(self):
+        user_id_24 = db_user.create(self.db_conn, 24, "twenty_four")
+        user_id_25 = db_user.create(self.db_conn, 25, "twenty_five")
+
+        self.assertDictEqual(
+            {user_id_24: "twenty_four", user_id_25: "twenty_five"},
+            db_user.get_user_names_by_id(self.db_conn, [user_id_24, user_id_25, user_id_24, None, 100000])
+        )
+
+        # renaming a user invalidates the cached name
+        db_user.update_user_details(self.db_conn, user_id_24, "twenty_four_renamed", "24@example.com")
+        self.assertDictEqual(
+            {user_id_24: "twenty_four_renamed"},
+            db_user.get_user_names_by_id(self.db_conn, [user_id_24])
+        )
+
     def test_fetch_email(self):
         musicbrainz_id = "one"
         email = "one@one.one"
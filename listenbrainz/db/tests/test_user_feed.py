@@ -0,0 +1,73 @@
+import time
+
+import listenbrainz.db.user as db_user
+import listenbrainz.db.user_feed as db_user_feed
+import listenbrainz.db.user_relationship as db_user_relationship
+import listenbrainz.db.user_timeline_event as db_user_timeline_event
+from listenbrainz.db.model.user_timeline_event import RecordingRecommendationMetadata, NotificationMetadata, \
+    UserTimelineEventType
+from listenbrainz.db.testing import DatabaseTestCase
+
+
+class UserFeedTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super(UserFeedTestCase, self).setUp()
+        self.user = db_user.get_or_create(self.db_conn, 1, "follower")
+        self.followed_user = db_user.get_or_create(self.db_conn, 2, "followed")
+        self.other_user = db_user.get_or_create(self.db_conn, 3, "other")
+
+    def get_feed(self, user_id):
+        events = db_user_feed.get_feed_events(self.db_conn, user_id, 0, int(time.time()) + 10, 25)
+        return [(event["event_type"], event["author_id"], event["event_id"]) for event in events]
+
+    def test_events_are_added_to_followers_feeds(self):
+        db_user_relationship.insert(self.db_conn, self.user["id"], self.followed_user["id"], "follow")
+        recommendation = db_user_timeline_event.create_user_track_recommendation_event(
+            self.db_conn,
+            user_id=self.followed_user["id"],
+            metadata=RecordingRecommendationMetadata(recording_mbid="34c208ee-2de7-4d38-b47e-907074866dd3")
+        )
+        notification = db_user_timeline_event.create_user_notification_event(
+            self.db_conn,
+            user_id=self.followed_user["id"],
+            metadata=NotificationMetadata(creator="troi-bot", message="hello")
+        )
+
+        self.assertCountEqual(self.get_feed(self.user["id"]), [
+            (UserTimelineEventType.FOLLOW, self.user["id"], self.followed_user["id"]),
+            (UserTimelineEventType.RECORDING_RECOMMENDATION, self.followed_user["id"], recommendation.id),
+        ])
+        self.assertCountEqual(self.get_feed(self.followed_user["id"]), [
+            (UserTimelineEventType.RECORDING_RECOMMENDATION, self.followed_user["id"], recommendation.id),
+            (UserTimelineEventType.NOTIFICATION, self.followed_user["id"], notification.id),
+        ])
+        self.assertListEqual(self.get_feed(self.other_user["id"]), [])
+
+        db_user_timeline_event.delete_user_timeline_event(self.db_conn, recommendation.id, self.followed_user["id"])
+        self.assertListEqual(self.get_feed(self.user["id"]), [
+            (UserTimelineEventType.FOLLOW, self.user["id"], self.followed_user["id"]),
+        ])
+
+    def test_follow_and_unfollow_update_feed(self):
+        recommendation = db_user_timeline_event.create_user_track_recommendation_event(
+            self.db_conn,
+            user_id=self.followed_user["id"],
+            metadata=RecordingRecommendationMetadata(recording_mbid="34c208ee-2de7-4d38-b47e-907074866dd3")
+        )
+        db_user_relationship.insert(self.db_conn, self.followed_user["id"], self.other_user["id"], "follow")
+
+        # events created before following a user are added to the new follower's feed
+        db_user_relationship.insert(self.db_conn, self.user["id"], self.followed_user["id"], "follow")
+        self.assertCountEqual(self.get_feed(self.user["id"]), [
+            (UserTimelineEventType.FOLLOW, self.user["id"], self.followed_user["id"]),
+            (UserTimelineEventType.FOLLOW, self.followed_user["id"], self.other_user["id"]),
+            (UserTimelineEventType.RECORDING_RECOMMENDATION, self.followed_user["id"], recommendation.id),
+        ])
+
+        db_user_relationship.delete(self.db_conn, self.user["id"], self.followed_user["id"], "follow")
+        self.assertListEqual(self.get_feed(self.user["id"]), [])
+        self.assertCountEqual(self.get_feed(self.followed_user["id"]), [
+            (UserTimelineEventType.FOLLOW, self.followed_user["id"], self.other_user["id"]),
+            (UserTimelineEventType.RECORDING_RECOMMENDATION, self.followed_user["id"], recommendation.id),
+        ])
@@ -20,7 +20,6 @@
 import listenbrainz.db.user as db_user
 import listenbrainz.db.user_timeline_event as db_user_timeline_event
 from unittest import mock
-import time
 import uuid
 
 from listenbrainz.db.model.review import CBReviewTimelineMetadata
@@ -45,13 +44,7 @@ class UserTimelineEventDatabaseTestCase(DatabaseTestCase):
             event_type=UserTimelineEventType.RECORDING_RECOMMENDATION,
             metadata=RecordingRecommendationMetadata(recording_msid=recording_msid)
         )
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=[self.user['id']],
-            min_ts=0,
-            max_ts=time.time(),
-            count=1,
-        )
+        events = db_user_timeline_event.get_user_timeline_events_by_ids(self.db_conn, [event.id])
         self.assertEqual(1, len(events))
         self.assertEqual(event.id, events[0].id)
         self.assertEqual(event.created, events[0].created)
@@ -102,149 +95,6 @@ class UserTimelineEventDatabaseTestCase(DatabaseTestCase):
         self.assertEqual(self.user['musicbrainz_id'], event.metadata.creator)
         self.assertEqual(UserTimelineEventType.NOTIFICATION, event.event_type)
 
-    def test_get_events_only_gets_events_for_the_specified_user(self):
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=self.user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Sunflower",
-                artist_name="Swae Lee & Post Malone",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-        new_user = db_user.get_or_create(self.db_conn, 2, 'captain america')
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=new_user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Fade",
-                artist_name="Kanye West",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=[new_user['id']],
-            min_ts=0,
-            max_ts=int(time.time()) + 1000,
-            count=10
-        )
-        self.assertEqual(1, len(events))
-        self.assertEqual(new_user['id'], events[0].user_id)
-
-    def test_get_events_for_feed_returns_events(self):
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=self.user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Sunflower",
-                artist_name="Swae Lee & Post Malone",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-
-        new_user = db_user.get_or_create(self.db_conn, 2, 'superman')
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=new_user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Sunflower",
-                artist_name="Swae Lee & Post Malone",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=(self.user['id'], new_user['id']),
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=50,
-        )
-        self.assertEqual(2, len(events))
-        self.assertEqual(new_user['id'], events[0].user_id)
-        self.assertEqual(self.user['id'], events[1].user_id)
-
-    def test_get_events_for_feed_honors_time_parameters(self):
-        ts = int(time.time())
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=self.user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Sunflower",
-                artist_name="Swae Lee & Post Malone",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=self.user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Da Funk",
-                artist_name="Daft Punk",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-
-        ts2 = time.time()
-        new_user = db_user.get_or_create(self.db_conn, 4, 'new_user')
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=new_user['id'],
-            metadata=RecordingRecommendationMetadata(
-                track_name="Da Funk",
-                artist_name="Daft Punk",
-                recording_msid=str(uuid.uuid4()),
-            )
-        )
-
-        # max_ts is too low, won't return anything
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=(self.user['id'], new_user['id']),
-            min_ts=0,
-            max_ts=ts,
-            count=50,
-        )
-        self.assertListEqual([], events)
-
-        # check that it honors min_ts as well
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=(self.user['id'], new_user['id']),
-            min_ts=ts2,
-            max_ts=ts + 10,
-            count=50,
-        )
-        self.assertEqual(1, len(events))
-
-    def test_get_events_for_feed_honors_count_parameter(self):
-        recording_msid_1 = str(uuid.uuid4())
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=self.user['id'],
-            metadata=RecordingRecommendationMetadata(recording_msid=recording_msid_1)
-        )
-
-        recording_msid_2 = str(uuid.uuid4())
-        db_user_timeline_event.create_user_track_recommendation_event(
-            self.db_conn,
-            user_id=self.user['id'],
-            metadata=RecordingRecommendationMetadata(recording_msid=recording_msid_2)
-        )
-
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=(self.user['id'],),
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=1,
-        )
-
-        # 2 events exist, should return only one, the one that is newer
-        self.assertEqual(1, len(events))
-        self.assertEqual(recording_msid_2, events[0].metadata.recording_msid)
-
     def test_delete_feed_events(self):
         # creating recording recommendation and checking
         event_rec = db_user_timeline_event.create_user_track_recommendation_event(
@@ -277,14 +127,7 @@ class UserTimelineEventDatabaseTestCase(DatabaseTestCase):
             id=event_rec.id,
             user_id=self.user["id"],
         )
-        event_rec = db_user_timeline_event.get_user_notification_events(
-            self.db_conn,
-            user_ids=[self.user["id"]],
-            min_ts=0,
-            max_ts=int(time.time()),
-            count=1,
-        )
-        self.assertEqual(0, len(event_rec))
+        self.assertIsNone(db_user_timeline_event.get_user_timeline_event_by_id(self.db_conn, event_rec.id))
 
         # deleting notification
         db_user_timeline_event.delete_user_timeline_event(
@@ -292,14 +135,7 @@ class UserTimelineEventDatabaseTestCase(DatabaseTestCase):
             id=event_not.id,
             user_id=new_user["id"],
         )
-        event_not = db_user_timeline_event.get_user_notification_events(
-            self.db_conn,
-            user_ids=[self.user["id"]],
-            min_ts=0,
-            max_ts=int(time.time()),
-            count=1,
-        )
-        self.assertEqual(0, len(event_not))
+        self.assertIsNone(db_user_timeline_event.get_user_timeline_event_by_id(self.db_conn, event_not.id))
 
     def test_delete_feed_events_for_something_goes_wrong(self):
         # creating recording recommendation
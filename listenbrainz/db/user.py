@@ -1,19 +1,26 @@
 import logging
-from typing import Optional
+from typing import Iterable, Optional
 
 import sqlalchemy
 import uuid
 
 from datetime import datetime
 
+from brainzutils import cache
+from flask import g, has_request_context
 from sqlalchemy import text
 
 from listenbrainz import db
 from listenbrainz.db.exceptions import DatabaseException
+from listenbrainz.utils import cache_available
 from typing import Tuple, List
 
 logger = logging.getLogger(__name__)
 
+# users can be renamed or deleted, so their names are only cached for a short while
+USER_NAME_CACHE_KEY_PREFIX = "user_name."
+USER_NAME_CACHE_EXPIRY = 5 * 60  # 5 minutes
+
 
 def create(db_conn, musicbrainz_row_id: int, musicbrainz_id: str, email: str = None) -> int:
     """Create a new user.
@@ -327,6 +334,7 @@ def delete(db_conn, id):
     except sqlalchemy.exc.ProgrammingError as err:
         logger.error(err)
         raise DatabaseException("Couldn't delete user: %s" % str(err))
+    _invalidate_user_name(id)
 
 
 def agree_to_gdpr(db_conn, musicbrainz_id):
@@ -434,6 +442,62 @@ def get_users_by_id(db_conn, user_ids: List[int]):
     return row_id_username_map
 
 
+def get_user_names_by_id(db_conn, user_ids: Iterable[int]) -> dict[int, str]:
+    """ Resolve many user ids to their MusicBrainz usernames at once.
+
+        The names are looked up in a memo kept for the duration of the current request, then in a short lived
+        shared redis cache and finally with one get_users_by_id query for the remaining users.
+
+        Args:
+            db_conn: database connection
+            user_ids: the ids of the users, None values are ignored
+
+        Returns:
+            A dict mapping user ids to usernames. Users which don't exist are omitted.
+    """
+    memo = g.setdefault("_user_names", {}) if has_request_context() else {}
+
+    names = {}
+    missing = []
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        if user_id in memo:
+            names[user_id] = memo[user_id]
+        else:
+            missing.append(user_id)
+
+    if missing and cache_available():
+        cached = cache.get_many([USER_NAME_CACHE_KEY_PREFIX + str(user_id) for user_id in missing])
+        remaining = []
+        for user_id in missing:
+            name = cached.get(USER_NAME_CACHE_KEY_PREFIX + str(user_id))
+            if name is None:
+                remaining.append(user_id)
+            else:
+                names[user_id] = name
+        missing = remaining
+
+    if missing:
+        loaded = get_users_by_id(db_conn, missing)
+        if loaded and cache_available():
+            cache.set_many(
+                {USER_NAME_CACHE_KEY_PREFIX + str(user_id): name for user_id, name in loaded.items()},
+                expirein=USER_NAME_CACHE_EXPIRY
+            )
+        names.update(loaded)
+
+    memo.update(names)
+    return names
+
+
+def _invalidate_user_name(user_id: int):
+    if has_request_context():
+        g.get("_user_names", {}).pop(user_id, None)
+    if cache_available():
+        cache.delete(USER_NAME_CACHE_KEY_PREFIX + str(user_id))
+
+
 def is_user_reported(db_conn, reporter_id: int, reported_id: int):
     """ Check whether the user identified by reporter_id has reported the
     user identified by reported_id"""
@@ -487,6 +551,7 @@ def update_user_details(db_conn, lb_id: int, musicbrainz_id: str, email: str):
     except sqlalchemy.exc.ProgrammingError as err:
         logger.error(err)
         raise DatabaseException("Couldn't update user's email: %s" % str(err))
+    _invalidate_user_name(lb_id)
 
 
 def search_query(db_conn, search_term: str, limit: int):
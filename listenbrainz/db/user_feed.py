@@ -0,0 +1,152 @@
+""" The materialized feeds of users.
+
+The feed of a user contains the follows, recording recommendations, CritiqueBrainz reviews and pins of the user
+and of the users they follow, the notifications for the user and the personal recommendations sent by or to the user.
+Instead of gathering these from every source for all the followed users each time a feed is read, a reference to
+each event is added to the feed of every user who should see it when the event is created (fan-out on write), so
+that a page of the feed is a single index scan over the user_feed_event table.
+
+The functions adding and removing events don't commit, the caller commits them together with the event itself.
+Listens are not materialized, there are far too many of them and the feed only shows a few recent ones.
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import sqlalchemy
+
+from listenbrainz.db.model.user_timeline_event import UserTimelineEventType
+
+# the types of events which are shown to the user who created them and all their followers
+FOLLOWED_EVENT_TYPES = (
+    UserTimelineEventType.FOLLOW,
+    UserTimelineEventType.RECORDING_RECOMMENDATION,
+    UserTimelineEventType.CRITIQUEBRAINZ_REVIEW,
+    UserTimelineEventType.RECORDING_PIN,
+)
+
+
+def add_event(db_conn, author_id: int, event_type: UserTimelineEventType, event_id: int, created: datetime,
+              user_ids: Optional[Iterable[int]] = None):
+    """ Add an event to the feeds of the users who should see it.
+
+    Args:
+        db_conn: database connection
+        author_id: the row id of the user who created the event
+        event_type: the type of the event
+        event_id: the row id of the event, the row id of the followed user for follow events
+        created: the time the event was created
+        user_ids: the users to add the event to the feeds of. if not specified, the event is
+            added to the feeds of the author and all their followers.
+    """
+    params = {
+        "author_id": author_id,
+        "event_type": event_type.value,
+        "event_id": event_id,
+        "created": created,
+    }
+    if user_ids is None:
+        recipients = """
+            SELECT :author_id AS user_id
+             UNION
+            SELECT user_0 AS user_id
+              FROM user_relationship
+             WHERE user_1 = :author_id
+               AND relationship_type = 'follow'
+        """
+    else:
+        recipients = "SELECT DISTINCT unnest(CAST(:user_ids AS INTEGER[])) AS user_id"
+        params["user_ids"] = list(user_ids)
+
+    db_conn.execute(sqlalchemy.text(f"""
+        INSERT INTO user_feed_event (user_id, author_id, event_type, event_id, created)
+             SELECT user_id, :author_id, :event_type, :event_id, :created
+               FROM ({recipients}) recipients
+        ON CONFLICT (user_id, event_type, author_id, event_id)
+         DO NOTHING
+    """), params)
+
+
+def remove_event(db_conn, author_id: int, event_type: UserTimelineEventType, event_id: int):
+    """ Remove an event from the feeds of all users. """
+    db_conn.execute(sqlalchemy.text("""
+        DELETE FROM user_feed_event
+              WHERE event_type = :event_type
+                AND event_id = :event_id
+                AND author_id = :author_id
+    """), {
+        "author_id": author_id,
+        "event_type": event_type.value,
+        "event_id": event_id,
+    })
+
+
+def add_followed_user_events(db_conn, follower_id: int, followed_id: int):
+    """ Add the existing events of a user to the feed of a new follower of the user. """
+    db_conn.execute(sqlalchemy.text("""
+        INSERT INTO user_feed_event (user_id, author_id, event_type, event_id, created)
+             SELECT :follower_id, user_id, CAST(CAST(event_type AS TEXT) AS user_feed_event_type_enum), id, created
+               FROM user_timeline_event
+              WHERE user_id = :followed_id
+                AND event_type IN ('recording_recommendation', 'critiquebrainz_review')
+          UNION ALL
+             SELECT :follower_id, user_id, 'recording_pin', id, created
+               FROM pinned_recording
+              WHERE user_id = :followed_id
+          UNION ALL
+             SELECT :follower_id, user_0, 'follow', user_1, created
+               FROM user_relationship
+              WHERE user_0 = :followed_id
+                AND relationship_type = 'follow'
+        ON CONFLICT (user_id, event_type, author_id, event_id)
+         DO NOTHING
+    """), {"follower_id": follower_id, "followed_id": followed_id})
+
+
+def remove_followed_user_events(db_conn, follower_id: int, followed_id: int):
+    """ Remove the events of a user from the feed of a user who stopped following them. """
+    db_conn.execute(sqlalchemy.text("""
+        DELETE FROM user_feed_event
+              WHERE user_id = :follower_id
+                AND author_id = :followed_id
+                AND event_type IN :event_types
+    """), {
+        "follower_id": follower_id,
+        "followed_id": followed_id,
+        "event_types": tuple(event_type.value for event_type in FOLLOWED_EVENT_TYPES),
+    })
+
+
+def get_feed_events(db_conn, user_id: int, min_ts: int, max_ts: int, count: int) -> List[dict]:
+    """ Gets the latest events in the feed of a user, in descending order of their created time.
+
+    Args:
+        db_conn: database connection
+        user_id: the row id of the user
+        min_ts: events created before this timestamp will not be returned
+        max_ts: events created after this timestamp will not be returned
+        count: the maximum number of events to return
+
+    Returns:
+        a list of dicts with the author_id, event_type, event_id and created time of the events
+    """
+    result = db_conn.execute(sqlalchemy.text("""
+        SELECT author_id
+             , event_type::text
+             , event_id
+             , created
+          FROM user_feed_event
+         WHERE user_id = :user_id
+           AND created > :min_ts
+           AND created < :max_ts
+      ORDER BY created DESC
+         LIMIT :count
+    """), {
+        "user_id": user_id,
+        "min_ts": datetime.utcfromtimestamp(min_ts),
+        "max_ts": datetime.utcfromtimestamp(max_ts),
+        "count": count,
+    })
+    return [
+        {**row, "event_type": UserTimelineEventType(row["event_type"])}
+        for row in result.mappings()
+    ]
@@ -16,11 +16,13 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 
-from datetime import datetime
 from typing import List, Iterable
 
 import sqlalchemy
 
+from listenbrainz.db import user_feed as db_user_feed
+from listenbrainz.db.model.user_timeline_event import UserTimelineEventType
+
 VALID_RELATIONSHIP_TYPES = (
     'follow',
 )
@@ -30,16 +32,21 @@ def insert(db_conn, user_0: int, user_1: int, relationship_type: str) -> None:
     if relationship_type not in VALID_RELATIONSHIP_TYPES:
         raise ValueError(f"Invalid relationship type: {relationship_type}")
 
-    db_conn.execute(sqlalchemy.text("""
+    result = db_conn.execute(sqlalchemy.text("""
         INSERT INTO user_relationship (user_0, user_1, relationship_type)
              VALUES (:user_0, :user_1, :relationship_type)
         ON CONFLICT (user_0, user_1, relationship_type)
          DO NOTHING
+          RETURNING created
     """), {
         "user_0": user_0,
         "user_1": user_1,
         "relationship_type": relationship_type,
     })
+    row = result.fetchone()
+    if row is not None:
+        db_user_feed.add_event(db_conn, user_0, UserTimelineEventType.FOLLOW, user_1, row.created)
+        db_user_feed.add_followed_user_events(db_conn, user_0, user_1)
     db_conn.commit()
 
 
@@ -85,7 +92,7 @@ def delete(db_conn, user_0: int, user_1: int, relationship_type: str) -> None:
     if relationship_type not in VALID_RELATIONSHIP_TYPES:
         raise ValueError(f"Invalid relationship type: {relationship_type}")
 
-    db_conn.execute(sqlalchemy.text("""
+    result = db_conn.execute(sqlalchemy.text("""
         DELETE
           FROM user_relationship
         WHERE user_0 = :user_0
@@ -96,6 +103,9 @@ def delete(db_conn, user_0: int, user_1: int, relationship_type: str) -> None:
         "user_1": user_1,
         "relationship_type": relationship_type,
     })
+    if result.rowcount > 0:
+        db_user_feed.remove_event(db_conn, user_0, UserTimelineEventType.FOLLOW, user_1)
+        db_user_feed.remove_followed_user_events(db_conn, user_0, user_1)
     db_conn.commit()
 
 
@@ -130,12 +140,8 @@ def get_following_for_user(db_conn, user: int) -> List[dict]:
     return result.mappings().all()
 
 
-def get_follow_events(db_conn, user_ids: Iterable[int], min_ts: float, max_ts: float, count: int) -> List[dict]:
-    """ Gets a list of follow events for specified users.
-
-    Args:
-        db_conn: database connection
-        user_ids: is a tuple of user row IDs.
+def get_follow_events_by_users(db_conn, follows: Iterable[tuple[int, int]]) -> List[dict]:
+    """ Gets the follow events for the given pairs of (follower, followed) user row IDs.
 
     Returns:
          a list of dicts of the following format:
@@ -146,21 +152,16 @@ def get_follow_events(db_conn, user_ids: Iterable[int], min_ts: float, max_ts: f
                 created: datetime,
             }
     """
+    follows = list(follows)
+    if not follows:
+        return []
     result = db_conn.execute(sqlalchemy.text("""
         SELECT follower.musicbrainz_id as user_name_0, followed.musicbrainz_id as user_name_1, ur.created
           FROM user_relationship ur
           JOIN "user" follower ON ur.user_0 = follower.id
           JOIN "user" followed ON ur.user_1 = followed.id
-         WHERE ur.user_0 IN :user_ids
-           AND ur.created > :min_ts
-           AND ur.created < :max_ts
+         WHERE (ur.user_0, ur.user_1) IN :follows
+           AND ur.relationship_type = 'follow'
       ORDER BY created DESC
-         LIMIT :count
-    """), {
-        "user_ids": tuple(user_ids),
-        "min_ts": datetime.utcfromtimestamp(min_ts),
-        "max_ts": datetime.utcfromtimestamp(max_ts),
-        "count": count
-    })
-
+    """), {"follows": tuple(follows)})
     return result.mappings().all()
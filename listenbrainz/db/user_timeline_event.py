@@ -19,8 +19,6 @@
 import sqlalchemy
 import orjson
 
-from datetime import datetime
-
 from sqlalchemy import text
 
 from listenbrainz.db.model.user_timeline_event import (
@@ -33,11 +31,34 @@ from listenbrainz.db.model.user_timeline_event import (
     PersonalRecordingRecommendationMetadata
 )
 from listenbrainz import db
+from listenbrainz.db import user_feed as db_user_feed
 from listenbrainz.db.exceptions import DatabaseException
 from typing import List, Tuple, Iterable
 
 from listenbrainz.db.model.review import CBReviewTimelineMetadata
 
+# the recommendee user ids stored in the metadata of personal recommendation events are replaced by their names
+PERSONAL_RECOMMENDATION_EVENT_SELECT = """
+        SELECT user_timeline_event.id
+             , user_timeline_event.user_id
+             , user_timeline_event.event_type
+             , (
+                SELECT jsonb_build_object(
+                            'recording_mbid', user_timeline_event.metadata->'recording_mbid',
+                            'recording_msid', user_timeline_event.metadata->'recording_msid',
+                            'users', jsonb_agg("user".musicbrainz_id ORDER BY idx),
+                            'blurb_content', user_timeline_event.metadata->'blurb_content'
+                        ) AS metadata
+                  FROM jsonb_array_elements_text(user_timeline_event.metadata->'users') WITH ORDINALITY AS arr (value, idx)
+            INNER JOIN "user"
+                    ON arr.value::int = "user".id
+               )
+             , user_timeline_event.created
+             , "user".musicbrainz_id as user_name
+          FROM user_timeline_event
+          JOIN "user"
+            ON user_timeline_event.user_id = "user".id"""
+
 
 def create_user_timeline_event(
     db_conn,
@@ -58,8 +79,12 @@ def create_user_timeline_event(
                 'metadata': orjson.dumps(metadata.dict()).decode("utf-8"),
             }
         )
+        row = result.mappings().first()
+        # notifications are only shown to the user they are posted for
+        recipients = [user_id] if event_type == UserTimelineEventType.NOTIFICATION else None
+        db_user_feed.add_event(db_conn, user_id, event_type, row["id"], row["created"], recipients)
         db_conn.commit()
-        return UserTimelineEvent(**result.mappings().first())
+        return UserTimelineEvent(**row)
     except Exception as e:
         raise DatabaseException(str(e))
 
@@ -93,12 +118,16 @@ def delete_user_timeline_event(db_conn, id: int, user_id: int) -> bool:
                 DELETE FROM user_timeline_event
                 WHERE user_id = :user_id
                 AND id = :id
+                RETURNING event_type
             '''), {
                 'user_id': user_id,
                 'id': id
             })
+        row = result.fetchone()
+        if row is not None:
+            db_user_feed.remove_event(db_conn, user_id, UserTimelineEventType(row.event_type), id)
         db_conn.commit()
-        return result.rowcount == 1
+        return row is not None
     except Exception as e:
         raise DatabaseException(str(e))
 
@@ -147,123 +176,52 @@ def create_personal_recommendation_event(db_conn, user_id: int, metadata: Person
                 'blurb_content': metadata.blurb_content
             }
         )
+        row = result.mappings().first()
+        # personal recommendations are only shown to the recommender and the recommendees
+        recipients = [user_id, *(int(recipient) for recipient in row["metadata"]["users"] or [])]
+        db_user_feed.add_event(
+            db_conn, user_id, UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION, row["id"], row["created"], recipients
+        )
         db_conn.commit()
-        return UserTimelineEvent(**result.mappings().first())
+        return UserTimelineEvent(**row)
     except Exception as e:
         raise DatabaseException(str(e))
 
 
-def get_user_timeline_events(
-    db_conn,
-    user_ids: Iterable[int],
-    event_type: UserTimelineEventType,
-    min_ts: float,
-    max_ts: float,
-    count: int = 50
-) -> List[UserTimelineEvent]:
-    """ Gets user timeline events of the specified type associated with the specified user.
-
-    The optional `count` parameter can be used to control the number of events being returned. The min_ts and max_ts
-    can be used to influence the time period during which the events should be returned.
+def get_user_timeline_events_by_ids(db_conn, ids: Iterable[int]) -> List[UserTimelineEvent]:
+    """ Gets the user timeline events with the given row IDs. Personal recommendation events should be fetched
+    with get_personal_recommendation_events_by_ids instead so that the names of the recommendees are loaded.
     """
+    ids = tuple(ids)
+    if not ids:
+        return []
     result = db_conn.execute(sqlalchemy.text("""
         SELECT id, user_id, event_type, metadata, created
           FROM user_timeline_event
-         WHERE user_id IN :user_ids
-           AND created > :min_ts
-           AND created < :max_ts
-           AND event_type = :event_type
-      ORDER BY created DESC
-         LIMIT :count
-    """), {
-        "user_ids": tuple(user_ids),
-        "min_ts": datetime.utcfromtimestamp(min_ts),
-        "max_ts": datetime.utcfromtimestamp(max_ts),
-        "event_type": event_type.value,
-        "count": count,
-    })
-
+         WHERE id IN :ids
+    """), {"ids": ids})
     return [UserTimelineEvent(**row) for row in result.mappings()]
 
 
-def get_recording_recommendation_events_for_feed(db_conn, user_ids: Iterable[int], min_ts: int, max_ts: int, count: int) \
-        -> List[UserTimelineEvent]:
-    """ Gets a list of recording_recommendation events for specified users.
-
-    user_ids is a tuple of user row IDs.
-    """
-    return get_user_timeline_events(
-        db_conn,
-        user_ids=user_ids,
-        event_type=UserTimelineEventType.RECORDING_RECOMMENDATION,
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count
-    )
-
-
-def get_personal_recommendation_events_for_feed(db_conn, user_id: int, min_ts: int, max_ts: int, count: int) -> List[UserTimelineEvent]:
-    """ Gets a list of personal_recording_recommendation events for specified users.
+def get_personal_recommendation_events_by_ids(db_conn, ids: Iterable[int]) -> List[UserTimelineEvent]:
+    """ Gets the personal_recording_recommendation events with the given row IDs. """
+    ids = tuple(ids)
+    if not ids:
+        return []
+    result = db_conn.execute(sqlalchemy.text(PERSONAL_RECOMMENDATION_EVENT_SELECT + """
+         WHERE user_timeline_event.id IN :ids
+    """), {"ids": ids})
+    return [_personal_recommendation_event_from_row(row) for row in result]
 
-    user_ids is a tuple of user row IDs.
-    """
-    result = db_conn.execute(sqlalchemy.text("""
-        SELECT user_timeline_event.id
-             , user_timeline_event.user_id
-             , user_timeline_event.event_type
-             , (
-                SELECT jsonb_build_object(
-                            'recording_mbid', user_timeline_event.metadata->'recording_mbid',
-                            'recording_msid', user_timeline_event.metadata->'recording_msid',
-                            'users', jsonb_agg("user".musicbrainz_id ORDER BY idx),
-                            'blurb_content', user_timeline_event.metadata->'blurb_content'
-                        ) AS metadata
-                  FROM jsonb_array_elements_text(user_timeline_event.metadata->'users') WITH ORDINALITY AS arr (value, idx)
-            INNER JOIN "user" 
-                    ON arr.value::int = "user".id
-               )
-             , user_timeline_event.created
-             , "user".musicbrainz_id as user_name
-          FROM user_timeline_event
-          JOIN "user"
-            ON user_timeline_event.user_id = "user".id
-         WHERE (user_timeline_event.metadata -> 'users') @> (:user_id)::text::jsonb
-            OR user_timeline_event.user_id = :user_id
-           AND user_timeline_event.created > :min_ts
-           AND user_timeline_event.created < :max_ts
-           AND user_timeline_event.event_type = :event_type
-      ORDER BY user_timeline_event.created DESC
-         LIMIT :count
-    """), {
-        "user_id": user_id,
-        "min_ts": datetime.utcfromtimestamp(min_ts),
-        "max_ts": datetime.utcfromtimestamp(max_ts),
-        "count": count,
-        "event_type": UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION.value,
-    })
 
-    return [UserTimelineEvent(
+def _personal_recommendation_event_from_row(row) -> UserTimelineEvent:
+    return UserTimelineEvent(
         id=row.id,
         user_id=row.user_id,
         user_name=row.user_name,
         event_type=row.event_type,
         metadata=PersonalRecordingRecommendationMetadata(**row.metadata),
         created=row.created
-    ) for row in result]
-
-
-def get_cb_review_events(db_conn, user_ids: List[int], min_ts: int, max_ts: int, count: int) -> List[UserTimelineEvent]:
-    """ Gets a list of CritiqueBrainz review events for specified users.
-
-    user_ids is a tuple of user row IDs.
-    """
-    return get_user_timeline_events(
-        db_conn,
-        user_ids=user_ids,
-        event_type=UserTimelineEventType.CRITIQUEBRAINZ_REVIEW,
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count
     )
 
 
@@ -283,22 +241,6 @@ def get_user_timeline_event_by_id(db_conn, id: int) -> UserTimelineEvent:
     return UserTimelineEvent(**row) if row else None
 
 
-def get_user_notification_events(db_conn, user_ids: Iterable[int], min_ts: int, max_ts: int, count: int)\
-        -> List[UserTimelineEvent]:
-    """ Gets notification posted on the user's timeline.
-
-    The optional `count` parameter can be used to control the number of events being returned.
-    """
-    return get_user_timeline_events(
-        db_conn,
-        user_ids=user_ids,
-        event_type=UserTimelineEventType.NOTIFICATION,
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count
-    )
-
-
 def hide_user_timeline_event(db_conn, user_id: int, event_type: UserTimelineEventType, event_id: int) -> bool:
     """ Adds events that are to be hidden """
     try:
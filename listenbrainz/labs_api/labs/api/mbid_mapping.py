@@ -27,9 +27,11 @@ class MBIDMappingQuery(BaseMBIDMappingQuery):
             args.append((i, param['[artist_credit_name]'],
                          param['[recording_name]']))
 
+        hits = self.mapper.search_many([(artist_credit_name, recording_name, None)
+                                        for _, artist_credit_name, recording_name in args])
+
         results = []
-        for index, artist_credit_name, recording_name in args:
-            hit = self.mapper.search(artist_credit_name, recording_name)
+        for (index, artist_credit_name, recording_name), hit in zip(args, hits):
             if hit:
                 hit["artist_credit_arg"] = artist_credit_name
                 hit["recording_arg"] = recording_name
@@ -26,9 +26,11 @@ class MBIDMappingReleaseQuery(BaseMBIDMappingQuery):
         for i, param in enumerate(params):
             args.append((i, param['[artist_credit_name]'], param['[recording_name]'], param['[release_name]']))
 
+        hits = self.mapper.search_many([(artist_credit_name, recording_name, release_name)
+                                        for _, artist_credit_name, recording_name, release_name in args])
+
         results = []
-        for index, artist_credit_name, recording_name, release_name in args:
-            hit = self.mapper.search(artist_credit_name, recording_name, release_name)
+        for (index, artist_credit_name, recording_name, release_name), hit in zip(args, hits):
             if hit:
                 hit["artist_credit_arg"] = artist_credit_name
                 hit["recording_arg"] = recording_name
@@ -3,6 +3,7 @@ from unittest.mock import patch
 import flask_testing
 from datasethoster.main import create_app
 from listenbrainz.labs_api.labs.api.mbid_mapping import MBIDMappingQuery
+from listenbrainz.mbid_mapping_writer.mbid_mapper import search_result_cache
 
 
 json_request_0 = [
@@ -27,6 +28,8 @@ json_request_1 = [
     }
 ]
 
+# the searches of all the listens are made together, the first multi search has the first lookup of all three listens
+# and the second one the detuned lookup of the listen which didn't match
 typesense_response_0 = [
     {
         "hits": [{
@@ -169,6 +172,7 @@ class MainTestCase(flask_testing.TestCase):
 
     def setUp(self):
         flask_testing.TestCase.setUp(self)
+        search_result_cache.clear()
 
     def tearDown(self):
         flask_testing.TestCase.tearDown(self)
@@ -184,9 +188,12 @@ class MainTestCase(flask_testing.TestCase):
                                        'artist_credit_name', 'artist_mbids', 'release_name', 'recording_name',
                                        'release_mbid', 'recording_mbid', 'artist_credit_id'])
 
-    @patch('typesense.documents.Documents.search')
-    def test_fetch(self, search):
-        search.side_effect = typesense_response_0
+    @patch('typesense.multi_search.MultiSearch.perform')
+    def test_fetch(self, perform):
+        perform.side_effect = [
+            {"results": typesense_response_0[:3]},
+            {"results": typesense_response_0[3:]}
+        ]
 
         q = MBIDMappingQuery()
         resp = q.fetch(json_request_0)
@@ -194,10 +201,17 @@ class MainTestCase(flask_testing.TestCase):
         self.assertDictEqual(resp[0], json_response_0[0])
         self.assertDictEqual(resp[1], json_response_0[1])
         self.assertDictEqual(resp[2], json_response_0[2])
+        self.assertEqual(perform.call_count, 2)
+
+        # identical searches are answered from the cache
+        resp = q.fetch(json_request_0[1:2])
+        self.assertEqual(resp[0]["recording_mbid"], json_response_0[1]["recording_mbid"])
+        self.assertEqual(resp[0]["index"], 0)
+        self.assertEqual(perform.call_count, 2)
 
-    @patch('typesense.documents.Documents.search')
-    def test_fetch_without_stop_words(self, search):
-        search.side_effect = typesense_response_1
+    @patch('typesense.multi_search.MultiSearch.perform')
+    def test_fetch_without_stop_words(self, perform):
+        perform.side_effect = [{"results": typesense_response_1}]
 
         q = MBIDMappingQuery(remove_stop_words=True)
         resp = q.fetch(json_request_1)
@@ -37,7 +37,23 @@ def convert_comma_seperated_string_to_list(string):
 
 
 class Listen(object):
-    """ Represents a listen object """
+    """ Represents a listen object
+
+    Millions of these are created by the timescale writer, the websockets dispatcher and the listen
+    fetchers, so instances use __slots__ instead of a per-instance dict. The datetime for integer
+    timestamps and the flattened additional_info are only computed when first accessed.
+    """
+
+    __slots__ = (
+        'user_id',
+        'user_name',
+        'ts_since_epoch',
+        '_timestamp',
+        'recording_msid',
+        'inserted_timestamp',
+        '_data',
+        '_flattened',
+    )
 
     # keys that we use ourselves for private usage
     PRIVATE_KEYS = (
@@ -76,49 +92,78 @@ class Listen(object):
         # determine the type of timestamp and do the right thing
         if isinstance(timestamp, int) or isinstance(timestamp, float):
             self.ts_since_epoch = int(timestamp)
-            self.timestamp = datetime.utcfromtimestamp(self.ts_since_epoch)
+            self._timestamp = None  # converted to a datetime on first access
         else:
             if timestamp:
-                self.timestamp = timestamp
-                self.ts_since_epoch = int(self.timestamp.timestamp())
+                self._timestamp = timestamp
+                self.ts_since_epoch = int(timestamp.timestamp())
             else:
-                self.timestamp = None
+                self._timestamp = None
                 self.ts_since_epoch = None
 
         self.recording_msid = recording_msid
         self.inserted_timestamp = inserted_timestamp
         if data is None:
-            self.data = {'additional_info': {}}
+            self._data = {'additional_info': {}}
+            self._flattened = True
         else:
+            self._data = data
+            self._flattened = False
+
+    @property
+    def timestamp(self):
+        if self._timestamp is None and self.ts_since_epoch is not None:
+            self._timestamp = datetime.utcfromtimestamp(self.ts_since_epoch)
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self._timestamp = value
+
+    @property
+    def data(self):
+        if not self._flattened:
             try:
-                flattened_data = flatten_dict(data['additional_info'])
-                data['additional_info'] = flattened_data
+                additional_info = self._data['additional_info']
+                # most submissions have a flat additional_info already, only copy it if needed
+                if any(isinstance(value, dict) for value in additional_info.values()):
+                    self._data['additional_info'] = flatten_dict(additional_info)
             except TypeError:
                 # TypeError may occur here because PostgresListenStore passes strings
                 # to data sometimes. If that occurs, we don't need to do anything.
                 pass
+            self._flattened = True
+        return self._data
 
-            self.data = data
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._flattened = True
 
     @classmethod
     def from_json(cls, j):
         """Factory to make Listen() objects from a dict"""
         # Let's go play whack-a-mole with our lovely whicket of timestamp fields. Hopefully one will work!
         try:
-            j['listened_at'] = datetime.utcfromtimestamp(float(j['listened_at']))
+            listened_at = float(j['listened_at'])
         except KeyError:
             try:
-                j['listened_at'] = datetime.utcfromtimestamp(float(j['timestamp']))
+                listened_at = float(j['timestamp'])
             except KeyError:
-                j['listened_at'] = datetime.utcfromtimestamp(float(j['ts_since_epoch']))
+                listened_at = float(j['ts_since_epoch'])
 
-        return cls(
+        j['listened_at'] = datetime.utcfromtimestamp(listened_at)
+
+        listen = cls(
             user_id=j.get('user_id'),
             user_name=j.get('user_name'),
-            timestamp=j['listened_at'],
+            timestamp=int(listened_at),
             recording_msid=j.get('recording_msid'),
             data=j.get('track_metadata')
         )
+        # reuse the datetime computed above instead of converting it back and forth again
+        listen._timestamp = j['listened_at']
+        return listen
 
     @classmethod
     def from_timescale(cls, listened_at, user_id, created, recording_msid, track_metadata,
@@ -185,7 +230,7 @@ class Listen(object):
         return {
             'user_id': self.user_id,
             'user_name': self.user_name,
-            'timestamp': int(self.timestamp.timestamp()) if self.timestamp else None,
+            'timestamp': self.ts_since_epoch,
             'track_metadata': self.data,
             'recording_msid': self.recording_msid
         }
@@ -198,7 +243,15 @@ class Listen(object):
 
     def __repr__(self):
         from pprint import pformat
-        return pformat(vars(self))
+        return pformat({
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'timestamp': self.timestamp,
+            'ts_since_epoch': self.ts_since_epoch,
+            'recording_msid': self.recording_msid,
+            'inserted_timestamp': self.inserted_timestamp,
+            'data': self.data,
+        })
 
     def __unicode__(self):
         return "<Listen: user_name: %s, time: %s, recording_msid: %s, artist_name: %s, track_name: %s>" % \
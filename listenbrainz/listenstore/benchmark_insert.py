@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+""" Compare the execute_values and the COPY paths of TimescaleListenStore.insert.
+
+Inserts batches of generated listens for a dedicated benchmark user id, which are deleted
+again after each run. Only run this against a development or test database.
+
+    python3 -m listenbrainz.listenstore.benchmark_insert --sizes 100,1000,10000,100000 --runs 3
+"""
+import statistics
+import time
+import uuid
+
+import click
+from sqlalchemy import text
+
+from listenbrainz.db import timescale
+from listenbrainz.listen import Listen
+from listenbrainz.webserver import create_app, timescale_connection
+
+# no real user will ever have this id
+BENCHMARK_USER_ID = -1
+BENCHMARK_START_TS = 1400000000
+
+
+def generate_listens(count: int) -> list[Listen]:
+    listens = []
+    for i in range(count):
+        listens.append(Listen(
+            user_id=BENCHMARK_USER_ID,
+            user_name="benchmark",
+            timestamp=BENCHMARK_START_TS + i,
+            recording_msid=str(uuid.uuid4()),
+            data={
+                "artist_name": "Frank Ocean",
+                "track_name": f"Pretty Sweet {i}",
+                "release_name": "Blond",
+                "additional_info": {
+                    "track_number": "5",
+                    "duration_ms": 158000,
+                    "submission_client": "benchmark",
+                },
+            },
+        ))
+    return listens
+
+
+def cleanup():
+    with timescale.engine.begin() as connection:
+        connection.execute(text("DELETE FROM listen WHERE user_id = :user_id"), {"user_id": BENCHMARK_USER_ID})
+        connection.execute(text("DELETE FROM listen_user_metadata WHERE user_id = :user_id"), {"user_id": BENCHMARK_USER_ID})
+
+
+def time_insert(listens: list[Listen], use_copy: bool) -> float:
+    cleanup()
+    start = time.monotonic()
+    inserted = timescale_connection._ts.insert(listens, use_copy=use_copy)
+    elapsed = time.monotonic() - start
+    if len(inserted) != len(listens):
+        raise RuntimeError(f"Expected {len(listens)} inserted listens, got {len(inserted)}")
+    return elapsed
+
+
+@click.command()
+@click.option("--sizes", default="100,1000,10000,100000", help="comma separated batch sizes to benchmark")
+@click.option("--runs", default=3, help="number of runs per batch size and path")
+def main(sizes, runs):
+    app = create_app()
+    with app.app_context():
+        print(f"{'rows':>8} {'path':>14} {'median (s)':>12} {'min (s)':>10} {'rows/s':>10}")
+        try:
+            for size in [int(s) for s in sizes.split(",")]:
+                listens = generate_listens(size)
+                for path, use_copy in [("execute_values", False), ("copy", True)]:
+                    timings = [time_insert(listens, use_copy) for _ in range(runs)]
+                    median = statistics.median(timings)
+                    print(f"{size:>8} {path:>14} {median:>12.3f} {min(timings):>10.3f} {size / median:>10.0f}")
+        finally:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 from datetime import datetime
+from unittest import mock
 
+from brainzutils import cache
 from sqlalchemy import text
 
 import listenbrainz.db.user as db_user
 from listenbrainz.db import timescale
 
 from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore
+from listenbrainz.listenstore.timescale_listenstore import REDIS_USER_LISTEN_COUNT, REDIS_USER_TIMESTAMPS
 from listenbrainz.listenstore.timescale_utils import recalculate_all_user_data, update_user_listen_data, \
-    delete_listens
+    delete_listens, sync_user_listen_data_to_cache
 from listenbrainz.tests.integration import NonAPIIntegrationTestCase
 from listenbrainz.webserver import timescale_connection, redis_connection
 
@@ -81,3 +84,24 @@ class TestTimescaleUtils(NonAPIIntegrationTestCase):
         self.assertEqual(metadata_2["min_listened_at"], datetime.utcfromtimestamp(1400000000))
         self.assertEqual(metadata_2["max_listened_at"], datetime.utcfromtimestamp(1400000200))
         self.assertEqual(metadata_2["count"], 4)
+
+    @mock.patch("listenbrainz.listenstore.timescale_utils.USER_LISTEN_DATA_CACHE_BATCH_SIZE", 1)
+    def test_sync_user_listen_data_to_cache(self):
+        users = [db_user.get_or_create(self.db_conn, i, f"user_{i}") for i in range(1, 4)]
+        recalculate_all_user_data()
+        for user in users:
+            self._create_test_data(user)
+
+        # the cached values drift from listen_user_metadata, e.g. because listens were deleted
+        for user in users:
+            cache.set(REDIS_USER_LISTEN_COUNT + str(user["id"]), 100, expirein=0)
+            cache.delete(REDIS_USER_TIMESTAMPS + str(user["id"]))
+
+        sync_user_listen_data_to_cache()
+        for user in users:
+            self.assertIsNotNone(cache.get(REDIS_USER_TIMESTAMPS + str(user["id"])))
+            self.assertEqual(self.ls.get_listen_count_for_user(user["id"]), 5)
+            self.assertEqual(
+                self.ls.get_timestamps_for_user(user["id"]),
+                (datetime.utcfromtimestamp(1400000000), datetime.utcfromtimestamp(1400000200))
+            )
@@ -1,7 +1,8 @@
 import logging
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from time import time
+from unittest.mock import patch
 
 import sqlalchemy
 from brainzutils import cache
@@ -10,9 +11,9 @@ from sqlalchemy import text
 import listenbrainz.db.user as db_user
 from listenbrainz.db import timescale as ts, timescale
 from listenbrainz.db.testing import DatabaseTestCase, TimescaleTestCase
-from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore
+from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore, generate_data
 from listenbrainz.listenstore.timescale_listenstore import REDIS_USER_LISTEN_COUNT, \
-    TimescaleListenStore, REDIS_TOTAL_LISTEN_COUNT
+    TimescaleListenStore, REDIS_TOTAL_LISTEN_COUNT, REDIS_USER_TIMESTAMPS, cache_user_listen_metadata
 from listenbrainz.listenstore.timescale_utils import delete_listens_and_update_user_listen_data,\
     recalculate_all_user_data, add_missing_to_listen_users_metadata, update_user_listen_data
 from listenbrainz.webserver import create_app
@@ -87,6 +88,20 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         listens, min_ts, max_ts = self.logstore.fetch_listens(user=self.testuser, from_ts=from_ts)
         self.assertEqual(len(listens), count)
 
+    def test_insert_timescale_copy(self):
+        listens = generate_data(self.testuser_id, self.testuser_name, 1400000000, 250)
+        inserted = self.logstore.insert(listens, use_copy=True)
+        self.assertEqual(len(inserted), 250)
+
+        # duplicates are skipped on the copy path too
+        more_listens = generate_data(self.testuser_id, self.testuser_name, 1400000250, 5)
+        inserted = self.logstore.insert(listens[:5] + more_listens, use_copy=True)
+        self.assertCountEqual(
+            [(row[0], row[1], str(row[2])) for row in inserted],
+            [(listen.timestamp.replace(tzinfo=timezone.utc), listen.user_id, listen.recording_msid) for listen in more_listens]
+        )
+        self.assertEqual(self.logstore.get_listen_count_for_user(self.testuser_id), 255)
+
     def test_fetch_listens_0(self):
         self._create_test_data(self.testuser_name, self.testuser_id)
         from_ts = datetime.utcfromtimestamp(1400000000)
@@ -170,6 +185,40 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(listens[2].ts_since_epoch, 1400000050)
         self.assertEqual(listens[3].ts_since_epoch, 1400000000)
 
+    def test_fetch_listens_page(self):
+        self._create_test_data(self.testuser_name, self.testuser_id,
+                               test_data_file_name='timescale_listenstore_test_listens_over_greater_time_range.json')
+
+        listens, min_ts, max_ts, cursor = self.logstore.fetch_listens_page(user=self.testuser, limit=3)
+        self.assertEqual([listen.ts_since_epoch for listen in listens], [1420000050, 1420000000, 1400000050])
+        self.assertEqual(min_ts, datetime.utcfromtimestamp(1400000000))
+        self.assertEqual(max_ts, datetime.utcfromtimestamp(1420000050))
+
+        listens, _, _, cursor = self.logstore.fetch_listens_page(user=self.testuser, cursor=cursor, limit=3)
+        self.assertEqual([listen.ts_since_epoch for listen in listens], [1400000000])
+        self.assertIsNone(cursor)
+
+        to_ts = datetime.utcfromtimestamp(1420000000)
+        listens, _, _, cursor = self.logstore.fetch_listens_page(user=self.testuser, to_ts=to_ts, limit=1)
+        self.assertEqual([listen.ts_since_epoch for listen in listens], [1400000050])
+        self.assertIsNotNone(cursor)
+
+        # a full page ending at the oldest listen has a next page, which is empty
+        listens, _, _, cursor = self.logstore.fetch_listens_page(user=self.testuser, limit=4)
+        self.assertEqual(listens[-1].ts_since_epoch, 1400000000)
+        self.assertIsNotNone(cursor)
+        listens, _, _, cursor = self.logstore.fetch_listens_page(user=self.testuser, cursor=cursor, limit=4)
+        self.assertEqual(listens, [])
+        self.assertIsNone(cursor)
+
+        with self.assertRaises(ValueError):
+            self.logstore.fetch_listens_page(user=self.testuser, cursor="invalid")
+
+        # listens newer than the timestamps cached in redis are still returned
+        cache.set(REDIS_USER_TIMESTAMPS + str(self.testuser_id), [0, 1400000000 * 1000000], expirein=0)
+        listens, _, _, _ = self.logstore.fetch_listens_page(user=self.testuser, limit=1)
+        self.assertEqual([listen.ts_since_epoch for listen in listens], [1420000050])
+
     def test_fetch_listens_with_mapping(self):
         """ Test that the recording mbid submitted by the user is preferred over the mapping created by LB """
         self._create_test_data(self.testuser_name, self.testuser_id)
@@ -180,6 +229,13 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(listens[0].data["mbid_mapping"]["artist_mbids"], ['678d88b2-87b0-403b-b63d-5da7465aecc3'])
         self.assertEqual(listens[0].data["mbid_mapping"]["release_mbid"], '93ac1812-d38d-4125-88e8-8440e3e89072')
         self.assertEqual(listens[0].data["mbid_mapping"]["recording_mbid"], '2cfad207-3f55-4aec-8120-86cf66e34d59')
+        self.assertEqual(listens[0].data["mbid_mapping"]["recording_name"], 'Immigrant Song')
+        self.assertEqual(listens[0].data["mbid_mapping"]["artists"], [{
+            "artist_mbid": '678d88b2-87b0-403b-b63d-5da7465aecc3',
+            "artist_credit_name": "Led Zeppelin",
+            "join_phrase": ""
+        }])
+        self.assertEqual(listens[0].data["mbid_mapping"]["caa_id"], 1287533205)
 
     def test_get_listen_count_for_user(self):
         uid = random.randint(2000, 1 << 31)
@@ -219,6 +275,53 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(count, self.logstore.get_listen_count_for_user(testuser["id"]))
         self.assertEqual(count, cache.get(user_key))
 
+    def test_listen_metadata_materialized_on_insert(self):
+        uid = random.randint(2000, 1 << 31)
+        testuser = db_user.get_or_create(self.db_conn, uid, "user_%d" % uid)
+        count = self._create_test_data(testuser["musicbrainz_id"], testuser["id"], recalculate=False)
+
+        # the values are written to redis by the insert, without any expiry
+        self.assertEqual(cache.get(REDIS_USER_LISTEN_COUNT + str(testuser["id"])), count)
+        self.assertEqual(cache._r.ttl(cache._prep_key(REDIS_USER_LISTEN_COUNT + str(testuser["id"]))), -1)
+        self.assertIsNotNone(cache.get(REDIS_USER_TIMESTAMPS + str(testuser["id"])))
+
+        with timescale.engine.begin() as connection:
+            connection.execute(text("DELETE FROM listen_user_metadata WHERE user_id = :user_id"), {"user_id": testuser["id"]})
+        self.assertEqual(self.logstore.get_listen_count_for_user(testuser["id"]), count)
+        min_ts, max_ts = self.logstore.get_timestamps_for_user(testuser["id"])
+        self.assertEqual(min_ts, datetime.utcfromtimestamp(1400000000))
+        self.assertEqual(max_ts, datetime.utcfromtimestamp(1400000200))
+
+        self.logstore.delete(testuser["id"])
+        self.assertIsNone(cache.get(REDIS_USER_LISTEN_COUNT + str(testuser["id"])))
+        self.assertIsNone(cache.get(REDIS_USER_TIMESTAMPS + str(testuser["id"])))
+
+    def test_listen_metadata_cached_under_row_lock(self):
+        uid = random.randint(2000, 1 << 31)
+        testuser = db_user.get_or_create(self.db_conn, uid, "user_%d" % uid)
+        self._create_test_data(testuser["musicbrainz_id"], testuser["id"], recalculate=False)
+
+        def assert_row_locked(rows):
+            # the values must be written to redis before the insert releases the lock on the row, so that
+            # a concurrent insert for the same user can only write its newer values after these.
+            with timescale.engine.connect() as connection:
+                with self.assertRaises(sqlalchemy.exc.OperationalError):
+                    connection.execute(
+                        text("SELECT * FROM listen_user_metadata WHERE user_id = :user_id FOR UPDATE NOWAIT"),
+                        {"user_id": testuser["id"]}
+                    )
+            cache_user_listen_metadata(rows)
+
+        listens = create_test_data_for_timescalelistenstore(testuser["musicbrainz_id"], testuser["id"])
+        for listen in listens:
+            listen.ts_since_epoch += 1000
+            listen.timestamp = datetime.utcfromtimestamp(listen.ts_since_epoch)
+        with patch("listenbrainz.listenstore.timescale_listenstore.cache_user_listen_metadata",
+                   side_effect=assert_row_locked) as mock_cache:
+            self.logstore.insert(listens)
+        mock_cache.assert_called_once()
+        self.assertEqual(cache.get(REDIS_USER_LISTEN_COUNT + str(testuser["id"])), 2 * len(listens))
+
     def test_delete_listens(self):
         uid = random.randint(2000, 1 << 31)
         testuser = db_user.get_or_create(self.db_conn, uid, "user_%d" % uid)
@@ -1,8 +1,13 @@
+import base64
+import binascii
+import csv
+import io
 import subprocess
 import tarfile
 import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, List
 
 import psycopg2
 import psycopg2.sql
@@ -11,20 +16,22 @@ import orjson
 from brainzutils import cache
 from psycopg2.errors import UntranslatableCharacter
 from psycopg2.extras import execute_values
-from sqlalchemy import text
 
 from listenbrainz.db import timescale, DUMP_DEFAULT_THREAD_COUNT
 from listenbrainz.db.dump import SchemaMismatchException
+from listenbrainz.db.recording_metadata import get_metadata_for_listens
 from listenbrainz.listen import Listen
-from listenbrainz.listenstore import LISTENS_DUMP_SCHEMA_VERSION, LISTEN_MINIMUM_DATE
+from listenbrainz.listenstore import LISTENS_DUMP_SCHEMA_VERSION
 from listenbrainz.listenstore import ORDER_ASC, ORDER_TEXT, ORDER_DESC, DEFAULT_LISTENS_PER_FETCH
 from listenbrainz.webserver import ts_conn
 
-# Append the user name for both of these keys
+# Append the user id for both of these keys. The listen count and the [min_ts, max_ts] of a user are materialized
+# in redis without an expiry, they are updated whenever listens of the user are inserted and reconciled with
+# listen_user_metadata periodically, see sync_user_listen_data_to_cache in timescale_utils.
 REDIS_USER_LISTEN_COUNT = "lc."
 REDIS_USER_TIMESTAMPS = "ts."
 REDIS_TOTAL_LISTEN_COUNT = "lc-total"
-# cache listen counts for 5 minutes only, so that listen counts are always up-to-date in 5 minutes.
+# cache the total listen count for 5 minutes only, so that it is always up-to-date in 5 minutes.
 REDIS_USER_LISTEN_COUNT_EXPIRY = 300
 
 DUMP_CHUNK_SIZE = 100000
@@ -40,6 +47,99 @@ LISTEN_COUNT_BUCKET_WIDTH = 2592000
 
 MAX_FUTURE_SECONDS = timedelta(seconds=1)  # 10 mins in future - max fwd clock skew
 EPOCH = datetime.utcfromtimestamp(0)
+EPOCH_UTC = datetime.fromtimestamp(0, tz=timezone.utc)
+
+# insert the listens, skipping duplicates, and update the listen counts and timestamps of the affected users.
+# %s is either the VALUES list for execute_values or a SELECT from the staging table in case of COPY inserts.
+INSERT_LISTENS_QUERY = """
+    WITH inserted_listens AS (
+        INSERT INTO listen (listened_at, user_id, recording_msid, data)
+             %s
+        ON CONFLICT (listened_at, user_id, recording_msid)
+         DO NOTHING
+          RETURNING listened_at, user_id, recording_msid
+    ), metadata AS (
+        INSERT INTO listen_user_metadata AS lum (user_id, count, min_listened_at, max_listened_at, created)
+             SELECT user_id, count(*), min(listened_at), max(listened_at), NOW()
+               FROM inserted_listens
+           GROUP BY user_id
+        ON CONFLICT (user_id)
+          DO UPDATE
+                SET count = lum.count + excluded.count
+                  , min_listened_at = least(lum.min_listened_at, excluded.min_listened_at)
+                  , max_listened_at = greatest(lum.max_listened_at, excluded.max_listened_at)
+                  , created = excluded.created
+    ) SELECT * FROM inserted_listens
+"""
+
+# select the listens in the page CTE along with the recording mbid they are mapped to. the metadata of the
+# recordings is looked up afterwards in one batch using get_metadata_for_listens. the ORDER BY clause is left
+# to the caller.
+SELECT_LISTENS_WITH_RECORDING_MBID = """
+    SELECT l.listened_at
+         , l.created
+         , l.user_id
+         , l.recording_msid::TEXT
+         , l.data
+         -- prefer to use user submitted mbid, then user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
+         , COALESCE((data->'additional_info'->>'recording_mbid')::uuid, user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid)::TEXT AS recording_mbid
+      FROM page l
+ LEFT JOIN mbid_mapping mm
+        ON l.recording_msid = mm.recording_msid
+ LEFT JOIN mbid_manual_mapping user_mm
+        ON l.recording_msid = user_mm.recording_msid
+       AND user_mm.user_id = l.user_id
+ LEFT JOIN mbid_manual_mapping_top other_mm
+        ON l.recording_msid = other_mm.recording_msid
+"""
+
+
+def encode_listens_cursor(listened_at: datetime, recording_msid: str) -> str:
+    """ Encode the position of a listen into an opaque cursor for fetch_listens_page """
+    data = orjson.dumps([listened_at.timestamp(), recording_msid])
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_listens_cursor(cursor: str) -> Tuple[datetime, str]:
+    """ Decode a cursor created by encode_listens_cursor, raises ValueError if the cursor is invalid. """
+    try:
+        ts, msid = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromtimestamp(float(ts), tz=timezone.utc), str(uuid.UUID(msid))
+    except (binascii.Error, orjson.JSONDecodeError, UnicodeEncodeError, TypeError, ValueError, OverflowError):
+        raise ValueError("Invalid cursor")
+
+
+def _encode_listen_ts(ts: Optional[datetime]) -> Optional[int]:
+    """ Encode a listen timestamp as microseconds since epoch, to store it in redis without loss of precision """
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - EPOCH_UTC) // timedelta(microseconds=1)
+
+
+def _decode_listen_ts(value: Optional[int]) -> datetime:
+    """ Decode a timestamp encoded by _encode_listen_ts to a naive datetime in UTC, EPOCH if missing """
+    if value is None:
+        return EPOCH
+    return EPOCH + timedelta(microseconds=value)
+
+
+def cache_user_listen_metadata(rows):
+    """ Materialize the listen count and the listen timestamps of users in redis.
+
+        Args:
+            rows: (user_id, count, min_listened_at, max_listened_at) tuples from the listen_user_metadata table
+    """
+    data = {}
+    for user_id, count, min_listened_at, max_listened_at in rows:
+        data[REDIS_USER_LISTEN_COUNT + str(user_id)] = count
+        data[REDIS_USER_TIMESTAMPS + str(user_id)] = [
+            _encode_listen_ts(min_listened_at),
+            _encode_listen_ts(max_listened_at)
+        ]
+    if data:
+        cache.set_many(data, expirein=0)
 
 
 class TimescaleListenStore:
@@ -57,51 +157,58 @@ class TimescaleListenStore:
         ts_conn.execute(sqlalchemy.text(query), {"user_id": user_id})
         ts_conn.commit()
 
+    def _load_user_listen_metadata(self, user_id: int):
+        """ Load the listen count and timestamps of the user from the listen_user_metadata table and
+         materialize them in redis. Returns None if the user has no entry in the table.
+
+         The row is locked with FOR SHARE until the values are in redis, like in sync_user_listen_data_to_cache,
+         so that a concurrent insert cannot write newer values to redis before these older ones.
+        """
+        query = """
+            SELECT count
+                 , min_listened_at
+                 , max_listened_at
+              FROM listen_user_metadata
+             WHERE user_id = :user_id
+               FOR SHARE
+        """
+        with timescale.engine.connect() as connection:
+            row = connection.execute(sqlalchemy.text(query), {"user_id": user_id}).fetchone()
+            if row is not None:
+                cache_user_listen_metadata([(user_id, row.count, row.min_listened_at, row.max_listened_at)])
+            connection.commit()
+        return row
+
     def get_listen_count_for_user(self, user_id: int):
         """Get the total number of listens for a user.
 
-         The number of listens comes from cache if available otherwise the get the
-         listen count from the database. To get the listen count from the database,
-         query listen_user_metadata table for the count and the timestamp till which we
-         already have counted. Then scan the listens created later than that timestamp
-         to get the remaining count. Add the two counts to get total listen count.
+         The listen count is materialized in redis and updated whenever listens for the user are
+         inserted. If it is missing from the cache, the count is read from the listen_user_metadata
+         table and materialized again.
 
         Args:
             user_id: the user to get listens for
         """
         cached_count = cache.get(REDIS_USER_LISTEN_COUNT + str(user_id))
-        if cached_count:
+        if cached_count is not None:
             return cached_count
 
-        query = "SELECT count, created FROM listen_user_metadata WHERE user_id = :user_id"
-        result = ts_conn.execute(sqlalchemy.text(query), {"user_id": user_id})
-        row = result.fetchone()
-        if row:
-            count, created = row.count, row.created
-        else:
-            # we can reach here only in tests, because we create entries in listen_user_metadata
-            # table when user signs up and for existing users an entry should always exist.
-            count, created = 0, LISTEN_MINIMUM_DATE
-
-        cache.set(REDIS_USER_LISTEN_COUNT + str(user_id), count, REDIS_USER_LISTEN_COUNT_EXPIRY)
-        return count
+        row = self._load_user_listen_metadata(user_id)
+        # we can reach here without a row only in tests, because we create entries in listen_user_metadata
+        # table when user signs up and for existing users an entry should always exist.
+        return row.count if row else 0
 
     def get_timestamps_for_user(self, user_id: int) -> Tuple[Optional[datetime], Optional[datetime]]:
-        """ Return the min_ts and max_ts for the given list of users """
-        query = """
-            SELECT COALESCE(min_listened_at, 'epoch'::timestamptz) AS min_ts
-                 , COALESCE(max_listened_at, 'epoch'::timestamptz) AS max_ts
-              FROM listen_user_metadata
-             WHERE user_id = :user_id
-        """
-        result = ts_conn.execute(text(query), {"user_id": user_id})
-        row = result.fetchone()
+        """ Return the min_ts and max_ts for the given user, served from redis if available """
+        cached_timestamps = cache.get(REDIS_USER_TIMESTAMPS + str(user_id))
+        if cached_timestamps is not None:
+            return _decode_listen_ts(cached_timestamps[0]), _decode_listen_ts(cached_timestamps[1])
+
+        row = self._load_user_listen_metadata(user_id)
         if row is None:
-            min_ts = max_ts = EPOCH
-        else:
-            min_ts = row.min_ts
-            max_ts = row.max_ts
-        return min_ts.replace(tzinfo=None), max_ts.replace(tzinfo=None)
+            return EPOCH, EPOCH
+        return _decode_listen_ts(_encode_listen_ts(row.min_listened_at)), \
+            _decode_listen_ts(_encode_listen_ts(row.max_listened_at))
 
     def get_total_listen_count(self):
         """ Returns the total number of listens stored in the ListenStore.
@@ -126,55 +233,67 @@ class TimescaleListenStore:
         cache.set(REDIS_TOTAL_LISTEN_COUNT, count, expirein=REDIS_USER_LISTEN_COUNT_EXPIRY)
         return count
 
-    def insert(self, listens):
+    def insert(self, listens, use_copy=False):
         """
             Insert a batch of listens. Returns a list of (listened_at, track_name, user_name, user_id) that indicates
             which rows were inserted into the DB. If the row is not listed in the return values, it was a duplicate.
-        """
-
-        submit = []
-        for listen in listens:
-            submit.append(listen.to_timescale())
 
-        query = """
-            WITH inserted_listens AS (
-                INSERT INTO listen (listened_at, user_id, recording_msid, data)
-                     VALUES %s
-                ON CONFLICT (listened_at, user_id, recording_msid)
-                 DO NOTHING
-                  RETURNING listened_at, user_id, recording_msid
-            ), metadata AS (
-                INSERT INTO listen_user_metadata AS lum (user_id, count, min_listened_at, max_listened_at, created)
-                     SELECT user_id, count(*), min(listened_at), max(listened_at), NOW()
-                       FROM inserted_listens
-                   GROUP BY user_id
-                ON CONFLICT (user_id)
-                  DO UPDATE
-                        SET count = lum.count + excluded.count
-                          , min_listened_at = least(lum.min_listened_at, excluded.min_listened_at)
-                          , max_listened_at = greatest(lum.max_listened_at, excluded.max_listened_at)
-                          , created = excluded.created
-            ) SELECT * FROM inserted_listens
+            If use_copy is True, the listens are streamed into a temporary staging table using COPY and inserted
+            into the listen table from there. This is faster for large batches, like dump imports.
         """
-
-        inserted_rows = []
         conn = timescale.engine.raw_connection()
-        with conn.cursor() as curs:
-            try:
-                execute_values(curs, query, submit, template=None)
-                while True:
-                    result = curs.fetchone()
-                    if not result:
-                        break
-                    inserted_rows.append((result[0], result[1], result[2]))
-            except UntranslatableCharacter:
-                conn.rollback()
-                return
-
-        conn.commit()
+        try:
+            with conn.cursor() as curs:
+                try:
+                    if use_copy:
+                        self._copy_listens_to_staging(curs, listens)
+                        curs.execute(INSERT_LISTENS_QUERY % "SELECT * FROM listen_staging")
+                        results = curs.fetchall()
+                    else:
+                        submit = [listen.to_timescale() for listen in listens]
+                        # fetch=True to collect the inserted rows of all the pages and not only the last one
+                        results = execute_values(curs, INSERT_LISTENS_QUERY % "VALUES %s", submit, fetch=True)
+                    inserted_rows = [(result[0], result[1], result[2]) for result in results]
+                except UntranslatableCharacter:
+                    conn.rollback()
+                    return
+
+                # read the updated listen counts and timestamps of the affected users in the same transaction
+                # and write them to redis before committing. the rows stay locked by the insert till commit, so
+                # a concurrent writer for the same user waits for us and always writes its newer values after ours.
+                user_ids = list({row[1] for row in inserted_rows})
+                if user_ids:
+                    curs.execute("""
+                        SELECT user_id, count, min_listened_at, max_listened_at
+                          FROM listen_user_metadata
+                         WHERE user_id = ANY(%s)
+                    """, (user_ids,))
+                    cache_user_listen_metadata(curs.fetchall())
+
+            conn.commit()
+        finally:
+            conn.close()
 
         return inserted_rows
 
+    @staticmethod
+    def _copy_listens_to_staging(curs, listens):
+        """ Create a temporary staging table, dropped at the end of the transaction, and COPY the listens into it. """
+        curs.execute("""
+            CREATE TEMPORARY TABLE listen_staging (
+                listened_at     TIMESTAMP WITH TIME ZONE NOT NULL,
+                user_id         INTEGER NOT NULL,
+                recording_msid  UUID NOT NULL,
+                data            JSONB NOT NULL
+            ) ON COMMIT DROP
+        """)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for listen in listens:
+            writer.writerow(listen.to_timescale())
+        buffer.seek(0)
+        curs.copy_expert("COPY listen_staging (listened_at, user_id, recording_msid, data) FROM STDIN WITH CSV", buffer)
+
     def fetch_listens(self, user: Dict, from_ts: datetime = None, to_ts: datetime = None, limit: int = DEFAULT_LISTENS_PER_FETCH):
         """ The timestamps are stored as UTC in the postgres datebase while on retrieving
             the value they are converted to the local server's timezone. So to compare
@@ -205,59 +324,19 @@ class TimescaleListenStore:
 
         window_size = DEFAULT_FETCH_WINDOW
         query = """
-                   WITH selected_listens AS (
-                        SELECT l.listened_at
-                             , l.created
-                             , l.user_id
-                             , l.recording_msid
-                             , l.data
-                             -- prefer to use user submitted mbid, then user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
-                             , COALESCE((data->'additional_info'->>'recording_mbid')::uuid, user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid) AS recording_mbid
-                          FROM listen l
-                     LEFT JOIN mbid_mapping mm
-                            ON l.recording_msid = mm.recording_msid
-                     LEFT JOIN mbid_manual_mapping user_mm
-                            ON l.recording_msid = user_mm.recording_msid
-                           AND user_mm.user_id = l.user_id 
-                     LEFT JOIN mbid_manual_mapping_top other_mm
-                            ON l.recording_msid = other_mm.recording_msid
-                         WHERE l.user_id = :user_id
-                           AND listened_at > :from_ts
-                           AND listened_at < :to_ts
-                   )
-                   SELECT listened_at
-                        , user_id
-                        , created
-                        , sl.recording_msid::TEXT
-                        , data
-                        , sl.recording_mbid
-                        , mbc.recording_data->>'name' AS recording_name
-                        , mbc.release_mbid
-                        , mbc.artist_mbids::TEXT[]
-                        , (mbc.release_data->>'caa_id')::bigint AS caa_id
-                        , mbc.release_data->>'caa_release_mbid' AS caa_release_mbid
-                        , array_agg(artist->>'name' ORDER BY position) AS ac_names
-                        , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases
-                     FROM selected_listens sl
-                LEFT JOIN mapping.mb_metadata_cache mbc
-                       ON sl.recording_mbid = mbc.recording_mbid
-        LEFT JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
-                       ON TRUE
-                 GROUP BY listened_at
-                        , sl.recording_msid
-                        , user_id
-                        , created
-                        , data
-                        , sl.recording_mbid
-                        , recording_data->>'name'
-                        , release_mbid
-                        , artist_mbids
-                        , artist_data->>'name'
-                        , recording_data->>'name'
-                        , release_data->>'name'
-                        , release_data->>'caa_id'
-                        , release_data->>'caa_release_mbid'
-                 ORDER BY listened_at """ + ORDER_TEXT[order] + " LIMIT :limit"
+              WITH page AS (
+                    SELECT listened_at
+                         , created
+                         , user_id
+                         , recording_msid
+                         , data
+                      FROM listen
+                     WHERE user_id = :user_id
+                       AND listened_at > :from_ts
+                       AND listened_at < :to_ts
+                  ORDER BY listened_at """ + ORDER_TEXT[order] + """
+                     LIMIT :limit
+              ) """ + SELECT_LISTENS_WITH_RECORDING_MBID + " ORDER BY l.listened_at " + ORDER_TEXT[order]
 
         if from_ts and to_ts:
             to_dynamic = False
@@ -271,7 +350,7 @@ class TimescaleListenStore:
             to_dynamic = False
             from_dynamic = True
 
-        listens = []
+        rows = []
         done = False
 
         t0 = time.monotonic()
@@ -316,30 +395,16 @@ class TimescaleListenStore:
 
                     break
 
-                listens.append(Listen.from_timescale(
-                    listened_at=result.listened_at,
-                    user_id=result.user_id,
-                    created=result.created,
-                    recording_msid=result.recording_msid,
-                    track_metadata=result.data,
-                    recording_mbid=result.recording_mbid,
-                    recording_name=result.recording_name,
-                    release_mbid=result.release_mbid,
-                    artist_mbids=result.artist_mbids,
-                    ac_names=result.ac_names,
-                    ac_join_phrases=result.ac_join_phrases,
-                    user_name=user["musicbrainz_id"],
-                    caa_id=result.caa_id,
-                    caa_release_mbid=result.caa_release_mbid
-                ))
-
-                if len(listens) == limit:
+                rows.append(result)
+
+                if len(rows) == limit:
                     done = True
                     break
 
             if done:
                 break
 
+        listens = self._listens_from_rows(rows, {user["id"]: user["musicbrainz_id"]})
         fetch_listens_time = time.monotonic() - t0
 
         if order == ORDER_ASC:
@@ -349,6 +414,91 @@ class TimescaleListenStore:
 
         return listens, min_user_ts, max_user_ts
 
+    def fetch_listens_page(self, user: Dict, to_ts: datetime = None, cursor: str = None,
+                           limit: int = DEFAULT_LISTENS_PER_FETCH):
+        """ Fetch a page of listens of the user in descending order, seeking directly to the listens before
+            the given position using the (user_id, listened_at, recording_msid) index instead of searching in
+            expanding time windows like fetch_listens.
+
+            Returns a tuple of (listens, min_user_timestamp, max_user_timestamp, next_cursor). next_cursor is
+            None if there are no more listens, otherwise it can be passed to this method to fetch the next page.
+
+            to_ts: only return listens before this timestamp, cannot be combined with cursor
+            cursor: an opaque cursor returned by a previous call to fetch the following page
+            limit: the maximum number of items to return
+        """
+        if to_ts and cursor:
+            raise ValueError("to_ts and cursor cannot be used together")
+
+        min_user_ts, max_user_ts = self.get_timestamps_for_user(user["id"])
+        if min_user_ts == EPOCH and max_user_ts == EPOCH:
+            return [], min_user_ts, max_user_ts, None
+
+        # the seek is bounded by the index on (user_id, listened_at, recording_msid) and the limit, the user's
+        # timestamps are not used to bound it because the cached values may lag behind recently inserted listens.
+        filters = ["user_id = :user_id"]
+        args = {"user_id": user["id"], "limit": limit}
+        if cursor:
+            args["cursor_ts"], args["cursor_msid"] = decode_listens_cursor(cursor)
+            filters.append("(listened_at, recording_msid) < (:cursor_ts, CAST(:cursor_msid AS uuid))")
+        elif to_ts:
+            args["to_ts"] = to_ts
+            filters.append("listened_at < :to_ts")
+
+        query = f"""
+              WITH page AS (
+                    SELECT listened_at
+                         , created
+                         , user_id
+                         , recording_msid
+                         , data
+                      FROM listen
+                     WHERE {" AND ".join(filters)}
+                  ORDER BY listened_at DESC, recording_msid DESC
+                     LIMIT :limit
+              ) {SELECT_LISTENS_WITH_RECORDING_MBID}
+                 ORDER BY l.listened_at DESC, l.recording_msid DESC
+        """
+        t0 = time.monotonic()
+        result = ts_conn.execute(sqlalchemy.text(query), args)
+        listens = self._listens_from_rows(result.fetchall(), {user["id"]: user["musicbrainz_id"]})
+        self.log.info("fetch listens page %s %.2fs" % (user["musicbrainz_id"], time.monotonic() - t0))
+
+        # other listens may share the listened_at of the last one, so a full page always has a next page even if
+        # it turns out to be empty
+        next_cursor = None
+        if len(listens) == limit:
+            last = listens[-1]
+            next_cursor = encode_listens_cursor(last.timestamp, last.recording_msid)
+
+        return listens, min_user_ts, max_user_ts, next_cursor
+
+    @staticmethod
+    def _listens_from_rows(rows, user_names: Dict[int, str]) -> List[Listen]:
+        """ Create listens from rows returned by a query using SELECT_LISTENS_WITH_RECORDING_MBID, looking up
+         the metadata of all the recordings they are mapped to in one batch.
+
+        Args:
+            rows: the rows returned by the query
+            user_names: a map of the user ids to the user names of the users the listens belong to
+        """
+        recording_mbids = {row.recording_mbid for row in rows if row.recording_mbid is not None}
+        metadata = get_metadata_for_listens(ts_conn, recording_mbids)
+
+        listens = []
+        for row in rows:
+            listens.append(Listen.from_timescale(
+                listened_at=row.listened_at,
+                user_id=row.user_id,
+                created=row.created,
+                recording_msid=row.recording_msid,
+                track_metadata=row.data,
+                recording_mbid=row.recording_mbid,
+                user_name=user_names[row.user_id],
+                **metadata.get(row.recording_mbid, {})
+            ))
+        return listens
+
     def fetch_recent_listens_for_users(self, users, min_ts: datetime = None, max_ts: datetime = None, per_user_limit=2, limit=10):
         """ Fetch recent listens for a list of users, given a limit which applies per user. If you
             have a limit of 3 and 3 users you should get 9 listens if they are available.
@@ -380,78 +530,18 @@ class TimescaleListenStore:
                          , data
                          , row_number() OVER (PARTITION BY user_id ORDER BY listened_at DESC) AS rownum
                       FROM listen l
-                     WHERE {filters} 
-              ), selected_listens AS (
-                    SELECT l.*
-                        -- prefer to use user submitted mbid, then user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
-                         , COALESCE((data->'additional_info'->>'recording_mbid')::uuid, user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid) AS recording_mbid
-                      FROM intermediate l
-                 LEFT JOIN mbid_mapping mm
-                        ON l.recording_msid = mm.recording_msid
-                 LEFT JOIN mbid_manual_mapping user_mm
-                        ON l.recording_msid = user_mm.recording_msid
-                       AND user_mm.user_id = l.user_id 
-                 LEFT JOIN mbid_manual_mapping_top other_mm
-                        ON l.recording_msid = other_mm.recording_msid
+                     WHERE {filters}
+              ), page AS (
+                    SELECT *
+                      FROM intermediate
                      WHERE rownum <= :per_user_limit
-              )     SELECT user_id
-                         , listened_at
-                         , created
-                         , l.recording_msid::TEXT
-                         , data
-                         , l.recording_mbid
-                         , mbc.recording_data->>'name' AS recording_name
-                         , mbc.release_mbid
-                         , mbc.artist_mbids::TEXT[]
-                         , (mbc.release_data->>'caa_id')::bigint AS caa_id
-                         , mbc.release_data->>'caa_release_mbid' AS caa_release_mbid
-                         , array_agg(artist->>'name' ORDER BY position) AS ac_names
-                         , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases            
-                      FROM selected_listens l
-                 LEFT JOIN mapping.mb_metadata_cache mbc
-                        ON l.recording_mbid = mbc.recording_mbid
-         LEFT JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
-                        ON TRUE            
-                  GROUP BY user_id
-                         , listened_at
-                         , l.recording_msid
-                         , created
-                         , data
-                         , l.recording_mbid
-                         , mbc.recording_data->>'name'
-                         , mbc.release_mbid
-                         , mbc.artist_mbids
-                         , mbc.release_data->>'caa_id'
-                         , mbc.release_data->>'caa_release_mbid'
                   ORDER BY listened_at DESC
                      LIMIT :limit
+              ) {SELECT_LISTENS_WITH_RECORDING_MBID}
+                  ORDER BY l.listened_at DESC
         """
-
-        listens = []
-
-        curs = ts_conn.execute(sqlalchemy.text(query), args)
-        while True:
-            result = curs.fetchone()
-            if not result:
-                break
-            user_name = user_id_map[result.user_id]
-            listens.append(Listen.from_timescale(
-                listened_at=result.listened_at,
-                user_id=result.user_id,
-                created=result.created,
-                recording_msid=result.recording_msid,
-                track_metadata=result.data,
-                recording_mbid=result.recording_mbid,
-                recording_name=result.recording_name,
-                release_mbid=result.release_mbid,
-                artist_mbids=result.artist_mbids,
-                ac_names=result.ac_names,
-                ac_join_phrases=result.ac_join_phrases,
-                user_name=user_name,
-                caa_id=result.caa_id,
-                caa_release_mbid=result.caa_release_mbid
-            ))
-        return listens
+        result = ts_conn.execute(sqlalchemy.text(query), args)
+        return self._listens_from_rows(result.fetchall(), user_id_map)
 
     def fetch_all_recent_listens_for_users(self, users, min_ts: datetime, max_ts: datetime, limit=25):
         """ Fetch recent listens for a list of users.
@@ -471,87 +561,23 @@ class TimescaleListenStore:
         args["max_ts"] = max_ts
 
         query = f"""
-              WITH intermediate AS (
+              WITH page AS (
                     SELECT listened_at
                          , created
                          , user_id
                          , recording_msid
                          , data
                       FROM listen l
-                     WHERE user_id IN :user_ids 
-                       AND listened_at > :min_ts 
+                     WHERE user_id IN :user_ids
+                       AND listened_at > :min_ts
                        AND listened_at < :max_ts
-              ), selected_listens AS (
-                    SELECT l.*
-                        -- prefer to use user submitted mbid, then user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
-                         , COALESCE((data->'additional_info'->>'recording_mbid')::uuid, user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid) AS recording_mbid
-                      FROM intermediate l
-                 LEFT JOIN mbid_mapping mm
-                        ON l.recording_msid = mm.recording_msid
-                 LEFT JOIN mbid_manual_mapping user_mm
-                        ON l.recording_msid = user_mm.recording_msid
-                       AND user_mm.user_id = l.user_id 
-                 LEFT JOIN mbid_manual_mapping_top other_mm
-                        ON l.recording_msid = other_mm.recording_msid
-              )     SELECT user_id
-                         , listened_at
-                         , created
-                         , l.recording_msid::TEXT
-                         , data
-                         , l.recording_mbid
-                         , mbc.recording_data->>'name' AS recording_name
-                         , mbc.release_mbid
-                         , mbc.artist_mbids::TEXT[]
-                         , (mbc.release_data->>'caa_id')::bigint AS caa_id
-                         , mbc.release_data->>'caa_release_mbid' AS caa_release_mbid
-                         , array_agg(artist->>'name' ORDER BY position) AS ac_names
-                         , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases            
-                      FROM selected_listens l
-                 LEFT JOIN mapping.mb_metadata_cache mbc
-                        ON l.recording_mbid = mbc.recording_mbid
-         LEFT JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
-                        ON TRUE            
-                  GROUP BY user_id
-                         , listened_at
-                         , l.recording_msid
-                         , created
-                         , data
-                         , l.recording_mbid
-                         , mbc.recording_data->>'name'
-                         , mbc.release_mbid
-                         , mbc.artist_mbids
-                         , mbc.release_data->>'caa_id'
-                         , mbc.release_data->>'caa_release_mbid'
                   ORDER BY listened_at DESC
-                    LIMIT :limit
+                     LIMIT :limit
+              ) {SELECT_LISTENS_WITH_RECORDING_MBID}
+                  ORDER BY l.listened_at DESC
         """
-
-        listens = []
-
-        curs = ts_conn.execute(sqlalchemy.text(query), args)
-        while True:
-            result = curs.fetchone()
-            if not result:
-                break
-            user_name = user_id_map[result.user_id]
-            listens.append(Listen.from_timescale(
-                listened_at=result.listened_at,
-                user_id=result.user_id,
-                created=result.created,
-                recording_msid=result.recording_msid,
-                track_metadata=result.data,
-                recording_mbid=result.recording_mbid,
-                recording_name=result.recording_name,
-                release_mbid=result.release_mbid,
-                artist_mbids=result.artist_mbids,
-                ac_names=result.ac_names,
-                ac_join_phrases=result.ac_join_phrases,
-                user_name=user_name,
-                caa_id=result.caa_id,
-                caa_release_mbid=result.caa_release_mbid
-            ))
-
-        return listens
+        result = ts_conn.execute(sqlalchemy.text(query), args)
+        return self._listens_from_rows(result.fetchall(), user_id_map)
 
     def import_listens_dump(self, archive_path: str, threads: int = DUMP_DEFAULT_THREAD_COUNT):
         """ Imports listens into TimescaleDB from a ListenBrainz listens dump .tar.xz archive.
@@ -606,12 +632,12 @@ class TimescaleListenStore:
 
                             if len(listens) > DUMP_CHUNK_SIZE:
                                 total_imported += len(listens)
-                                self.insert(listens)
+                                self.insert(listens, use_copy=True)
                                 listens = []
 
             if len(listens) > 0:
                 total_imported += len(listens)
-                self.insert(listens)
+                self.insert(listens, use_copy=True)
 
         if not schema_checked:
             raise SchemaMismatchException("SCHEMA_SEQUENCE file missing FROM listen dump.")
@@ -650,6 +676,7 @@ class TimescaleListenStore:
         except psycopg2.OperationalError as e:
             self.log.error("Cannot delete listens for user: %s" % str(e))
             raise
+        cache.delete_many([REDIS_USER_LISTEN_COUNT + str(user_id), REDIS_USER_TIMESTAMPS + str(user_id)])
 
     def delete_listen(self, listened_at: datetime, user_id: int, recording_msid: str):
         """ Delete a particular listen for user with specified MusicBrainz ID.
@@ -9,11 +9,15 @@ from sqlalchemy import text
 
 from listenbrainz import db
 from listenbrainz.db import timescale
+from listenbrainz.listenstore.timescale_listenstore import cache_user_listen_metadata
 
 logger = logging.getLogger(__name__)
 
 SECONDS_IN_A_YEAR = 31536000
 
+# number of users whose listen metadata is written to redis at once during reconciliation
+USER_LISTEN_DATA_CACHE_BATCH_SIZE = 10000
+
 
 def delete_listens():
     """ Delete listens and update counts, listen min/max timestamps """
@@ -248,6 +252,45 @@ def update_user_listen_data():
         connection.execute(text(query), {"until": datetime.now()})
         logger.info("Completed updating listen counts")
 
+    sync_user_listen_data_to_cache()
+
+
+def sync_user_listen_data_to_cache():
+    """ Reconcile the listen counts and timestamps materialized in redis with the listen_user_metadata table.
+
+    The timescale listenstore updates the values in redis as listens are inserted, this corrects any drift
+    caused by deleted listens or by concurrent writers updating the cache out of order.
+
+    The users are synced in batches, each in its own transaction which keeps their rows locked with FOR SHARE
+    until the values have been written to redis. A writer inserting listens for one of these users waits for
+    the lock, so it writes its newer values to redis after the sync and they are never overwritten with the
+    older values read here.
+    """
+    query = """
+        SELECT user_id, count, min_listened_at, max_listened_at
+          FROM listen_user_metadata
+         WHERE user_id > :last_user_id
+      ORDER BY user_id
+         LIMIT :batch_size
+           FOR SHARE
+    """
+    logger.info("Starting to sync listen counts and timestamps to cache")
+    total = 0
+    last_user_id = 0
+    with timescale.engine.connect() as connection:
+        while True:
+            rows = connection.execute(text(query), {
+                "last_user_id": last_user_id,
+                "batch_size": USER_LISTEN_DATA_CACHE_BATCH_SIZE
+            }).fetchall()
+            cache_user_listen_metadata(rows)
+            connection.commit()
+            total += len(rows)
+            if len(rows) < USER_LISTEN_DATA_CACHE_BATCH_SIZE:
+                break
+            last_user_id = rows[-1].user_id
+    logger.info("Completed syncing listen counts and timestamps of %d users to cache", total)
+
 
 def delete_listens_and_update_user_listen_data():
     """ Delete listens and update user metadata to reflect deleted listens and listens created since last run """
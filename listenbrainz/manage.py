@@ -13,6 +13,7 @@ from listenbrainz.listenstore.timescale_utils import recalculate_all_user_data a
     update_user_listen_data as ts_update_user_listen_data, \
     add_missing_to_listen_users_metadata as ts_add_missing_to_listen_users_metadata,\
     delete_listens as ts_delete_listens, \
+    sync_user_listen_data_to_cache as ts_sync_user_listen_data_to_cache, \
     refresh_top_manual_mappings as ts_refresh_top_manual_mappings
 from listenbrainz.messybrainz import update_msids_from_mapping
 from listenbrainz.metadata_cache.seeder import submit_new_releases_to_cache
@@ -262,6 +263,7 @@ def delete_pending_listens():
     application = webserver.create_app()
     with application.app_context():
         ts_delete_listens()
+        ts_sync_user_listen_data_to_cache()
 
 
 @cli.command(name="delete_listens")
@@ -271,6 +273,7 @@ def complete_delete_listens():
     application = webserver.create_app()
     with application.app_context():
         ts_delete_listens()
+        ts_sync_user_listen_data_to_cache()
 
 
 @cli.command(name="add_missing_to_listen_users_metadata")
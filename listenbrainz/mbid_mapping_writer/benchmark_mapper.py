@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+""" Compare the throughput of fuzzy matching listens one at a time with MBIDMapper.search and in batches
+with MBIDMapper.search_many, the way MBIDMappingQuery matches the listens of a mapping job.
+
+Takes a random sample of messybrainz submissions as the listens to match, against the configured typesense.
+The search result cache is cleared before each run so that both implementations do all the lookups.
+
+    python3 -m listenbrainz.mbid_mapping_writer.benchmark_mapper --listens 2000 --batch-size 500
+"""
+import time
+
+import click
+from sqlalchemy import text
+
+from listenbrainz.db import timescale
+from listenbrainz.mbid_mapping_writer.matcher import SEARCH_TIMEOUT
+from listenbrainz.mbid_mapping_writer.mbid_mapper import MBIDMapper, search_result_cache
+from listenbrainz.webserver import create_app
+
+
+def get_sample_listens(count):
+    with timescale.engine.connect() as connection:
+        result = connection.execute(text("""
+            SELECT artist_credit, recording
+              FROM messybrainz.submissions TABLESAMPLE SYSTEM (1)
+             LIMIT :count
+        """), {"count": count})
+        return [(row.artist_credit, row.recording, None) for row in result]
+
+
+@click.command()
+@click.option("--listens", "num_listens", default=2000, help="number of listens to match")
+@click.option("--batch-size", default=500, help="number of listens matched together by search_many")
+def main(num_listens, batch_size):
+    app = create_app()
+    with app.app_context():
+        listens = get_sample_listens(num_listens)
+        mapper = MBIDMapper(timeout=SEARCH_TIMEOUT, remove_stop_words=True)
+
+        search_result_cache.clear()
+        start = time.monotonic()
+        sequential = [mapper.search(*listen) for listen in listens]
+        sequential_time = time.monotonic() - start
+
+        search_result_cache.clear()
+        start = time.monotonic()
+        batched = []
+        for i in range(0, len(listens), batch_size):
+            batched.extend(mapper.search_many(listens[i:i + batch_size]))
+        batched_time = time.monotonic() - start
+
+        matched = sum(1 for hit in batched if hit)
+        same = sum(1 for a, b in zip(sequential, batched) if a == b)
+        print(f"{'implementation':>15} {'seconds':>9} {'listens/s':>10}")
+        print(f"{'search':>15} {sequential_time:>9.1f} {len(listens) / sequential_time:>10.1f}")
+        print(f"{'search_many':>15} {batched_time:>9.1f} {len(listens) / batched_time:>10.1f}")
+        print(f"{len(listens)} listens, {matched} matched, {same} identical results")
+
+
+if __name__ == "__main__":
+    main()
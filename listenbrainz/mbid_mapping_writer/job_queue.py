@@ -44,6 +44,9 @@ NUM_ITEMS_TO_RECHECK_PER_PASS = 100000
 # When looking for mapped items marked for re-checking, use this batch size
 RECHECK_BATCH_SIZE = 5000
 
+# How many legacy or recheck listens to look up in one job, the fuzzy lookups of a job are batched
+LISTENS_PER_LEGACY_JOB = 250
+
 
 @dataclass(order=True)
 class JobItem:
@@ -133,23 +136,29 @@ class MappingJobQueue(threading.Thread):
 
         with timescale.engine.connect() as connection:
             curs = connection.execute(text(msb_query), {"msids": tuple(msids)})
+            listens = []
             while True:
                 result = curs.fetchone()
                 if not result:
                     break
 
-                self.queue.put(JobItem(priority, [
-                    {
-                        "track_metadata": {
-                            "artist_name": result[2],
-                            "track_name": result[1]
-                        },
-                        "recording_msid": result[0],
-                        "priority": priority
-                    }
-                ]))
+                listens.append({
+                    "track_metadata": {
+                        "artist_name": result[2],
+                        "track_name": result[1]
+                    },
+                    "recording_msid": result[0],
+                    "priority": priority
+                })
                 count += 1
 
+                if len(listens) == LISTENS_PER_LEGACY_JOB:
+                    self.queue.put(JobItem(priority, listens))
+                    listens = []
+
+            if listens:
+                self.queue.put(JobItem(priority, listens))
+
         return count
 
     def add_legacy_listens_to_queue(self):
@@ -366,7 +375,7 @@ class MappingJobQueue(threading.Thread):
                             futures[executor.submit(
                                 process_listens, self.app, job.item, job.priority)] = job.priority
                             if job.priority == LEGACY_LISTEN:
-                                stats["legacy"] += 1
+                                stats["legacy"] += len(job.item)
 
                         if self.legacy_load_thread and not self.legacy_load_thread.is_alive():
                             self.legacy_load_thread = None
@@ -1,5 +1,9 @@
+import logging
 import re
-from time import sleep
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
 
 import typesense
 import typesense.exceptions
@@ -27,11 +31,72 @@ MATCH_TYPE_MED_QUALITY_MAX_EDIT_DISTANCE = 5
 
 ENGLISH_STOP_WORD_INDEX = {k: 1 for k in ENGLISH_STOP_WORDS}
 
+logger = logging.getLogger(__name__)
+
+# number of searches sent in one typesense multi search request and the number of those requests made concurrently
+MULTI_SEARCH_BATCH_SIZE = 50
+MULTI_SEARCH_CONCURRENCY = 4
+
+# batched lookups back off exponentially on timeouts, starting from and up to these many seconds
+MULTI_SEARCH_RETRY_DELAY = 0.5
+MULTI_SEARCH_MAX_RETRY_DELAY = 5
+
+# the typesense collections are rebuilt regularly, so search results are only cached for a while
+SEARCH_RESULT_CACHE_MAX_ITEMS = 100000
+SEARCH_RESULT_CACHE_EXPIRY = 60 * 60  # 1 hour
+
 
 def prepare_query(text):
     return unidecode(re.sub(" +", " ", re.sub(r'[^\w ]+', '', text)).strip().lower())
 
 
+class SearchResultCache:
+    """ A process local LRU cache of the results of MBIDMapper searches, keyed on the search terms.
+    Searches which found no match are cached too, as None.
+
+    Args:
+        max_items: the maximum number of results to keep in the cache
+        expiry: the number of seconds after which a result expires
+    """
+
+    def __init__(self, max_items: int, expiry: int):
+        self.max_items = max_items
+        self.expiry = expiry
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple) -> tuple[bool, dict | None]:
+        """ Return whether the key is cached and its result, marking it as recently used. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, result = entry
+            if expires_at < monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, result
+
+    def put(self, key: tuple, result: dict | None):
+        """ Cache the result of the search, evicting the least recently used results if needed. """
+        with self._lock:
+            self._entries[key] = (monotonic() + self.expiry, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+search_result_cache = SearchResultCache(SEARCH_RESULT_CACHE_MAX_ITEMS, SEARCH_RESULT_CACHE_EXPIRY)
+
+
 class MBIDMapper:
     """
         This class performs a lookup of one or more artist credit name and recording name pairs
@@ -284,7 +349,49 @@ class MBIDMapper:
 
         return hits["hits"][0]
 
-    def lookup_and_evaluate_hit(self, artist_credit_name_p, recording_name_p, release_name_p, is_ac_detuned, is_r_detuned, is_rel_detuned):
+    def multi_lookup(self, lookups):
+        """
+            Lookup several (collection, query) pairs, sending them in typesense multi search requests
+            of up to MULTI_SEARCH_BATCH_SIZE searches made concurrently. Return the top hit or None
+            for each lookup.
+        """
+        chunks = [lookups[i:i + MULTI_SEARCH_BATCH_SIZE] for i in range(0, len(lookups), MULTI_SEARCH_BATCH_SIZE)]
+        if len(chunks) <= 1:
+            results = [self._multi_lookup_chunk(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=MULTI_SEARCH_CONCURRENCY) as executor:
+                results = list(executor.map(self._multi_lookup_chunk, chunks))
+        return [hit for chunk in results for hit in chunk]
+
+    def _multi_lookup_chunk(self, lookups):
+        searches = {"searches": [{"collection": collection, "q": query} for collection, query in lookups]}
+        # only the top hit is used, don't fetch more
+        common_parameters = {
+            'query_by': "combined",
+            'prefix': 'no',
+            'num_typos': self.MATCH_TYPE_MED_QUALITY_MAX_EDIT_DISTANCE,
+            'per_page': 1
+        }
+
+        delay = MULTI_SEARCH_RETRY_DELAY
+        while True:
+            try:
+                response = self.client.multi_search.perform(searches, common_parameters)
+                break
+            except requests.exceptions.ReadTimeout:
+                if self.retry_on_timeout:
+                    # this runs in worker threads which have no app context, so current_app can't be used
+                    logger.error("Got socket timeout, sleeping %s seconds, trying again.", delay, exc_info=True)
+                    sleep(delay)
+                    delay = min(delay * 2, MULTI_SEARCH_MAX_RETRY_DELAY)
+                else:
+                    raise
+
+        # a malformed search gets an error result instead of hits, treat it as no hit like lookup does
+        return [result["hits"][0] if result.get("hits") else None for result in response["results"]]
+
+    def prepare_lookup(self, artist_credit_name_p, recording_name_p, release_name_p):
+        """ Return the collection and the query to lookup the prepared search terms with. """
         if release_name_p:
             collection = COLLECTION_NAME_WITH_RELEASE
             query = artist_credit_name_p + " " + recording_name_p + " " + release_name_p
@@ -292,8 +399,15 @@ class MBIDMapper:
             collection = COLLECTION_NAME_WITHOUT_RELEASE
             query = artist_credit_name_p + " " + recording_name_p
 
-        query = self.clean_query(query)
-        hit = self.lookup(collection, query)
+        return collection, self.clean_query(query)
+
+    def lookup_and_evaluate_hit(self, artist_credit_name_p, recording_name_p, release_name_p, is_ac_detuned, is_r_detuned, is_rel_detuned):
+        hit = self.lookup(*self.prepare_lookup(artist_credit_name_p, recording_name_p, release_name_p))
+        return self.evaluate_lookup_hit(hit, artist_credit_name_p, recording_name_p, release_name_p,
+                                        is_ac_detuned, is_r_detuned, is_rel_detuned)
+
+    def evaluate_lookup_hit(self, hit, artist_credit_name_p, recording_name_p, release_name_p, is_ac_detuned, is_r_detuned, is_rel_detuned):
+        """ Evaluate the hit of a lookup and return the match dict if it is good enough, otherwise None. """
         if not hit:
             return None
 
@@ -329,13 +443,10 @@ class MBIDMapper:
 
         return re.sub("\s+-\s+\d\d\d\d.*master", "", recording_name)
 
-    def search(self, artist_credit_name, recording_name, release_name=None):
+    def get_search_candidates(self, artist_credit_name, recording_name, release_name=None):
         """
-            Main query body: Prepare the search query terms and prepare
-            detuned query terms. Then attempt to find the given search terms
-            and if not found, sequentially try the detuned versions of the
-            query terms. Return a match dict (properly formatted for this
-            query) or None if not match.
+            Prepare the search query terms and the detuned query terms. Return the
+            (log message, lookup_and_evaluate_hit args) to try, in the order to try them.
         """
         recording_name = self.remove_obvious_bullshit_from_recording_name(recording_name)
 
@@ -348,39 +459,42 @@ class MBIDMapper:
         rel_detuned = prepare_query(self.detune_query_string(release_name, False)) if release_name else None
         self._log(f"ac_detuned: '{ac_detuned}' r_detuned: '{r_detuned}' rel_detuned: '{rel_detuned}'")
 
+        candidates = []
         if release_name_p:
-            self._log(f"looking up with release name")
             # lookup without any detunings, with release name
-            hit = self.lookup_and_evaluate_hit(artist_credit_name_p, recording_name_p, release_name_p, False, False, False)
-            if hit:
-                return hit
+            candidates.append(("looking up with release name",
+                               (artist_credit_name_p, recording_name_p, release_name_p, False, False, False)))
 
-
-        self._log(f"looking up without release name")
         # lookup without any detuning
-        hit = self.lookup_and_evaluate_hit(artist_credit_name_p, recording_name_p, None, False, False, False)
-        if hit:
-            return hit
+        candidates.append(("looking up without release name",
+                           (artist_credit_name_p, recording_name_p, None, False, False, False)))
 
         # lookup with only artist credit detuned
         if ac_detuned:
-            self._log("Detune only artist_credit")
-            hit = self.lookup_and_evaluate_hit(ac_detuned, recording_name_p, None, True, False, False)
-            if hit:
-                return hit
+            candidates.append(("Detune only artist_credit", (ac_detuned, recording_name_p, None, True, False, False)))
 
         # lookup with both artist credit and recording detuned
         if ac_detuned and r_detuned:
-            self._log("Detune artist_credit and recording")
-            hit = self.lookup_and_evaluate_hit(ac_detuned, r_detuned, None, True, True, False)
-            if hit:
-                return hit
+            candidates.append(("Detune artist_credit and recording", (ac_detuned, r_detuned, None, True, True, False)))
 
         # this case is the last one because it didn't exist in earlier versions and
         # preserving order of cases with older versions is probably sensible.
         if r_detuned:
-            self._log("Detune only recording")
-            hit = self.lookup_and_evaluate_hit(artist_credit_name_p, r_detuned, None, False, True, False)
+            candidates.append(("Detune only recording", (artist_credit_name_p, r_detuned, None, False, True, False)))
+
+        return candidates
+
+    def search(self, artist_credit_name, recording_name, release_name=None):
+        """
+            Main query body: Prepare the search query terms and prepare
+            detuned query terms. Then attempt to find the given search terms
+            and if not found, sequentially try the detuned versions of the
+            query terms. Return a match dict (properly formatted for this
+            query) or None if not match.
+        """
+        for message, args in self.get_search_candidates(artist_credit_name, recording_name, release_name):
+            self._log(message)
+            hit = self.lookup_and_evaluate_hit(*args)
             if hit:
                 return hit
 
@@ -388,3 +502,50 @@ class MBIDMapper:
         self._log("OK")
 
         return None
+
+    def search_many(self, queries):
+        """
+            Search for several (artist_credit_name, recording_name, release_name) queries at once.
+            The same lookups as in search are tried in the same order for each query, but the
+            lookups of all the queries are made together using multi_lookup: first the initial
+            lookup of every query, then the next lookup of the queries which didn't match yet
+            and so on. Results are cached, identical queries are only searched once. Return a
+            match dict or None for each query, in order.
+        """
+        results = {}
+        pending = {}
+        for query in queries:
+            key = (self.remove_stop_words, *query)
+            if key in results or key in pending:
+                continue
+            # the debug log of a cached result would be empty, so don't use the cache when debugging
+            found, result = search_result_cache.get(key) if not self.debug else (False, None)
+            if found:
+                results[key] = result
+            else:
+                pending[key] = iter(self.get_search_candidates(*query))
+
+        while pending:
+            lookups = []
+            for key, candidates in list(pending.items()):
+                candidate = next(candidates, None)
+                if candidate is None:
+                    results[key] = None
+                    search_result_cache.put(key, None)
+                    del pending[key]
+                else:
+                    message, args = candidate
+                    self._log(message)
+                    lookups.append((key, args))
+
+            hits = self.multi_lookup([self.prepare_lookup(*args[:3]) for _, args in lookups])
+            for (key, args), hit in zip(lookups, hits):
+                match = self.evaluate_lookup_hit(hit, *args)
+                if match:
+                    results[key] = match
+                    search_result_cache.put(key, match)
+                    del pending[key]
+
+        # callers add their own keys to the results, don't let them modify the cached ones
+        return [dict(result) if result else None for result in
+                (results[(self.remove_stop_words, *query)] for query in queries)]
@@ -1,5 +1,5 @@
 import uuid
-from typing import Iterable
+from typing import Iterable, Optional
 
 import sqlalchemy
 import sqlalchemy.exc
@@ -43,28 +43,137 @@ def submit_listens_and_sing_me_a_sweet_song(recordings):
         raise exceptions.ErrorAddingException("Failed to add data")
 
 
+def get_submission_key(submission: dict) -> tuple:
+    """ Returns the key under which the given submission is matched against existing submissions. The text
+     fields are compared case-insensitively and NULLs are only equal to other NULLs, same as in :func:`get_msid`.
+     Submissions having the same key are assigned the same msid.
+    """
+    release = submission.get("release")
+    track_number = submission.get("track_number")
+    return (
+        submission["title"].lower(),
+        submission["artist"].lower(),
+        release.lower() if release is not None else None,
+        track_number.lower() if track_number is not None else None,
+        submission.get("duration")
+    )
+
+
 def insert_all_in_transaction(ts_conn, submissions: list[dict]):
     """ Inserts a list of recordings into MessyBrainz.
 
+    The msids of all the submissions are looked up using a single query and the submissions not
+    found are then inserted using another single query. Submissions differing only in case are
+    assigned the same msid, also within the batch itself.
+
     Args:
         ts_conn: timescale database connection
         submissions: a list of recordings to be inserted
     Returns:
         A list of dicts containing the recording data for each inserted recording
     """
-    ret = []
+    # submissions which only differ in case should be assigned the same msid, so look up and insert
+    # each distinct submission once and map the results back to all the submissions afterwards.
+    unique_submissions = {}
+    keys = []
     for submission in submissions:
-        result = submit_recording(
-            ts_conn,
-            submission["title"],
-            submission["artist"],
-            submission.get("release"),
-            submission.get("track_number"),
-            submission.get("duration")
-        )
-        ret.append(result)
+        key = get_submission_key(submission)
+        if key not in unique_submissions:
+            unique_submissions[key] = (
+                submission["title"],
+                submission["artist"],
+                submission.get("release"),
+                submission.get("track_number"),
+                submission.get("duration")
+            )
+        keys.append(key)
+
+    existing_msids = get_msids(ts_conn, list(unique_submissions.values()))
+
+    msids = {}
+    values = []
+    for (key, submission), msid in zip(unique_submissions.items(), existing_msids):
+        if msid is None:
+            msid = str(uuid.uuid4())  # new msid
+            values.append((msid, *submission))
+        msids[key] = msid
+
+    if values:
+        gids, recordings, artist_credits, releases, track_numbers, durations = (list(column) for column in zip(*values))
+        ts_conn.execute(text("""
+            INSERT INTO messybrainz.submissions (gid, recording, artist_credit, release, track_number, duration)
+                 SELECT *
+                   FROM unnest(
+                            CAST(:gids AS uuid[])
+                          , CAST(:recordings AS text[])
+                          , CAST(:artist_credits AS text[])
+                          , CAST(:releases AS text[])
+                          , CAST(:track_numbers AS text[])
+                          , CAST(:durations AS integer[])
+                        )
+        """), {
+            "gids": gids,
+            "recordings": recordings,
+            "artist_credits": artist_credits,
+            "releases": releases,
+            "track_numbers": track_numbers,
+            "durations": durations
+        })
+
     ts_conn.commit()
-    return ret
+    return [msids[key] for key in keys]
+
+
+def get_msids(connection, submissions: list[tuple]) -> list[Optional[str]]:
+    """ Retrieve the msids for a list of (recording, artist, release, track_number, duration) tuples
+     using a single query. The matching rules are the same as :func:`get_msid`, including returning
+     the earliest submitted MSID in case of duplicates.
+
+    Args:
+        connection: the sqlalchemy db connection to execute queries with
+        submissions: a list of (recording, artist, release, track_number, duration) tuples
+    Returns:
+        a list of msids in the same order as the submissions, None for submissions not in the db
+    """
+    if not submissions:
+        return []
+
+    # the submissions are passed as one array per column, WITH ORDINALITY numbers them starting from 1
+    recordings, artist_credits, releases, track_numbers, durations = (list(column) for column in zip(*submissions))
+    result = connection.execute(text("""
+        WITH submissions (recording, artist_credit, release, track_number, duration, idx) AS (
+            SELECT *
+              FROM unnest(
+                       CAST(:recordings AS text[])
+                     , CAST(:artist_credits AS text[])
+                     , CAST(:releases AS text[])
+                     , CAST(:track_numbers AS text[])
+                     , CAST(:durations AS integer[])
+                   ) WITH ORDINALITY
+        )
+           SELECT DISTINCT ON (s.idx)
+                  s.idx
+                , ms.gid::TEXT
+             FROM submissions s
+             JOIN messybrainz.submissions ms
+               ON lower(ms.recording) = lower(s.recording)
+              AND lower(ms.artist_credit) = lower(s.artist_credit)
+              AND lower(ms.release) IS NOT DISTINCT FROM lower(s.release)
+              AND lower(ms.track_number) IS NOT DISTINCT FROM lower(s.track_number)
+              AND ms.duration IS NOT DISTINCT FROM s.duration
+         ORDER BY s.idx, ms.submitted
+    """), {
+        "recordings": recordings,
+        "artist_credits": artist_credits,
+        "releases": releases,
+        "track_numbers": track_numbers,
+        "durations": durations
+    })
+
+    msids = [None] * len(submissions)
+    for row in result:
+        msids[row.idx - 1] = row.gid
+    return msids
 
 
 def get_msid(connection, recording, artist, release=None, track_number=None, duration=None):
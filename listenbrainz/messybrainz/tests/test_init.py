@@ -150,3 +150,52 @@ class DataTestCase(TimescaleTestCase):
         }
 
         self.assertDictEqual(expected, received)
+
+    def test_insert_all_in_transaction_duplicates(self):
+        """ Test that submissions differing only in case get the same msid within a batch and that
+         existing duplicates resolve to the earliest submitted msid """
+        args = {
+            "msid1": "0becc74d-9ba9-44c5-afa4-2f4ffe380d67",
+            "msid2": "9b750fdd-222e-4500-a22e-a0a942d5e342",
+            "recording": "05 Mentira ...",
+            "artist_credit": "Manu Chao",
+            "release": "Clandestino",
+            "submitted1": datetime.now(),
+            "submitted2": datetime.now() + timedelta(days=1)
+        }
+        self.ts_conn.execute(text("""
+            INSERT INTO messybrainz.submissions (gid, recording, artist_credit, release, submitted)
+                 VALUES (:msid2, :recording, :artist_credit, :release, :submitted2),
+                        (:msid1, :recording, :artist_credit, :release, :submitted1)
+        """), args)
+
+        submissions = [
+            {'artist': 'Frank Ocean', 'release': 'Blond', 'title': 'Pretty Sweet'},
+            {'artist': 'MANU CHAO', 'release': 'clandestino', 'title': '05 Mentira ...'},
+            {'artist': 'FRANK OCEAN', 'release': 'BLoNd', 'title': 'PReTtY SWEET'},
+            {'artist': 'Frank Ocean', 'title': 'Pretty Sweet'},
+        ]
+        msids = messybrainz.insert_all_in_transaction(self.ts_conn, submissions)
+        self.assertEqual(len(msids), 4)
+        self.assertEqual(msids[0], msids[2])
+        self.assertEqual(msids[1], args["msid1"])
+        self.assertNotEqual(msids[0], msids[3])
+
+        # submitting the same batch again should not create any new msids
+        self.assertEqual(msids, messybrainz.insert_all_in_transaction(self.ts_conn, submissions))
+
+    def test_insert_all_in_transaction_commits(self):
+        """ Test that the new submissions are committed when the connection is closed and can be read back on
+         another connection """
+        submissions = [
+            {'artist': 'Frank Ocean', 'release': 'Blond', 'title': 'Pretty Sweet', 'duration': 56000},
+            {'artist': 'Manu Chao', 'release': 'Clandestino', 'title': '05 Mentira ...', 'track_number': '5'},
+        ]
+        msids = messybrainz.submit_listens_and_sing_me_a_sweet_song(submissions)
+
+        with timescale.engine.connect() as connection:
+            received = messybrainz.get_msids(connection, [
+                ('Pretty Sweet', 'Frank Ocean', 'Blond', None, 56000),
+                ('05 Mentira ...', 'Manu Chao', 'Clandestino', '5', None),
+            ])
+        self.assertEqual(msids, received)
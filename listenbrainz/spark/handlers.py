@@ -3,6 +3,7 @@
 """
 import json
 
+from brainzutils import metrics
 from brainzutils.mail import send_mail
 from flask import current_app, render_template
 from pydantic import ValidationError
@@ -17,7 +18,7 @@ from data.model.user_cf_recommendations_recording_message import UserRecommendat
 from data.model.user_missing_musicbrainz_data import UserMissingMusicBrainzDataJson
 from listenbrainz.db import year_in_music, couchdb
 from listenbrainz.db.fresh_releases import insert_fresh_releases
-from listenbrainz.db import similarity
+from listenbrainz.db import similarity, entity_page
 from listenbrainz.db.similar_users import import_user_similarities
 from listenbrainz.troi.daily_jams import run_post_recommendation_troi_bot
 from listenbrainz.troi.weekly_playlists import process_weekly_playlists, process_weekly_playlists_end
@@ -28,23 +29,26 @@ TIME_TO_CONSIDER_STATS_AS_OLD = 20  # minutes
 TIME_TO_CONSIDER_RECOMMENDATIONS_AS_OLD = 7  # days
 
 
-def _handle_stats(message, stats_type, key):
+def _handle_stats(message, stats_type, key, paged=False):
     try:
         with start_transaction(op="insert", name=f'insert {stats_type} - {message["stats_range"]} stats'):
-            db_stats.insert(
+            writer_metrics = db_stats.insert(
                 message["database"],
                 message["from_ts"],
                 message["to_ts"],
                 message["data"],
-                key
+                key,
+                paged
             )
+        metrics.set("couchdb_bulk_writer", **writer_metrics)
     except HTTPError as e:
         current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
 
 
 def handle_user_entity(message):
     """ Take entity stats for a user and save it in the database. """
-    _handle_stats(message, f'user {message["entity"]}', "user_id")
+    # the entity stats are read a page at a time by the stats api
+    _handle_stats(message, f'user {message["entity"]}', "user_id", paged=True)
 
 
 def handle_entity_listener(message):
@@ -88,7 +92,9 @@ def _handle_sitewide_stats(message, stat_type, has_count=False):
             databases[0],
             message["from_ts"],
             message["to_ts"],
-            stats
+            stats,
+            # only the entity stats have a count, they are read a page at a time by the stats api
+            paged=has_count
         )
     except HTTPError as e:
         current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
@@ -392,6 +398,7 @@ def handle_similar_recordings(message):
 
 def handle_similar_artists(message):
     similarity.insert("artist_credit_mbids", message["data"], message["algorithm"])
+    entity_page.invalidate_cached_props()
 
 
 def handle_troi_playlists(message):
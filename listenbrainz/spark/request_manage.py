@@ -1,5 +1,6 @@
 import os
 import sys
+from contextlib import contextmanager
 from datetime import date
 
 import click
@@ -34,6 +35,14 @@ def _get_possible_queries():
 def _prepare_query_message(query, **params):
     """ Prepare the JSON message that needs to be sent to the
     spark cluster based on the query and the parameters the
+    query needs, see _prepare_query for details.
+    """
+    return orjson.dumps(_prepare_query(query, **params))
+
+
+def _prepare_query(query, **params):
+    """ Prepare the request that needs to be sent to the
+    spark cluster based on the query and the parameters the
     query needs
 
     Args:
@@ -60,10 +69,34 @@ def _prepare_query_message(query, **params):
         for key, value in params.items():
             message['params'][key] = value
 
-    return orjson.dumps(message)
+    return message
+
+
+# requests collected while inside batch_requests, None otherwise
+_batched_requests = None
+
+
+@contextmanager
+def batch_requests():
+    """ Collect the requests sent inside the block and send them to the spark cluster as one batch request
+    when the block exits. The spark cluster runs the requests of a batch in dependency order and reads the
+    listens and metadata shared by several requests only once. """
+    global _batched_requests
+    _batched_requests = []
+    try:
+        yield
+        requests = _batched_requests
+    finally:
+        _batched_requests = None
+    if requests:
+        send_request_to_spark_cluster("batch.run", requests=requests)
 
 
 def send_request_to_spark_cluster(query, **params):
+    if _batched_requests is not None:
+        _batched_requests.append(_prepare_query(query, **params))
+        return
+
     app = create_app()
     with app.app_context():
         message = _prepare_query_message(query, **params)
@@ -557,8 +590,18 @@ def request_troi_playlists():
 # rather combine multiple commands related to a task so that they are always invoked in the correct order.
 
 @cli.command(name='cron_request_all_stats')
+@click.option("--batch/--no-batch", default=False,
+              help="Send all the requests as one batch which shares the listens read for each stats range")
 @click.pass_context
-def cron_request_all_stats(ctx):
+def cron_request_all_stats(ctx, batch):
+    if batch:
+        with batch_requests():
+            _request_all_stats(ctx)
+    else:
+        _request_all_stats(ctx)
+
+
+def _request_all_stats(ctx):
     ctx.invoke(request_import_pg_tables)
     for stats_range in ALLOWED_STATISTICS_RANGE:
         for entity in ["artists", "releases", "recordings", "release_groups"]:
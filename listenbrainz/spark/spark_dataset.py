@@ -1,13 +1,36 @@
 import abc
+import io
 import time
 from abc import ABC
 from urllib.error import HTTPError
 
+import psycopg2
 from flask import current_app
 from psycopg2.extras import execute_values
 from psycopg2.sql import Identifier, SQL, Literal
 
-from listenbrainz.db import couchdb, timescale
+from listenbrainz.db import couchdb, entity_page, timescale
+
+
+# the unquoted marker for NULL values in the csv copied into the dataset tables
+COPY_NULL = "\\N"
+
+
+def _format_copy_row(row) -> str:
+    """ Format a row as a line of csv for COPY ... WITH (FORMAT csv, NULL '\\N').
+
+    None is written as the unquoted NULL marker and strings are always quoted, so that empty strings
+    are not read as NULL like the empty fields written by csv.writer for both of them.
+    """
+    fields = []
+    for value in row:
+        if value is None:
+            fields.append(COPY_NULL)
+        elif isinstance(value, str):
+            fields.append('"' + value.replace('"', '""') + '"')
+        else:
+            fields.append(str(value))
+    return ",".join(fields) + "\n"
 
 
 class SparkDataset(ABC):
@@ -95,6 +118,10 @@ class _CouchDbDataset(SparkDataset):
                     current_app.logger.info(f"Databases: {retained} matched but weren't deleted because"
                                             f" _LOCK file existed")
 
+            # the artist and album pages show the listeners of the entity
+            if match[2].startswith("listeners"):
+                entity_page.invalidate_cached_props()
+
         except HTTPError as e:
             current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
 
@@ -110,12 +137,16 @@ class DatabaseDataset(SparkDataset, ABC):
     the dataset has been received completely, we switch the temporary table with the production tables.
     We do not use something like INSERT ON CONFLICT DO NOTHING to avoid mixups the last runs' results
     (like tags being deleted since then).
+
+    One database connection is held from the start message to the end message of the dataset and the
+    rows of each data message are streamed into the temporary table using COPY.
     """
 
     def __init__(self, name, table_name, schema=None):
         super().__init__(name)
         self.base_table_name = table_name
         self.schema = schema
+        self._conn = None
 
     def _get_table_name(self, suffix=None, exclude_schema=False):
         if suffix is None:
@@ -144,12 +175,19 @@ class DatabaseDataset(SparkDataset, ABC):
         """
         return []
 
-    @abc.abstractmethod
+    def get_copy(self, message):
+        """ Return the list of columns and the rows to be copied into the dataset table for the message.
+
+        Each row should be a tuple of values in the same order as the columns, None values are copied as NULL.
+        Datasets that cannot be represented as plain rows may return None and implement get_inserts instead.
+        """
+        return None
+
     def get_inserts(self, message):
         """ Return the query and the template along with the rows to be inserted into the database using them.
 
         Note that insert query should have a {table} marker to subsitute the name in it later and must have a
-        VALUES %s clause.
+        VALUES %s clause. Only used if get_copy returns None.
         """
         raise NotImplementedError()
 
@@ -190,38 +228,76 @@ class DatabaseDataset(SparkDataset, ABC):
         query = SQL("DROP TABLE IF EXISTS {old_table}").format(old_table=self._get_table_name(suffix="old"))
         cursor.execute(query)
 
+    def _get_connection(self):
+        """ Return the connection held for the current dataset, opening a new one if there is none or the
+         previous one was closed. """
+        if self._conn is None or self._conn.closed:
+            self._conn = timescale.engine.raw_connection()
+        return self._conn
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _run(self, func, message):
+        """ Run func with a cursor of the dataset connection and commit. The connection is discarded on errors,
+         a lost connection is retried once with a new one. """
+        for attempt in range(2):
+            conn = self._get_connection()
+            try:
+                with conn.cursor() as curs:
+                    func(curs, message)
+                conn.commit()
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                self._close_connection()
+                if attempt == 1:
+                    raise
+                current_app.logger.warning("Lost connection while handling %s, retrying:", self.name, exc_info=True)
+            except Exception:
+                self._close_connection()
+                raise
+
+    def _create_table(self, curs, message):
+        self.create_table(curs)
+
+    def _insert(self, curs, message):
+        copy = self.get_copy(message)
+        if copy is None:
+            query, template, values = self.get_inserts(message)
+            query = SQL(query).format(table=self._get_table_name("tmp"))
+            if isinstance(template, str):
+                template = SQL(template)
+            execute_values(curs, query, values, template)
+            return
+
+        columns, rows = copy
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(_format_copy_row(row))
+        buffer.seek(0)
+        query = SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+            table=self._get_table_name("tmp"),
+            columns=SQL(", ").join(Identifier(column) for column in columns)
+        )
+        curs.copy_expert(query, buffer)
+
+    def _finish(self, curs, message):
+        self.create_indices(curs)
+        self.rotate_tables(curs)
+        self.run_post_processing(curs, message)
+
     def handle_start(self, message):
-        conn = timescale.engine.raw_connection()
-        try:
-            with conn.cursor() as curs:
-                self.create_table(curs)
-            conn.commit()
-        finally:
-            conn.close()
+        # a connection left over from an earlier dataset run which never finished
+        self._close_connection()
+        self._run(self._create_table, message)
 
     def handle_end(self, message):
-        conn = timescale.engine.raw_connection()
         try:
-            with conn.cursor() as curs:
-                self.create_indices(curs)
-                self.rotate_tables(curs)
-                self.run_post_processing(curs, message)
-            conn.commit()
+            self._run(self._finish, message)
         finally:
-            conn.close()
+            self._close_connection()
 
     def handle_insert(self, message):
-        query, template, values = self.get_inserts(message)
-        tmp_table = self._get_table_name("tmp")
-        query = SQL(query).format(table=tmp_table)
-
-        if isinstance(template, str):
-            template = SQL(template)
-
-        conn = timescale.engine.raw_connection()
-        try:
-            with conn.cursor() as curs:
-                execute_values(curs, query, values, template)
-            conn.commit()
-        finally:
-            conn.close()
+        self._run(self._insert, message)
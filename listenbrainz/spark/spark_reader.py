@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 import json
+import queue
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import orjson
 import sentry_sdk
+from brainzutils import metrics
 from kombu import Connection, Message, Consumer, Exchange, Queue
-from kombu.mixins import ConsumerMixin
+from kombu.entity import PERSISTENT_DELIVERY_MODE
+from kombu.mixins import ConsumerProducerMixin
 
 from listenbrainz.db.popularity import get_all_popularity_datasets
 from listenbrainz.db.similarity import SimilarRecordingsDataset, SimilarArtistsDataset
@@ -48,8 +54,40 @@ from listenbrainz.spark.spark_dataset import CouchDbDataset
 from listenbrainz.utils import get_fallback_connection_name
 from listenbrainz.webserver import create_app
 
+# the maximum number of unacknowledged messages delivered at once from the spark result queue to the router
+ROUTER_PREFETCH_COUNT = 20
+# the maximum number of unacknowledged messages delivered at once from the queue of each family, i.e. the messages
+# of a family waiting for or being handled by its executor
+FAMILY_PREFETCH_COUNT = 5
 
-class SparkReader(ConsumerMixin):
+# how often to publish the timing metrics of the handlers, in seconds
+METRICS_INTERVAL = 60
+
+# messages of the same family are handled one at a time in the order they arrive, while messages of different
+# families are handled concurrently. the messages of the spark result queue are routed to a separate queue for
+# each family, so that a backlog of one family, e.g. the couchdb writes of a nightly stats run, does not hold back
+# the messages of the other families in the prefetch window. the handlers of the following types write into the
+# couchdb databases created and rotated by the couchdb dataset's start and end messages, so they belong to the
+# same family.
+COUCHDB_FAMILY = "couchdb"
+COUCHDB_MESSAGE_TYPES = {
+    "user_entity",
+    "entity_listener",
+    "user_listening_activity",
+    "user_daily_activity",
+    "sitewide_entity",
+    "sitewide_listening_activity",
+    "fresh_releases",
+}
+FAMILY_PREFIXES = {
+    "cf_recommendations_recording_": "recommendations",
+    "year_in_music_": "year_in_music",
+    "troi_playlists": "troi_playlists",
+}
+DEFAULT_FAMILY = "default"
+
+
+class SparkReader(ConsumerProducerMixin):
 
     def __init__(self, app):
         self.app = app
@@ -57,7 +95,18 @@ class SparkReader(ConsumerMixin):
         self.spark_result_exchange = Exchange(app.config["SPARK_RESULT_EXCHANGE"], "fanout", durable=False)
         self.spark_result_queue = Queue(app.config["SPARK_RESULT_QUEUE"], exchange=self.spark_result_exchange,
                                         durable=True)
+        self.family_exchange = Exchange(app.config["SPARK_RESULT_EXCHANGE"] + "_family", "direct", durable=True)
         self.response_handlers = {}
+        self.response_families = {}
+
+        # one single threaded executor per family to keep the order of the messages of a family
+        self.executors = {}
+        # messages whose handlers have completed, these are acked from the consumer thread
+        self.completed_messages = queue.Queue()
+
+        self.timings_lock = threading.Lock()
+        self.handler_timings = defaultdict(lambda: {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+        self.last_metrics_update = time.monotonic()
 
     def register_handlers(self):
         datasets = [
@@ -68,7 +117,11 @@ class SparkReader(ConsumerMixin):
             *get_all_popularity_datasets()
         ]
         for dataset in datasets:
-            self.response_handlers.update(dataset.get_handlers())
+            handlers = dataset.get_handlers()
+            self.response_handlers.update(handlers)
+            family = COUCHDB_FAMILY if dataset is CouchDbDataset else dataset.name
+            for response_type in handlers:
+                self.response_families[response_type] = family
 
         self.response_handlers.update({
             'echo': handle_echo,
@@ -107,6 +160,17 @@ class SparkReader(ConsumerMixin):
             'troi_playlists_end': handle_troi_playlists_end,
         })
 
+    def get_family(self, response_type) -> str:
+        """ Return the family of the message type, messages of a family are handled in order. """
+        if response_type in self.response_families:
+            return self.response_families[response_type]
+        if response_type in COUCHDB_MESSAGE_TYPES:
+            return COUCHDB_FAMILY
+        for prefix, family in FAMILY_PREFIXES.items():
+            if response_type.startswith(prefix):
+                return family
+        return DEFAULT_FAMILY
+
     def process_response(self, response):
         try:
             response_type = response['type']
@@ -121,6 +185,7 @@ class SparkReader(ConsumerMixin):
             self.app.logger.error("Unknown response type: %s, doing nothing.", response_type, exc_info=True)
             return
 
+        start = time.monotonic()
         try:
             response_handler(response)
         except Exception as e:
@@ -128,19 +193,123 @@ class SparkReader(ConsumerMixin):
                                   json.dumps(response, indent=4), exc_info=True)
             sentry_sdk.capture_exception(e)
             return
+        finally:
+            self.record_timing(response_type, time.monotonic() - start)
+
+    def record_timing(self, response_type, seconds):
+        with self.timings_lock:
+            timing = self.handler_timings[response_type]
+            timing["count"] += 1
+            timing["seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def publish_metrics(self):
+        """ Publish the number of messages handled and the time spent in the handlers of each message type
+         since the spark reader started. """
+        with self.timings_lock:
+            data = {}
+            for response_type, timing in self.handler_timings.items():
+                data[f"{response_type}_count"] = timing["count"]
+                data[f"{response_type}_seconds"] = timing["seconds"]
+                data[f"{response_type}_max_seconds"] = timing["max_seconds"]
+        if data:
+            metrics.set("spark_reader", **data)
+        self.last_metrics_update = time.monotonic()
+
+    def handle_in_worker(self, message: Message, response):
+        """ Handle a message in the executor of its family, under a separate app context. """
+        try:
+            with self.app.app_context():
+                self.process_response(response)
+        finally:
+            self.completed_messages.put(message)
+
+    def get_families(self) -> set[str]:
+        """ Return all the families of the registered message types. """
+        return {
+            COUCHDB_FAMILY,
+            DEFAULT_FAMILY,
+            *self.response_families.values(),
+            *FAMILY_PREFIXES.values()
+        }
+
+    def get_family_queue(self, family) -> Queue:
+        return Queue(
+            f"{self.app.config['SPARK_RESULT_QUEUE']}_{family}",
+            exchange=self.family_exchange,
+            routing_key=family,
+            durable=True
+        )
+
+    def route(self, message: Message):
+        """ Forward a message of the spark result queue to the queue of its family. The message is acked once
+         the broker has confirmed the forwarded message. """
+        response = orjson.loads(message.body)
+        response_type = response.get("type") if isinstance(response, dict) else None
+        family = self.get_family(response_type) if isinstance(response_type, str) else DEFAULT_FAMILY
+
+        self.producer.publish(
+            message.body,
+            exchange=self.family_exchange,
+            routing_key=family,
+            declare=[self.get_family_queue(family)],
+            delivery_mode=PERSISTENT_DELIVERY_MODE
+        )
+        message.ack()
 
-    def callback(self, message: Message):
-        """ Handle the data received from the queue and
+    def callback(self, message: Message, family: str):
+        """ Handle the data received from the queue of a family and
             insert into the database accordingly.
+
+            The message is handed over to the executor of its family and acked once it has been processed.
         """
         self.app.logger.debug("Received a message, processing...")
         response = orjson.loads(message.body)
-        self.process_response(response)
-        message.ack()
-        self.app.logger.debug("Done!")
+
+        executor = self.executors.get(family)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"spark-reader-{family}")
+            self.executors[family] = executor
+        executor.submit(self.handle_in_worker, message, response)
+
+    def on_iteration(self):
+        """ Ack the messages that have been processed, called by the consumer loop at least once a second. """
+        while True:
+            try:
+                message = self.completed_messages.get_nowait()
+            except queue.Empty:
+                break
+            message.ack()
+            self.app.logger.debug("Done!")
+
+        if time.monotonic() - self.last_metrics_update > METRICS_INTERVAL:
+            self.publish_metrics()
+
+    def shutdown_executors(self):
+        """ Wait for the messages being processed to complete. Their acks are lost if the connection failed,
+         in which case rabbitmq redelivers them. """
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        self.executors = {}
+        self.completed_messages = queue.Queue()
 
     def get_consumers(self, _, channel):
-        return [Consumer(channel, queues=[self.spark_result_queue], on_message=lambda msg: self.callback(msg))]
+        consumers = [Consumer(
+            channel,
+            queues=[self.spark_result_queue],
+            on_message=lambda msg: self.route(msg),
+            prefetch_count=ROUTER_PREFETCH_COUNT
+        )]
+        # rabbitmq applies the prefetch count set on a channel to the consumers started after it, so each
+        # family consumes on its own channel to get its own window of messages
+        for family in sorted(self.get_families()):
+            consumers.append(Consumer(
+                channel.connection.channel(),
+                queues=[self.get_family_queue(family)],
+                on_message=lambda msg, family=family: self.callback(msg, family),
+                prefetch_count=FAMILY_PREFETCH_COUNT
+            ))
+        return consumers
 
     def init_rabbitmq_connection(self):
         self.connection = Connection(
@@ -149,7 +318,11 @@ class SparkReader(ConsumerMixin):
             port=self.app.config["RABBITMQ_PORT"],
             password=self.app.config["RABBITMQ_PASSWORD"],
             virtual_host=self.app.config["RABBITMQ_VHOST"],
-            transport_options={"client_properties": {"connection_name": get_fallback_connection_name()}}
+            transport_options={
+                "client_properties": {"connection_name": get_fallback_connection_name()},
+                # wait for the broker to confirm the messages routed to the family queues before acking them
+                "confirm_publish": True
+            }
         )
 
     def start(self):
@@ -168,6 +341,8 @@ class SparkReader(ConsumerMixin):
                 except Exception:
                     self.app.logger.error("Error in SparkReader:", exc_info=True)
                     time.sleep(3)
+                finally:
+                    self.shutdown_executors()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+import unittest
+
+from sqlalchemy import text
+
+from listenbrainz.db.similarity import SimilarRecordingsDataset
+from listenbrainz.db.testing import TimescaleTestCase
+from listenbrainz.spark.spark_dataset import _format_copy_row
+
+
+class FormatCopyRowTestCase(unittest.TestCase):
+
+    def test_format_copy_row(self):
+        # empty strings are quoted so that they are not read as NULL
+        self.assertEqual(_format_copy_row(["rock", "", None, 3, 0.5]), '"rock","",\\N,3,0.5\n')
+        self.assertEqual(_format_copy_row(['say "hi", bye', "\\N"]), '"say ""hi"", bye","\\N"\n')
+
+
+class DatabaseDatasetTestCase(TimescaleTestCase):
+
+    def test_dataset_lifecycle(self):
+        SimilarRecordingsDataset.handle_start({"type": "similarity_recording_start"})
+        conn = SimilarRecordingsDataset._conn
+
+        SimilarRecordingsDataset.handle_insert({
+            "type": "similarity_recording",
+            "data": [
+                {"mbid0": "e97f805a-ab48-4c52-855e-07049142113d", "mbid1": "5d6d3d5e-7d4a-44b2-8a3b-37e2e2a1a5a4", "score": 10},
+                {"mbid0": "5d6d3d5e-7d4a-44b2-8a3b-37e2e2a1a5a4", "mbid1": "e97f805a-ab48-4c52-855e-07049142113d", "score": 8},
+            ]
+        })
+        SimilarRecordingsDataset.handle_insert({
+            "type": "similarity_recording",
+            "data": [
+                {"mbid0": "e97f805a-ab48-4c52-855e-07049142113d", "mbid1": "1fd178b4-1d2e-4a4a-b3e7-8a5d0c5b0f0e", "score": 3},
+            ]
+        })
+        # the same connection is used for all the messages of the dataset
+        self.assertIs(SimilarRecordingsDataset._conn, conn)
+
+        SimilarRecordingsDataset.handle_end({"type": "similarity_recording_end", "algorithm": "test"})
+        self.assertIsNone(SimilarRecordingsDataset._conn)
+
+        rows = self.ts_conn.execute(text("""
+            SELECT mbid0::TEXT, mbid1::TEXT, score FROM similarity.recording ORDER BY score DESC
+        """)).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [
+            ("e97f805a-ab48-4c52-855e-07049142113d", "5d6d3d5e-7d4a-44b2-8a3b-37e2e2a1a5a4", 10),
+            ("5d6d3d5e-7d4a-44b2-8a3b-37e2e2a1a5a4", "e97f805a-ab48-4c52-855e-07049142113d", 8),
+            ("e97f805a-ab48-4c52-855e-07049142113d", "1fd178b4-1d2e-4a4a-b3e7-8a5d0c5b0f0e", 3),
+        ])
@@ -0,0 +1,100 @@
+import threading
+import unittest
+from unittest import mock
+
+import orjson
+
+from listenbrainz.spark.spark_reader import SparkReader, COUCHDB_FAMILY, DEFAULT_FAMILY
+from listenbrainz.webserver import create_app
+
+
+class SparkReaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.reader = SparkReader(self.app)
+        self.reader.register_handlers()
+
+    def tearDown(self):
+        self.reader.shutdown_executors()
+
+    @staticmethod
+    def make_message(response_type):
+        message = mock.MagicMock()
+        message.body = orjson.dumps({"type": response_type})
+        return message
+
+    def wait_for_family(self, family):
+        """ Wait for the messages submitted to the executor of the family so far to be processed """
+        self.reader.executors[family].submit(lambda: None).result()
+
+    def test_get_family(self):
+        self.assertEqual(self.reader.get_family("user_entity"), COUCHDB_FAMILY)
+        self.assertEqual(self.reader.get_family("couchdb_data_start"), COUCHDB_FAMILY)
+        self.assertEqual(self.reader.get_family("similarity_recording_start"), "similarity_recording")
+        self.assertEqual(self.reader.get_family("similarity_recording"), "similarity_recording")
+        self.assertEqual(self.reader.get_family("popularity_top_recording_end"), "popularity_top_recording")
+        self.assertEqual(self.reader.get_family("cf_recommendations_recording_model"), "recommendations")
+        self.assertEqual(self.reader.get_family("year_in_music_top_stats"), "year_in_music")
+        self.assertEqual(self.reader.get_family("troi_playlists_end"), "troi_playlists")
+        self.assertEqual(self.reader.get_family("import_full_dump"), DEFAULT_FAMILY)
+        self.assertEqual(self.reader.get_family("unknown"), DEFAULT_FAMILY)
+
+    @mock.patch.object(SparkReader, "producer", new_callable=mock.PropertyMock)
+    def test_route(self, mock_producer):
+        message = self.make_message("user_entity")
+        message.ack.side_effect = lambda: mock_producer.return_value.publish.assert_called_once()
+        self.reader.route(message)
+
+        _, kwargs = mock_producer.return_value.publish.call_args
+        self.assertEqual(kwargs["routing_key"], COUCHDB_FAMILY)
+        self.assertEqual(kwargs["exchange"], self.reader.family_exchange)
+        message.ack.assert_called_once()
+
+    def test_message_is_acked_after_completion(self):
+        started, release = threading.Event(), threading.Event()
+
+        def handler(response):
+            started.set()
+            release.wait(5)
+
+        self.reader.response_handlers["user_entity"] = handler
+        self.reader.response_handlers["echo"] = lambda response: None
+        couchdb_message = self.make_message("user_entity")
+        echo_message = self.make_message("echo")
+
+        self.reader.callback(couchdb_message, COUCHDB_FAMILY)
+        self.reader.callback(echo_message, DEFAULT_FAMILY)
+        started.wait(5)
+        self.wait_for_family(DEFAULT_FAMILY)
+
+        # a message of another family is not held back by the message being processed
+        self.reader.on_iteration()
+        echo_message.ack.assert_called_once()
+        couchdb_message.ack.assert_not_called()
+
+        release.set()
+        self.wait_for_family(COUCHDB_FAMILY)
+        self.reader.on_iteration()
+        couchdb_message.ack.assert_called_once()
+
+    def test_shutdown_executors(self):
+        release = threading.Event()
+        handled = []
+
+        def handler(response):
+            release.wait(5)
+            handled.append(response["type"])
+
+        self.reader.response_handlers["user_entity"] = handler
+        message = self.make_message("user_entity")
+        self.reader.callback(message, COUCHDB_FAMILY)
+
+        threading.Timer(0.1, release.set).start()
+        self.reader.shutdown_executors()
+
+        # the message being processed is completed but its ack is discarded so that rabbitmq redelivers it
+        self.assertEqual(handled, ["user_entity"])
+        self.assertEqual(self.reader.executors, {})
+        self.reader.on_iteration()
+        message.ack.assert_not_called()
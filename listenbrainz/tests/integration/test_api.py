@@ -220,6 +220,39 @@ class APITestCase(ListenAPIIntegrationTestCase):
         self.assertEqual(data['listens'][1]['listened_at'], 1400000100)
         self.assertEqual(data['listens'][2]['listened_at'], 1400000000)
 
+    def test_get_listens_cursor(self):
+        """ Test paginating through the listens using the returned cursors """
+        with open(self.path_to_data_file('valid_single.json'), 'r') as f:
+            payload = json.load(f)
+
+        ts = 1400000000
+        user = db_user.get_or_create(self.db_conn, 1, 'test_cursor')
+        for i in range(3):
+            payload['payload'][0]['listened_at'] = ts + (100 * i)
+            response = self.send_data(payload, user, recalculate=True)
+            self.assert200(response)
+
+        url = self.custom_url_for('api_v1.get_listens', user_name=user['musicbrainz_id'])
+        self.wait_for_query_to_have_items(url, 3)
+
+        response = self.client.get(url, query_string={'count': 2})
+        self.assert200(response)
+        data = response.json['payload']
+        self.assertEqual([listen['listened_at'] for listen in data['listens']], [1400000200, 1400000100])
+        self.assertIsNotNone(data['next_cursor'])
+
+        response = self.client.get(url, query_string={'count': 2, 'cursor': data['next_cursor']})
+        self.assert200(response)
+        data = response.json['payload']
+        self.assertEqual([listen['listened_at'] for listen in data['listens']], [1400000000])
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.client.get(url, query_string={'cursor': 'not a cursor'})
+        self.assert400(response)
+
+        response = self.client.get(url, query_string={'cursor': 'not a cursor', 'max_ts': ts})
+        self.assert400(response)
+
     def test_zero_listens_payload(self):
         """ Test that API returns 400 for payloads with no listens
         """
@@ -532,6 +532,65 @@ class PlaylistAPITestCase(IntegrationTestCase):
         )
         self.assert400(response)
 
+    @mock.patch("listenbrainz.webserver.views.playlist_api.fetch_playlist_recording_metadata")
+    def test_playlist_get_render_cache(self, mock_fetch_metadata):
+        """ Test that the rendered playlist is served from the cache until the playlist changes """
+        playlist = get_test_data()
+        response = self.client.post(
+            self.custom_url_for("playlist_api_v1.create_playlist"),
+            json=playlist,
+            headers={"Authorization": "Token {}".format(self.user["auth_token"])}
+        )
+        self.assert200(response)
+        playlist_mbid = response.json["playlist_mbid"]
+
+        for _ in range(2):
+            response = self.client.get(
+                self.custom_url_for("playlist_api_v1.get_playlist", playlist_mbid=playlist_mbid),
+                headers={"Authorization": "Token {}".format(self.user["auth_token"])}
+            )
+            self.assert200(response)
+            self.assertEqual(len(response.json["playlist"]["track"]), 1)
+        mock_fetch_metadata.assert_called_once()
+
+        add_recording = {
+            "playlist": {
+                "track": [
+                    {
+                        "identifier": PLAYLIST_TRACK_URI_PREFIX + "4a77a078-e91a-4522-a409-3b58aa7de3ae"
+                    }
+                ],
+            }
+        }
+        response = self.client.post(
+            self.custom_url_for("playlist_api_v1.add_playlist_item", playlist_mbid=playlist_mbid),
+            headers={"Authorization": "Token {}".format(self.user["auth_token"])},
+            json=add_recording
+        )
+        self.assert200(response)
+
+        response = self.client.get(
+            self.custom_url_for("playlist_api_v1.get_playlist", playlist_mbid=playlist_mbid),
+            headers={"Authorization": "Token {}".format(self.user["auth_token"])}
+        )
+        self.assert200(response)
+        self.assertEqual(response.json["playlist"]["track"][1]["identifier"],
+                         add_recording["playlist"]["track"][0]["identifier"])
+        self.assertEqual(mock_fetch_metadata.call_count, 2)
+
+        # the cached render of a private playlist is not served to other users
+        response = self.client.post(
+            self.custom_url_for("playlist_api_v1.edit_playlist", playlist_mbid=playlist_mbid),
+            json={"playlist": {"extension": {PLAYLIST_EXTENSION_URI: {"public": False}}}},
+            headers={"Authorization": "Token {}".format(self.user["auth_token"])}
+        )
+        self.assert200(response)
+        response = self.client.get(
+            self.custom_url_for("playlist_api_v1.get_playlist", playlist_mbid=playlist_mbid),
+            headers={"Authorization": "Token {}".format(self.user2["auth_token"])}
+        )
+        self.assert404(response)
+
     def test_playlist_recording_move(self):
 
         playlist = {
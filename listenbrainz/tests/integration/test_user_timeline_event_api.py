@@ -26,6 +26,7 @@ from unittest import mock
 import requests_mock
 
 import listenbrainz.db.user as db_user
+import listenbrainz.db.user_feed as db_user_feed
 import listenbrainz.db.user_timeline_event as db_user_timeline_event
 import listenbrainz.db.user_relationship as db_user_relationship
 import time
@@ -56,6 +57,14 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         # catch uncaught exceptions works and wraps those in a 500.
         self.app.config["TESTING"] = False
 
+    def get_feed_events(self, event_type: UserTimelineEventType):
+        """ Load the events of the given type in the feed of the test user. """
+        refs = db_user_feed.get_feed_events(self.db_conn, self.user['id'], 0, int(time.time()) + 1000, 50)
+        ids = [ref["event_id"] for ref in refs if ref["event_type"] == event_type]
+        if event_type == UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION:
+            return db_user_timeline_event.get_personal_recommendation_events_by_ids(self.db_conn, ids)
+        return db_user_timeline_event.get_user_timeline_events_by_ids(self.db_conn, ids)
+
     def test_recommendation_writes_an_event_to_the_database(self):
         metadata = {'recording_msid': str(uuid.uuid4())}
         r = self.client.post(
@@ -66,13 +75,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         )
         self.assert200(r)
 
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=[self.user['id']],
-            min_ts=0,
-            max_ts=int(time.time()) + 1000,
-            count=1,
-        )
+        events = self.get_feed_events(UserTimelineEventType.RECORDING_RECOMMENDATION)
         self.assertEqual(1, len(events))
         self.assertEqual(metadata["recording_msid"], events[0].metadata.recording_msid)
 
@@ -87,13 +90,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         )
         self.assert200(r)
 
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=[self.user['id']],
-            min_ts=0,
-            max_ts=int(time.time()) + 1000,
-            count=1,
-        )
+        events = self.get_feed_events(UserTimelineEventType.RECORDING_RECOMMENDATION)
         self.assertEqual(1, len(events))
         self.assertEqual(metadata['recording_mbid'], events[0].metadata.recording_mbid)
 
@@ -122,13 +119,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         self.assert401(r)
 
         # check that no events were created in the database
-        events = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-            self.db_conn,
-            user_ids=[self.user['id']],
-            min_ts=0,
-            max_ts=int(time.time()) + 1000,
-            count=1,
-        )
+        events = self.get_feed_events(UserTimelineEventType.RECORDING_RECOMMENDATION)
         self.assertListEqual([], events)
 
     def test_recommendation_validates_metadata_json(self):
@@ -653,13 +644,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         self.assertEqual(self.review_metadata["entity_name"], data["metadata"]["entity_name"])
         self.assertEqual(review_id, data["metadata"]["review_id"])
 
-        events = db_user_timeline_event.get_cb_review_events(
-            self.db_conn,
-            user_ids=[self.user['id']],
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=1,
-        )
+        events = self.get_feed_events(UserTimelineEventType.CRITIQUEBRAINZ_REVIEW)
         self.assertEqual(1, len(events))
         self.assertEqual('Heart Shaker', events[0].metadata.entity_name)
         self.assertEqual(review_id, events[0].metadata.review_id)
@@ -683,13 +668,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         self.assert401(r)
 
         # check that no events were created in the database
-        events = db_user_timeline_event.get_cb_review_events(
-            self.db_conn,
-            user_ids=[self.user['id']],
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=1,
-        )
+        events = self.get_feed_events(UserTimelineEventType.CRITIQUEBRAINZ_REVIEW)
         self.assertListEqual([], events)
 
     def test_critiquebrainz_validates_metadata_json(self):
@@ -882,13 +861,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         )
         self.assert200(r)
 
-        events = db_user_timeline_event.get_personal_recommendation_events_for_feed(
-            self.db_conn,
-            user_id=self.user['id'],
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=50
-        )
+        events = self.get_feed_events(UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION)
 
         self.assertEqual(1, len(events))
 
@@ -1055,13 +1028,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         self.assert200(r)
         db_user_relationship.delete(self.db_conn, user_two['id'], self.user['id'], 'follow')
 
-        events = db_user_timeline_event.get_personal_recommendation_events_for_feed(
-            self.db_conn,
-            user_id=self.user['id'],
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=50
-        )
+        events = self.get_feed_events(UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION)
 
         self.assertEqual(1, len(events))
 
@@ -1093,13 +1060,7 @@ class UserTimelineAPITestCase(ListenAPIIntegrationTestCase):
         )
         self.assert200(r)
 
-        events = db_user_timeline_event.get_personal_recommendation_events_for_feed(
-            self.db_conn,
-            user_id=self.user['id'],
-            min_ts=0,
-            max_ts=int(time.time()) + 10,
-            count=50
-        )
+        events = self.get_feed_events(UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION)
 
         self.assertEqual(1, len(events))
 
@@ -102,3 +102,22 @@ class ListenTestCase(unittest.TestCase):
         listen = Listen.from_json(json_row)
 
         self.assertEqual(listen.timestamp, json_row['listened_at'])
+
+    def test_lazy_conversions(self):
+        listen = Listen(
+            timestamp=1525557084,
+            user_id=1,
+            data={
+                'artist_name': 'Radiohead',
+                'track_name': 'True Love Waits',
+                'additional_info': {'flat': 'value', 'nested': {'key': 'value', 'deeper': {'key': 1}}}
+            }
+        )
+        self.assertFalse(hasattr(listen, '__dict__'))
+        self.assertEqual(listen.timestamp, datetime.utcfromtimestamp(1525557084))
+        self.assertEqual(listen.data['additional_info'], {
+            'flat': 'value',
+            'nested.key': 'value',
+            'nested.deeper.key': 1
+        })
+        self.assertEqual(listen.to_json()['timestamp'], 1525557084)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+""" Micro-benchmark of the CPU bound parts of the timescale writer's post-insert fan-out stage: finding
+the unique listens among the submitted ones and serializing them for the unique exchange.
+
+The previous string key based matcher is kept here for comparison.
+
+    python3 -m listenbrainz.timescale_writer.benchmark_fanout --sizes 100,1000,10000 --duplicates 0.1
+"""
+import random
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+import click
+
+from listenbrainz.listen import Listen
+from listenbrainz.timescale_writer.timescale_writer import get_unique_listens, serialize_listens
+
+
+def get_unique_listens_string_keys(data, rows_inserted):
+    """ The matcher used before get_unique_listens, building a formatted string key for every row and listen. """
+    unique = []
+    inserted_index = {}
+    for inserted in rows_inserted:
+        inserted_index['%d-%s-%s' % (int(inserted[0].timestamp()), inserted[1], inserted[2])] = 1
+
+    for listen in data:
+        k = '%d-%s-%s' % (listen.ts_since_epoch, listen.user_id, listen.recording_msid)
+        if k in inserted_index:
+            unique.append(listen)
+    return unique
+
+
+def generate_batch(size: int, duplicates: float):
+    """ Generate a batch of listens and the rows the listenstore would report as inserted for it. """
+    listens = []
+    rows_inserted = []
+    for i in range(size):
+        listen = Listen(
+            user_id=random.randint(1, 10000),
+            user_name="benchmark",
+            timestamp=1400000000 + i,
+            recording_msid=str(uuid.uuid4()),
+            data={
+                "artist_name": "Frank Ocean",
+                "track_name": f"Pretty Sweet {i}",
+                "release_name": "Blond",
+                "additional_info": {"track_number": "5", "duration_ms": 158000},
+            },
+        )
+        listens.append(listen)
+        if random.random() >= duplicates:
+            rows_inserted.append((
+                datetime.fromtimestamp(listen.ts_since_epoch, tz=timezone.utc),
+                listen.user_id,
+                listen.recording_msid
+            ))
+    return listens, rows_inserted
+
+
+@click.command()
+@click.option("--sizes", default="100,1000,10000", help="comma separated batch sizes to benchmark")
+@click.option("--duplicates", default=0.1, help="fraction of listens in a batch which are duplicates")
+@click.option("--repeat", default=5, help="number of timing repetitions, the best one is reported")
+def main(sizes, duplicates, repeat):
+    print(f"{'listens':>8} {'stage':>20} {'best (ms)':>10} {'per listen (us)':>16}")
+    for size in [int(s) for s in sizes.split(",")]:
+        listens, rows_inserted = generate_batch(size, duplicates)
+        unique = get_unique_listens(listens, rows_inserted)
+        assert unique == get_unique_listens_string_keys(listens, rows_inserted)
+
+        stages = [
+            ("string keys match", lambda: get_unique_listens_string_keys(listens, rows_inserted)),
+            ("tuple index match", lambda: get_unique_listens(listens, rows_inserted)),
+            ("serialize unique", lambda: serialize_listens(unique)),
+        ]
+        for name, stage in stages:
+            number = max(1, 100000 // size)
+            best = min(timeit.repeat(stage, number=number, repeat=repeat)) / number
+            print(f"{size:>8} {name:>20} {best * 1000:>10.3f} {best * 1e6 / size:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# approximate per entry overhead of the OrderedDict slot, its linked list node and the key tuple
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class MsidCache:
+    """ A bounded LRU cache of recently looked up msids, keyed on the normalized submission
+    tuple returned by :func:`listenbrainz.messybrainz.get_submission_key`.
+
+    The cache is bounded both by the number of entries and an approximate size in bytes of
+    the cached keys and values, whichever limit is hit first. The least recently used entries
+    are evicted once either limit is exceeded. The cache is safe to share between threads.
+
+    Args:
+        max_items: the maximum number of entries to keep in the cache
+        max_bytes: the approximate maximum memory the cached entries may use
+    """
+
+    def __init__(self, max_items: int, max_bytes: int):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # these are counts since the last time the metrics were retrieved
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _entry_size(key: tuple, msid: str) -> int:
+        size = ENTRY_OVERHEAD_BYTES + sys.getsizeof(msid)
+        for value in key:
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
+    def get(self, key: tuple) -> Optional[str]:
+        """ Return the msid cached for the key and mark it as recently used, None if not cached. """
+        with self._lock:
+            msid = self._entries.get(key)
+            if msid is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return msid
+
+    def put(self, key: tuple, msid: str):
+        """ Cache the msid for the key, evicting the least recently used entries if needed. """
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None:
+                self.size_bytes -= self._entry_size(key, existing)
+
+            self._entries[key] = msid
+            self.size_bytes += self._entry_size(key, msid)
+
+            while len(self._entries) > self.max_items or self.size_bytes > self.max_bytes:
+                old_key, old_msid = self._entries.popitem(last=False)
+                self.size_bytes -= self._entry_size(old_key, old_msid)
+                self.evictions += 1
+
+    def get_metrics(self) -> dict:
+        """ Return the cache counters accumulated since the last call and reset them. """
+        with self._lock:
+            data = {
+                "msid_cache_hits": self.hits,
+                "msid_cache_misses": self.misses,
+                "msid_cache_evictions": self.evictions,
+                "msid_cache_items": len(self._entries),
+                "msid_cache_bytes": self.size_bytes,
+            }
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            return data
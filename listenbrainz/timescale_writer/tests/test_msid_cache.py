@@ -0,0 +1,49 @@
+import unittest
+
+from listenbrainz.timescale_writer.msid_cache import MsidCache
+
+
+class MsidCacheTestCase(unittest.TestCase):
+
+    def test_get_put(self):
+        cache = MsidCache(max_items=10, max_bytes=1024 * 1024)
+        key = ("pretty sweet", "frank ocean", "blond", None, None)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "0becc74d-9ba9-44c5-afa4-2f4ffe380d67")
+        self.assertEqual(cache.get(key), "0becc74d-9ba9-44c5-afa4-2f4ffe380d67")
+
+        metrics = cache.get_metrics()
+        self.assertEqual(metrics["msid_cache_hits"], 1)
+        self.assertEqual(metrics["msid_cache_misses"], 1)
+        self.assertEqual(metrics["msid_cache_evictions"], 0)
+        self.assertEqual(metrics["msid_cache_items"], 1)
+
+        # counters are reset after retrieving them
+        metrics = cache.get_metrics()
+        self.assertEqual(metrics["msid_cache_hits"], 0)
+        self.assertEqual(metrics["msid_cache_misses"], 0)
+
+    def test_evict_least_recently_used(self):
+        cache = MsidCache(max_items=2, max_bytes=1024 * 1024)
+        cache.put(("a", "a", None, None, None), "msid-a")
+        cache.put(("b", "b", None, None, None), "msid-b")
+        # mark a as recently used so that b gets evicted
+        cache.get(("a", "a", None, None, None))
+        cache.put(("c", "c", None, None, None), "msid-c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(("a", "a", None, None, None)), "msid-a")
+        self.assertIsNone(cache.get(("b", "b", None, None, None)))
+        self.assertEqual(cache.get(("c", "c", None, None, None)), "msid-c")
+        self.assertEqual(cache.get_metrics()["msid_cache_evictions"], 1)
+
+    def test_evict_memory_limit(self):
+        cache = MsidCache(max_items=1000, max_bytes=1000)
+        for i in range(100):
+            cache.put((f"recording {i}", "artist", None, None, None), f"msid-{i}")
+        self.assertLessEqual(cache.size_bytes, 1000)
+        self.assertLess(len(cache), 100)
+        self.assertEqual(cache.get(("recording 99", "artist", None, None, None)), "msid-99")
+
+        cache.put(("recording 99", "artist", None, None, None), "msid-99")
+        self.assertLessEqual(cache.size_bytes, 1000)
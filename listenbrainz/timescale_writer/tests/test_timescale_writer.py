@@ -0,0 +1,199 @@
+import unittest
+import uuid
+from concurrent.futures import wait
+from datetime import datetime, timezone
+from unittest import mock
+
+import orjson
+
+from listenbrainz import messybrainz
+from listenbrainz.db import timescale
+from listenbrainz.db.testing import TimescaleTestCase
+from listenbrainz.listen import Listen
+from listenbrainz.timescale_writer.timescale_writer import get_unique_listens, TimescaleWriterSubscriber, \
+    LISTEN_INSERT_ERROR_SENTINEL, BATCH_MAX_DELAY
+from listenbrainz.webserver import create_app
+
+
+class TimescaleWriterTestCase(unittest.TestCase):
+
+    def test_get_unique_listens(self):
+        listens = [
+            Listen(
+                user_id=user_id,
+                timestamp=1400000000 + i,
+                recording_msid=str(uuid.uuid4()),
+                data={"artist_name": "Frank Ocean", "track_name": "Pretty Sweet", "additional_info": {}}
+            )
+            for i, user_id in enumerate([1, 2, 1, 3])
+        ]
+        rows_inserted = [
+            (datetime.fromtimestamp(listens[2].ts_since_epoch, tz=timezone.utc), 1, listens[2].recording_msid),
+            (datetime.fromtimestamp(listens[0].ts_since_epoch, tz=timezone.utc), 1, uuid.UUID(listens[0].recording_msid)),
+            # same listened_at and msid but a different user is not a match
+            (datetime.fromtimestamp(listens[1].ts_since_epoch, tz=timezone.utc), 5, listens[1].recording_msid),
+        ]
+        self.assertEqual(get_unique_listens(listens, rows_inserted), [listens[0], listens[2]])
+        self.assertEqual(get_unique_listens(listens, []), [])
+
+
+class TimescaleWriterBatchingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.subscriber = TimescaleWriterSubscriber(workers=2, batch_size=4)
+        # assign the msids without going to messybrainz
+        self.subscriber.messybrainz_lookup = lambda listens: [
+            {**listen, "recording_msid": str(uuid.uuid4())} for listen in listens
+        ]
+        self.subscriber.insert_to_listenstore = mock.MagicMock(side_effect=lambda listens: len(listens))
+        self.listened_at = 1400000000
+
+    def tearDown(self):
+        self.subscriber.executor.shutdown()
+        self.ctx.pop()
+
+    def make_message(self, count):
+        listens = []
+        for _ in range(count):
+            self.listened_at += 1
+            listens.append({
+                "user_id": 1,
+                "user_name": "iliekcomputers",
+                "listened_at": self.listened_at,
+                "track_metadata": {"artist_name": "Frank Ocean", "track_name": "Pretty Sweet"}
+            })
+        message = mock.MagicMock()
+        message.body = orjson.dumps(listens)
+        return message
+
+    def wait_for_lookups(self):
+        for batch in self.subscriber.in_flight:
+            wait(batch.lookups)
+
+    def inserted_timestamps(self):
+        return [
+            [listen.ts_since_epoch for listen in args[0]]
+            for args, _ in self.subscriber.insert_to_listenstore.call_args_list
+        ]
+
+    def test_batches_are_inserted_in_order(self):
+        messages = [self.make_message(2) for _ in range(5)]
+        for message in messages:
+            self.subscriber.batched_callback(message)
+        # the first 4 messages make two full batches, the last one is still pending
+        self.assertEqual(len(self.subscriber.pending_messages), 1)
+        self.wait_for_lookups()
+        self.subscriber.process_completed_batches()
+
+        self.assertEqual(self.inserted_timestamps(), [
+            [1400000001, 1400000002, 1400000003, 1400000004],
+            [1400000005, 1400000006, 1400000007, 1400000008],
+        ])
+        self.assertEqual(len(self.subscriber.in_flight), 0)
+
+    def test_messages_are_acked_after_insert(self):
+        messages = [self.make_message(2) for _ in range(2)]
+
+        def insert(listens):
+            for message in messages:
+                message.ack.assert_not_called()
+            return len(listens)
+
+        self.subscriber.insert_to_listenstore.side_effect = insert
+        for message in messages:
+            self.subscriber.batched_callback(message)
+        self.subscriber.process_completed_batches(wait=True)
+
+        self.subscriber.insert_to_listenstore.assert_called_once()
+        # acking the last message of the batch acks the whole batch
+        messages[0].ack.assert_not_called()
+        messages[1].ack.assert_called_once_with(multiple=True)
+
+    def test_failed_insert_is_retried(self):
+        message = self.make_message(3)
+        self.subscriber.insert_to_listenstore.side_effect = [LISTEN_INSERT_ERROR_SENTINEL, 3]
+        self.subscriber.batched_callback(message)
+        self.subscriber.flush_pending()
+        self.wait_for_lookups()
+
+        # the batch stays in flight and its message is not acked so that rabbitmq can redeliver it
+        self.subscriber.process_completed_batches()
+        self.assertEqual(len(self.subscriber.in_flight), 1)
+        message.ack.assert_not_called()
+
+        self.subscriber.process_completed_batches()
+        self.assertEqual(len(self.subscriber.in_flight), 0)
+        message.ack.assert_called_once_with(multiple=True)
+        self.assertEqual(self.inserted_timestamps(), [[1400000001, 1400000002, 1400000003]] * 2)
+
+    def test_waiting_retries_failed_insert(self):
+        message = self.make_message(4)
+        self.subscriber.insert_to_listenstore.side_effect = [LISTEN_INSERT_ERROR_SENTINEL, 4]
+        self.subscriber.batched_callback(message)
+        self.subscriber.process_completed_batches(wait=True)
+
+        self.assertEqual(self.subscriber.insert_to_listenstore.call_count, 2)
+        self.assertEqual(len(self.subscriber.in_flight), 0)
+        message.ack.assert_called_once_with(multiple=True)
+
+    @mock.patch("listenbrainz.timescale_writer.timescale_writer.monotonic")
+    def test_pending_batch_is_flushed_after_delay(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        message = self.make_message(1)
+        self.subscriber.batched_callback(message)
+
+        mock_monotonic.return_value = 100 + BATCH_MAX_DELAY / 2
+        self.subscriber.on_iteration()
+        self.assertEqual(self.subscriber.pending_messages, [message])
+        self.assertEqual(len(self.subscriber.in_flight), 0)
+
+        mock_monotonic.return_value = 100 + BATCH_MAX_DELAY
+        self.subscriber.on_iteration()
+        self.assertEqual(self.subscriber.pending_messages, [])
+        self.wait_for_lookups()
+        self.subscriber.on_iteration()
+
+        self.assertEqual(self.inserted_timestamps(), [[1400000001]])
+        message.ack.assert_called_once_with(multiple=True)
+
+
+class TimescaleWriterMsidCacheTestCase(TimescaleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.subscriber = TimescaleWriterSubscriber()
+
+    def tearDown(self):
+        self.ctx.pop()
+        super().tearDown()
+
+    def make_listen(self):
+        return {
+            "user_id": 1,
+            "user_name": "iliekcomputers",
+            "listened_at": 1400000000,
+            "track_metadata": {
+                "artist_name": "Frank Ocean",
+                "track_name": "Pretty Sweet",
+                "release_name": "Blond",
+                "additional_info": {}
+            }
+        }
+
+    def test_cached_msids_are_stored_in_messybrainz(self):
+        msid = self.subscriber.messybrainz_lookup([self.make_listen()])[0]["recording_msid"]
+
+        # the second lookup is served from the cache
+        with mock.patch.object(messybrainz, "submit_listens_and_sing_me_a_sweet_song") as mock_submit:
+            cached_msid = self.subscriber.messybrainz_lookup([self.make_listen()])[0]["recording_msid"]
+            mock_submit.assert_not_called()
+        self.assertEqual(msid, cached_msid)
+
+        with timescale.engine.connect() as connection:
+            self.assertEqual(messybrainz.get_msid(connection, "Pretty Sweet", "Frank Ocean", "Blond"), cached_msid)
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
 from datetime import datetime
+from math import ceil
 from time import monotonic
+from typing import Optional
 
 import psycopg2
 import orjson
@@ -14,17 +19,70 @@ from more_itertools import chunked
 
 from listenbrainz import messybrainz
 from listenbrainz.listen import Listen
+from listenbrainz.timescale_writer.msid_cache import MsidCache
 from listenbrainz.utils import get_fallback_connection_name
 from listenbrainz.webserver import create_app, redis_connection, timescale_connection
-from listenbrainz.webserver.views.api_tools import MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP
 
 METRIC_UPDATE_INTERVAL = 60  # seconds
 LISTEN_INSERT_ERROR_SENTINEL = -1  #
 
+# bounds of the in-process cache of recently looked up msids
+MSID_CACHE_MAX_ITEMS = 250000
+MSID_CACHE_MAX_BYTES = 128 * 1024 * 1024  # 128 MB
+
+# batched mode: flush the pending messages as one batch once any of these limits is reached
+DEFAULT_BATCH_SIZE = 5000  # listens
+BATCH_MAX_MESSAGES = 200  # keep MAX_IN_FLIGHT_BATCHES * BATCH_MAX_MESSAGES below the prefetch count
+BATCH_MAX_DELAY = 1  # seconds
+# number of batches whose MessyBrainz lookup may be in progress while the oldest one is inserted
+MAX_IN_FLIGHT_BATCHES = 2
+
+
+def get_unique_listens(data: list[Listen], rows_inserted: list[tuple]) -> list[Listen]:
+    """ Return the listens which were actually inserted by the ListenStore, in the order they were submitted.
+
+    Args:
+        data: the listens that were submitted to the ListenStore
+        rows_inserted: the (listened_at, user_id, recording_msid) rows reported as inserted by the ListenStore
+    """
+    inserted_index = {(int(listened_at.timestamp()), user_id, str(msid)) for listened_at, user_id, msid in rows_inserted}
+    return [
+        listen for listen in data
+        if (listen.ts_since_epoch, listen.user_id, listen.recording_msid) in inserted_index
+    ]
+
+
+def serialize_listens(listens: list[Listen]) -> str:
+    """ Serialize the listens in the format published to the unique exchange. """
+    return orjson.dumps([listen.to_json() for listen in listens]).decode("utf-8")
+
+
+@dataclass
+class ListenBatch:
+    """ Messages gathered into one batch in batched mode, along with the MessyBrainz lookups of
+    their listens running in the worker pool. """
+    messages: list[Message]
+    lookups: list[Future]
+    listens: Optional[list[Listen]] = field(default=None)
+
+    def lookups_done(self):
+        return all(lookup.done() for lookup in self.lookups)
+
 
 class TimescaleWriterSubscriber(ConsumerProducerMixin):
+    """ Consumes incoming listens, assigns msids, inserts them into the listenstore and publishes the unique ones.
+
+    By default, each message is handled completely before the next one is consumed. If workers are specified,
+    incoming messages are instead gathered into batches of up to batch_size listens. The MessyBrainz lookups of
+    a batch are split across a pool of worker threads and run while the previous batch is inserted. All messages
+    of a batch are acked together once its listens have been inserted.
 
-    def __init__(self):
+    Args:
+        workers: the number of threads used for MessyBrainz lookups in batched mode, 0 disables batching
+        batch_size: the number of listens to gather in a batch before inserting them in batched mode
+    """
+
+    def __init__(self, workers: int = 0, batch_size: int = DEFAULT_BATCH_SIZE):
         self.connection = None
 
         self.incoming_exchange = Exchange(current_app.config["INCOMING_EXCHANGE"], "fanout", durable=False)
@@ -37,31 +95,48 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
         # these are counts since the last metric update was submitted
         self.incoming_listens = 0
         self.unique_listens = 0
+        self.msid_cache = MsidCache(MSID_CACHE_MAX_ITEMS, MSID_CACHE_MAX_BYTES)
         self.metric_submission_time = monotonic() + METRIC_UPDATE_INTERVAL
 
+        self.app = current_app._get_current_object()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers else None
+        self.reset_batches()
+
+    def reset_batches(self):
+        """ Discard the pending and in-flight batches, their messages will be redelivered by rabbitmq. """
+        self.pending_messages = []
+        self.pending_listens = []
+        self.pending_since = None
+        self.in_flight = deque()
+
     def get_consumers(self, _, channel):
+        on_message = self.batched_callback if self.executor else self.callback
         return [
             Consumer(
                 channel,
                 queues=[self.incoming_queue],
-                on_message=lambda x: self.callback(x),
+                on_message=lambda x: on_message(x),
                 prefetch_count=500
             )
         ]
 
-    def callback(self, message: Message):
-        listens = orjson.loads(message.body)
-
-        msb_listens = []
-        for chunk in chunked(listens, MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP):
-            msb_listens.extend(self.messybrainz_lookup(chunk))
-
+    @staticmethod
+    def to_listens(msb_listens) -> list[Listen]:
         submit = []
         for listen in msb_listens:
             try:
                 submit.append(Listen.from_json(listen))
             except ValueError:
                 pass
+        return submit
+
+    def callback(self, message: Message):
+        listens = orjson.loads(message.body)
+
+        msb_listens = self.messybrainz_lookup(listens)
+        submit = self.to_listens(msb_listens)
 
         ret = self.insert_to_listenstore(submit)
 
@@ -73,6 +148,72 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
 
         return ret
 
+    def batched_callback(self, message: Message):
+        if not self.pending_messages:
+            self.pending_since = monotonic()
+        self.pending_messages.append(message)
+        self.pending_listens.extend(orjson.loads(message.body))
+
+        if len(self.pending_listens) >= self.batch_size or len(self.pending_messages) >= BATCH_MAX_MESSAGES:
+            self.flush_pending()
+        self.process_completed_batches()
+
+    def on_iteration(self):
+        """ Called by kombu before waiting for new messages, flush batches which have been pending for too long
+        in case the incoming rate is low. """
+        if self.executor is None:
+            return
+        if self.pending_messages and monotonic() - self.pending_since >= BATCH_MAX_DELAY:
+            self.flush_pending()
+        self.process_completed_batches()
+
+    def _messybrainz_lookup_in_worker(self, listens):
+        with self.app.app_context():
+            return self.messybrainz_lookup(listens)
+
+    def flush_pending(self):
+        """ Start the MessyBrainz lookups for the pending messages in the worker pool. """
+        # wait for the oldest batch to be inserted if too many are in flight already
+        if len(self.in_flight) >= MAX_IN_FLIGHT_BATCHES:
+            self.process_completed_batches(wait=True)
+
+        chunk_size = max(1, ceil(len(self.pending_listens) / self.workers))
+        lookups = [
+            self.executor.submit(self._messybrainz_lookup_in_worker, chunk)
+            for chunk in chunked(self.pending_listens, chunk_size)
+        ]
+        self.in_flight.append(ListenBatch(messages=self.pending_messages, lookups=lookups))
+
+        self.pending_messages = []
+        self.pending_listens = []
+        self.pending_since = None
+
+    def process_completed_batches(self, wait=False):
+        """ Insert the in-flight batches whose lookups have completed, in the order they were received, and ack
+        their messages. If wait is True, block until the oldest batch has been inserted. """
+        while self.in_flight:
+            batch = self.in_flight[0]
+            if not wait and not batch.lookups_done():
+                break
+
+            if batch.listens is None:
+                msb_listens = []
+                for lookup in batch.lookups:
+                    msb_listens.extend(lookup.result())
+                batch.listens = self.to_listens(msb_listens)
+
+            # If there is an error, keep the batch and retry inserting it later. insert_to_listenstore
+            # sleeps before returning in this case so retrying does not hammer the database.
+            if self.insert_to_listenstore(batch.listens) == LISTEN_INSERT_ERROR_SENTINEL:
+                if wait:
+                    continue
+                break
+
+            self.in_flight.popleft()
+            # messages are delivered in order on the channel so acking the last one acks the whole batch
+            batch.messages[-1].ack(multiple=True)
+            wait = False
+
     def messybrainz_lookup(self, listens):
         msb_listens = []
         for listen in listens:
@@ -98,14 +239,32 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
 
             msb_listens.append(data)
 
-        try:
-            msb_responses = messybrainz.submit_listens_and_sing_me_a_sweet_song(msb_listens)
-        except (messybrainz.exceptions.BadDataException, messybrainz.exceptions.ErrorAddingException):
-            current_app.logger.error("MessyBrainz lookup for listens failed: ", exc_info=True)
-            return []
+        # skip the database for tracks whose msid has been looked up recently
+        msids = []
+        keys = []
+        uncached = []
+        for data in msb_listens:
+            key = messybrainz.get_submission_key(data)
+            msid = self.msid_cache.get(key)
+            if msid is None:
+                uncached.append(data)
+            msids.append(msid)
+            keys.append(key)
+
+        if uncached:
+            try:
+                msb_responses = iter(messybrainz.submit_listens_and_sing_me_a_sweet_song(uncached))
+            except (messybrainz.exceptions.BadDataException, messybrainz.exceptions.ErrorAddingException):
+                current_app.logger.error("MessyBrainz lookup for listens failed: ", exc_info=True)
+                return []
+
+            for idx, key in enumerate(keys):
+                if msids[idx] is None:
+                    msids[idx] = next(msb_responses)
+                    self.msid_cache.put(key, msids[idx])
 
         augmented_listens = []
-        for listen, msid in zip(listens, msb_responses):
+        for listen, msid in zip(listens, msids):
             listen['recording_msid'] = msid
             augmented_listens.append(listen)
         return augmented_listens
@@ -134,27 +293,39 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
             time.sleep(self.ERROR_RETRY_DELAY)
             return LISTEN_INSERT_ERROR_SENTINEL
 
-        if not rows_inserted:
-            return len(data)
+        if rows_inserted:
+            self.fanout_unique_listens(data, rows_inserted)
+
+        if monotonic() > self.metric_submission_time:
+            self.metric_submission_time += METRIC_UPDATE_INTERVAL
+            metrics.set(
+                "timescale_writer",
+                incoming_listens=self.incoming_listens,
+                unique_listens=self.unique_listens,
+                **self.msid_cache.get_metrics()
+            )
+            self.incoming_listens = 0
+            self.unique_listens = 0
+
+        return len(data)
+
+    def fanout_unique_listens(self, data: list[Listen], rows_inserted: list[tuple]):
+        """ Update the listen counts and recent listens in redis and publish the listens which were
+        inserted into the ListenStore, i.e. were not duplicates, to the unique exchange.
 
+        Args:
+            data: the listens that were submitted to the ListenStore
+            rows_inserted: the (listened_at, user_id, recording_msid) rows reported as inserted by the ListenStore
+        """
         try:
             redis_connection._redis.increment_listen_count_for_day(day=datetime.utcnow(), count=len(rows_inserted))
         except Exception:
             # Not critical, so if this errors out, just log it to Sentry and move forward
             current_app.logger.error("Could not update listen count per day in redis", exc_info=True)
 
-        unique = []
-        inserted_index = {}
-        for inserted in rows_inserted:
-            inserted_index['%d-%s-%s' % (int(inserted[0].timestamp()), inserted[1], inserted[2])] = 1
-
-        for listen in data:
-            k = '%d-%s-%s' % (listen.ts_since_epoch, listen.user_id, listen.recording_msid)
-            if k in inserted_index:
-                unique.append(listen)
-
+        unique = get_unique_listens(data, rows_inserted)
         if not unique:
-            return len(data)
+            return
 
         redis_connection._redis.update_recent_listens(unique)
         self.unique_listens += len(unique)
@@ -162,18 +333,10 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
         self.producer.publish(
             exchange=self.unique_exchange,
             routing_key="",
-            body=orjson.dumps([listen.to_json() for listen in unique]).decode("utf-8"),
+            body=serialize_listens(unique),
             delivery_mode=PERSISTENT_DELIVERY_MODE
         )
 
-        if monotonic() > self.metric_submission_time:
-            self.metric_submission_time += METRIC_UPDATE_INTERVAL
-            metrics.set("timescale_writer", incoming_listens=self.incoming_listens, unique_listens=self.unique_listens)
-            self.incoming_listens = 0
-            self.unique_listens = 0
-
-        return len(data)
-
     def init_rabbitmq_connection(self):
         self.connection = Connection(
             hostname=current_app.config["RABBITMQ_HOST"],
@@ -188,6 +351,7 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
         while True:
             try:
                 current_app.logger.info("Timescale Writer started.")
+                self.reset_batches()
                 self.init_rabbitmq_connection()
                 self.run()
             except KeyboardInterrupt:
@@ -201,5 +365,8 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
 if __name__ == "__main__":
     app = create_app()
     with app.app_context():
-        rc = TimescaleWriterSubscriber()
+        rc = TimescaleWriterSubscriber(
+            workers=app.config.get("TIMESCALE_WRITER_WORKERS", 0),
+            batch_size=app.config.get("TIMESCALE_WRITER_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        )
         rc.start()
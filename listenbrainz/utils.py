@@ -57,10 +57,21 @@ def connect_to_rabbitmq(username, password,
             time.sleep(error_retry_delay)
 
 
+_cache_initialized = False
+
+
 def init_cache(host, port, namespace):
     """ Initializes brainzutils cache. """
+    global _cache_initialized
     from brainzutils import cache
     cache.init(host=host, port=port, namespace=namespace)
+    _cache_initialized = True
+
+
+def cache_available() -> bool:
+    """ Whether the brainzutils cache has been initialized with init_cache in this process. Some processes like
+    the labs api never initialize it, the optional redis caches of the db modules are skipped for them. """
+    return _cache_initialized
 
 
 def create_channel_to_consume(connection, exchange: str, queue: str, callback_function, auto_ack: bool = False):
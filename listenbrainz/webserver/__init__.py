@@ -4,7 +4,7 @@ import pprint
 import sys
 from time import sleep
 
-from brainzutils import cache, metrics, sentry
+from brainzutils import metrics, sentry
 from brainzutils.flask import CustomFlask
 from flask import request, url_for, redirect, g
 from flask_login import current_user
@@ -13,6 +13,7 @@ from werkzeug.local import LocalProxy
 from listenbrainz import db
 from listenbrainz.db import create_test_database_connect_strings, timescale
 from listenbrainz.db.timescale import create_test_timescale_connect_strings
+from listenbrainz.utils import init_cache
 
 API_PREFIX = '/1'
 
@@ -39,6 +40,19 @@ def _get_ts_conn():
     return _ts_conn
 
 
+def close_connections():
+    """ Close the database connections opened in the current context, if any. """
+    _db_conn = getattr(g, "_db_conn", None)
+    if _db_conn is not None:
+        _db_conn.close()
+        del g._db_conn
+
+    _ts_conn = getattr(g, "_ts_conn", None)
+    if _ts_conn is not None:
+        _ts_conn.close()
+        del g._ts_conn
+
+
 db_conn = LocalProxy(_get_db_conn)
 ts_conn = LocalProxy(_get_ts_conn)
 
@@ -109,7 +123,7 @@ def create_app(debug=None):
         sentry.init_sentry(**sentry_config)
 
     # Initialize BU cache and metrics
-    cache.init(host=app.config['REDIS_HOST'], port=app.config['REDIS_PORT'], namespace=app.config['REDIS_NAMESPACE'])
+    init_cache(host=app.config['REDIS_HOST'], port=app.config['REDIS_PORT'], namespace=app.config['REDIS_NAMESPACE'])
     metrics.init("listenbrainz")
 
     # Database connections
@@ -126,15 +140,7 @@ def create_app(debug=None):
 
     @app.teardown_request
     def close_connection(exception):
-        _db_conn = getattr(g, "_db_conn", None)
-        if _db_conn is not None:
-            _db_conn.close()
-            del g._db_conn
-
-        _ts_conn = getattr(g, "_ts_conn", None)
-        if _ts_conn is not None:
-            _ts_conn.close()
-            del g._ts_conn
+        close_connections()
 
     # Redis connection
     from listenbrainz.webserver.redis_connection import init_redis_connection
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+""" Measure the p50/p99 latency of the top-N user entity stats endpoints for an existing user.
+
+The requests are made through the flask test client against the configured couchdb, so the numbers
+include fetching the stats from couchdb, validating them and serializing the response.
+
+    python3 -m listenbrainz.webserver.benchmark_stats_api --user rob --count 25 --requests 200
+"""
+import statistics
+import time
+import uuid
+
+import click
+
+from listenbrainz.webserver import create_web_app
+
+ENTITIES = ["artists", "recordings", "releases"]
+
+
+def percentile(timings: list[float], pct: int) -> float:
+    return statistics.quantiles(timings, n=100, method="inclusive")[pct - 1]
+
+
+@click.command()
+@click.option("--user", required=True, help="name of a user whose stats have been calculated")
+@click.option("--range", "stats_range", default="all_time", help="the stats range to request")
+@click.option("--count", default=25, help="number of entities to request")
+@click.option("--offset", default=0, help="number of entities to skip")
+@click.option("--requests", "num_requests", default=200, help="number of requests per endpoint")
+def main(user, stats_range, count, offset, num_requests):
+    app = create_web_app()
+    # whitelist a token for the benchmark so that the requests are not rate limited
+    token = str(uuid.uuid4())
+    app.config["WHITELISTED_AUTH_TOKENS"] = [token]
+    client = app.test_client()
+    headers = {"Authorization": f"Token {token}"}
+    params = {"range": stats_range, "count": count, "offset": offset}
+
+    print(f"{'endpoint':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    for entity in ENTITIES:
+        url = f"/1/stats/user/{user}/{entity}"
+        timings = []
+        for _ in range(num_requests):
+            start = time.monotonic()
+            response = client.get(url, query_string=params, headers=headers)
+            timings.append((time.monotonic() - start) * 1000)
+            if response.status_code != 200:
+                raise click.ClickException(f"{url} returned {response.status_code}: {response.text}")
+        print(f"{entity:>12} {percentile(timings, 50):>10.2f} {percentile(timings, 99):>10.2f} {max(timings):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
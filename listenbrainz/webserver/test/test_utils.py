@@ -12,3 +12,19 @@ class UtilsTestCase(ServerTestCase):
         self.assertEqual(len(str_1), length)
         self.assertEqual(len(str_2), length)
         self.assertNotEqual(str_1, str_2)  # Generated strings shouldn't be the same
+
+    def test_run_concurrently(self):
+        def lookup(value):
+            if value is None:
+                raise ValueError("no value")
+            return value * 2
+
+        with self.app.app_context():
+            self.assertEqual(utils.run_concurrently([]), [])
+            self.assertEqual(utils.run_concurrently([lambda: lookup(1)]), [2])
+            self.assertEqual(
+                utils.run_concurrently([lambda value=value: lookup(value) for value in range(10)]),
+                [value * 2 for value in range(10)]
+            )
+            with self.assertRaises(ValueError):
+                utils.run_concurrently([lambda: lookup(1), lambda: lookup(None)])
@@ -1,11 +1,13 @@
 import string
 import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
 
 import orjson
 from flask import current_app, request
 from flask_login import current_user
 
-from listenbrainz.webserver import db_conn
+from listenbrainz.webserver import db_conn, close_connections
 from listenbrainz.webserver.views.views_utils import get_current_spotify_user, get_current_youtube_user, \
     get_current_critiquebrainz_user, get_current_musicbrainz_user, get_current_soundcloud_user, get_current_apple_music_user
 import listenbrainz.db.user_setting as db_usersetting
@@ -17,6 +19,12 @@ REJECT_LISTENS_WITHOUT_EMAIL_ERROR = \
     'we need your email.'
 
 
+# the maximum number of threads used to run the independent lookups of a request concurrently
+MAX_CONCURRENT_LOOKUPS = 4
+
+T = TypeVar("T")
+
+
 def generate_string(length):
     """Generates random string with a specified length."""
     return ''.join([random.SystemRandom().choice(
@@ -97,3 +105,27 @@ def parse_boolean_arg(name, default=None):
         raise APIBadRequest("Invalid %s argument: %s. Must be 'true' or 'false'" % (name, value))
 
     return True if value == "true" else False
+
+
+def run_concurrently(lookups: List[Callable[[], T]]) -> List[T]:
+    """ Run the given independent lookups concurrently and return their results in the same order.
+
+    Each lookup runs in a fresh app context, so the database connections it opens through db_conn and ts_conn
+    are its own and are closed when it finishes. Lookups can't use the request context. If a lookup raises an
+    exception, it is raised here after all the lookups have finished.
+    """
+    if len(lookups) <= 1:
+        return [lookup() for lookup in lookups]
+
+    app = current_app._get_current_object()
+
+    def run(lookup):
+        with app.app_context():
+            try:
+                return lookup()
+            finally:
+                close_connections()
+
+    with ThreadPoolExecutor(max_workers=min(len(lookups), MAX_CONCURRENT_LOOKUPS)) as executor:
+        futures = [executor.submit(run, lookup) for lookup in lookups]
+    return [future.result() for future in futures]
@@ -14,7 +14,7 @@ from listenbrainz.db.lb_radio_artist import lb_radio_artist
 from data.model.external_service import ExternalServiceType
 from listenbrainz.db import listens_importer, tags
 from listenbrainz.db.exceptions import DatabaseException
-from listenbrainz.listenstore.timescale_listenstore import TimescaleListenStoreException
+from listenbrainz.listenstore.timescale_listenstore import TimescaleListenStoreException, decode_listens_cursor
 from listenbrainz.webserver import timescale_connection, db_conn, ts_conn
 from listenbrainz.webserver.decorators import api_listenstore_needed
 from listenbrainz.webserver.decorators import crossdomain
@@ -146,10 +146,15 @@ def get_listens(user_name):
     The optional ``max_ts`` and ``min_ts`` UNIX epoch timestamps control at which point in time to start returning listens. You may specify max_ts or
     min_ts, but not both in one call. Listens are always returned in descending timestamp order.
 
+    Unless ``min_ts`` is specified, the response also contains a ``next_cursor``. Pass it as the ``cursor`` argument to fetch the next (older)
+    page of listens. ``next_cursor`` is null if there are no more listens.
+
     :param max_ts: If you specify a ``max_ts`` timestamp, listens with listened_at less than (but not including) this value will be returned.
     :param min_ts: If you specify a ``min_ts`` timestamp, listens with listened_at greater than (but not including) this value will be returned.
+    :param cursor: Optional, the ``next_cursor`` of a previous response to continue from. Cannot be combined with ``max_ts`` or ``min_ts``.
     :param count: Optional, number of listens to return. Default: :data:`~webserver.views.api.DEFAULT_ITEMS_PER_GET` . Max: :data:`~webserver.views.api.MAX_ITEMS_PER_GET`
     :statuscode 200: Yay, you have data!
+    :statuscode 400: Invalid arguments, for instance an invalid cursor.
     :statuscode 404: The requested user was not found.
     :resheader Content-Type: *application/json*
     """
@@ -161,12 +166,32 @@ def get_listens(user_name):
     if min_ts and max_ts and min_ts >= max_ts:
         raise APIBadRequest("min_ts should be less than max_ts")
 
-    listens, min_ts_per_user, max_ts_per_user = timescale_connection._ts.fetch_listens(
-        user,
-        limit=count,
-        from_ts=datetime.utcfromtimestamp(min_ts) if min_ts else None,
-        to_ts=datetime.utcfromtimestamp(max_ts) if max_ts else None
-    )
+    cursor = request.args.get("cursor")
+    if cursor:
+        if min_ts or max_ts:
+            raise APIBadRequest("cursor cannot be used together with min_ts or max_ts")
+        try:
+            decode_listens_cursor(cursor)
+        except ValueError:
+            raise APIBadRequest("Invalid cursor: %s" % cursor)
+
+    payload = {}
+    if min_ts:
+        listens, min_ts_per_user, max_ts_per_user = timescale_connection._ts.fetch_listens(
+            user,
+            limit=count,
+            from_ts=datetime.utcfromtimestamp(min_ts),
+            to_ts=datetime.utcfromtimestamp(max_ts) if max_ts else None
+        )
+    else:
+        listens, min_ts_per_user, max_ts_per_user, next_cursor = timescale_connection._ts.fetch_listens_page(
+            user,
+            limit=count,
+            to_ts=datetime.utcfromtimestamp(max_ts) if max_ts else None,
+            cursor=cursor
+        )
+        payload["next_cursor"] = next_cursor
+
     listen_data = []
     for listen in listens:
         listen_data.append(listen.to_api())
@@ -177,6 +202,7 @@ def get_listens(user_name):
         'listens': listen_data,
         'latest_listen_ts': int(max_ts_per_user.timestamp()),
         'oldest_listen_ts': int(min_ts_per_user.timestamp()),
+        **payload
     }})
 
 
@@ -51,8 +51,6 @@ MAX_DURATION_LIMIT = 24 * 24 * 60 * 60
 #: The max permitted value of duration_ms field - 24 days
 MAX_DURATION_MS_LIMIT = MAX_DURATION_LIMIT * 1000
 
-MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP = 10
-
 
 # Define the values for types of listens
 LISTEN_TYPE_SINGLE = 1
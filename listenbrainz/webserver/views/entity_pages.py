@@ -1,12 +1,14 @@
 from datetime import datetime
 
+from brainzutils import musicbrainz_db
 from flask import Blueprint, render_template, current_app, redirect, url_for
 
 from listenbrainz.art.cover_art_generator import CoverArtGenerator
-from listenbrainz.db import popularity, similarity
+from listenbrainz.db import entity_page, popularity, similarity
 from listenbrainz.db.stats import get_entity_listener
 from listenbrainz.webserver import db_conn, ts_conn
 from listenbrainz.webserver.decorators import web_listenstore_needed
+from listenbrainz.webserver.utils import run_concurrently
 from listenbrainz.db.metadata import get_metadata_for_artist
 from listenbrainz.webserver.views.api_tools import is_valid_uuid
 from listenbrainz.webserver.views.metadata_api import fetch_release_group_metadata
@@ -97,36 +99,14 @@ def release_redirect(release_mbid):
         return redirect(url_for("album.album_entity", release_group_mbid=result["release_group_mbid"]))
 
 
-@artist_bp.route("/<artist_mbid>/", methods=["GET"])
-@web_listenstore_needed
-def artist_entity(artist_mbid):
-    """ Show a artist page with all their relevant information """
-    # VA artist mbid
-    if artist_mbid in {"89ad4ac3-39f7-470e-963a-56509c546377"}:
-        raise BadRequest(f"Provided artist mbid is disabled for viewing on ListenBrainz")
-
-    if not is_valid_uuid(artist_mbid):
-        raise BadRequest("Provided artist mbid is invalid: %s" % artist_mbid)
-
-    # Fetch the artist cached data
-    artist_data = get_metadata_for_artist(ts_conn, [artist_mbid])
-    if len(artist_data) == 0:
-        raise NotFound(f"artist {artist_mbid} not found in the metadata cache")
-
-    artist = {
-        "artist_mbid": str(artist_data[0].artist_mbid),
-        **artist_data[0].artist_data,
-        "tag": artist_data[0].tag_data,
-    }
-
-    popular_recordings = popularity.get_top_recordings_for_artist(db_conn, ts_conn, artist_mbid, 10)
-
+def get_similar_artists(artist_mbid):
+    """ Get the artists similar to the given artist with their metadata """
     try:
-        with psycopg2.connect(current_app.config["MB_DATABASE_URI"]) as mb_conn, \
-                mb_conn.cursor(cursor_factory=DictCursor) as mb_curs, \
+        with musicbrainz_db.engine.connect() as mb_conn, \
+                mb_conn.connection.cursor(cursor_factory=DictCursor) as mb_curs, \
                 ts_conn.connection.cursor(cursor_factory=DictCursor) as ts_curs:
 
-            similar_artists = similarity.get_artists(
+            return similarity.get_artists(
                 mb_curs,
                 ts_curs,
                 [artist_mbid],
@@ -134,7 +114,23 @@ def artist_entity(artist_mbid):
                 15
             )
     except IndexError:
-        similar_artists = []
+        return []
+
+
+def get_artist_release_groups(artist_mbid):
+    """ Get the cached metadata of the artist and its release groups with their popularity, sorted by popularity.
+
+    Returns ``(None, None)`` if the artist isn't in the metadata cache.
+    """
+    artist_data = get_metadata_for_artist(ts_conn, [artist_mbid])
+    if len(artist_data) == 0:
+        return None, None
+
+    artist = {
+        "artist_mbid": str(artist_data[0].artist_mbid),
+        **artist_data[0].artist_data,
+        "tag": artist_data[0].tag_data,
+    }
 
     release_group_data = artist_data[0].release_group_data
     release_group_mbids = [rg["mbid"] for rg in release_group_data]
@@ -147,13 +143,30 @@ def artist_entity(artist_mbid):
         release_groups.append(release_group)
 
     release_groups.sort(key=get_release_group_sort_key, reverse=True)
+    return artist, release_groups
 
-    listening_stats = get_entity_listener(db_conn, "artists", artist_mbid, "all_time")
+
+def get_listening_stats(entity, entity_mbid):
+    """ Get the all time listeners of the given entity """
+    listening_stats = get_entity_listener(db_conn, entity, entity_mbid, "all_time")
     if listening_stats is None:
         listening_stats = {
             "total_listen_count": 0,
             "listeners": []
         }
+    return listening_stats
+
+
+def get_artist_props(artist_mbid):
+    """ Load the data shown on the page of an artist, the independent lookups are run concurrently """
+    (artist, release_groups), popular_recordings, similar_artists, listening_stats = run_concurrently([
+        lambda: get_artist_release_groups(artist_mbid),
+        lambda: popularity.get_top_recordings_for_artist(db_conn, ts_conn, artist_mbid, 10),
+        lambda: get_similar_artists(artist_mbid),
+        lambda: get_listening_stats("artists", artist_mbid),
+    ])
+    if artist is None:
+        raise NotFound(f"artist {artist_mbid} not found in the metadata cache")
 
     try:
         cover_art = get_cover_art_for_artist(release_groups)
@@ -161,7 +174,7 @@ def artist_entity(artist_mbid):
         current_app.logger.error("Error generating cover art for artist:", exc_info=True)
         cover_art = None
 
-    props = {
+    return {
         "artist_data": artist,
         "popular_recordings": popular_recordings,
         "similar_artists": similar_artists,
@@ -170,26 +183,39 @@ def artist_entity(artist_mbid):
         "cover_art": cover_art
     }
 
-    return render_template("entities/artist.html",
-                           props=orjson.dumps(props).decode("utf-8"),
-                           title=artist_data[0].artist_data["name"])
 
-
-@album_bp.route("/<release_group_mbid>/", methods=["GET"])
+@artist_bp.route("/<artist_mbid>/", methods=["GET"])
 @web_listenstore_needed
-def album_entity(release_group_mbid):
-    """ Show an album page with all their relevant information """
+def artist_entity(artist_mbid):
+    """ Show a artist page with all their relevant information """
+    # VA artist mbid
+    if artist_mbid in {"89ad4ac3-39f7-470e-963a-56509c546377"}:
+        raise BadRequest(f"Provided artist mbid is disabled for viewing on ListenBrainz")
 
-    if not is_valid_uuid(release_group_mbid):
-        raise BadRequest("Provided release group ID is invalid: %s" % release_group_mbid)
+    if not is_valid_uuid(artist_mbid):
+        raise BadRequest("Provided artist mbid is invalid: %s" % artist_mbid)
+
+    version = entity_page.get_datasets_version()
+    page = entity_page.get_cached_props(version, "artist", artist_mbid)
+    if page is None:
+        props = get_artist_props(artist_mbid)
+        page = {"props": orjson.dumps(props).decode("utf-8"), "title": props["artist_data"]["name"]}
+        entity_page.set_cached_props(version, "artist", artist_mbid, page)
+
+    return render_template("entities/artist.html", props=page["props"], title=page["title"])
 
-    # Fetch the release group cached data
+
+def get_release_group_mediums(release_group_mbid):
+    """ Get the cached metadata of the release group and its mediums with the popularity of their tracks.
+
+    Returns ``(None, None)`` if the release group isn't in the metadata cache.
+    """
     metadata = fetch_release_group_metadata(
         [release_group_mbid],
         ["artist", "tag", "release", "recording"]
     )
     if len(metadata) == 0:
-        raise NotFound(f"Release group mbid {release_group_mbid} not found in the metadata cache")
+        return None, None
     release_group = metadata[release_group_mbid]
 
     recording_data = release_group.pop("recording")
@@ -207,27 +233,49 @@ def album_entity(release_group_mbid):
                 (None, None)
             )
 
-    listening_stats = get_entity_listener(db_conn, "release_groups", release_group_mbid, "all_time")
-    if listening_stats is None:
-        listening_stats = {
-            "total_listen_count": 0,
-            "listeners": []
-        }
+    return release_group, recording_data
+
 
-    props = {
+def get_album_props(release_group_mbid):
+    """ Load the data shown on the page of an album, the independent lookups are run concurrently """
+    (release_group, recording_data), listening_stats = run_concurrently([
+        lambda: get_release_group_mediums(release_group_mbid),
+        lambda: get_listening_stats("release_groups", release_group_mbid),
+    ])
+    if release_group is None:
+        raise NotFound(f"Release group mbid {release_group_mbid} not found in the metadata cache")
+
+    return {
         "release_group_mbid": release_group_mbid,
         "release_group_metadata": release_group,
         "recordings_release_mbid": recording_data.get("release_mbid"),
-        "mediums": mediums,
+        "mediums": recording_data.get("mediums", []),
         "caa_id": release_group["release_group"]["caa_id"],
         "caa_release_mbid": release_group["release_group"]["caa_release_mbid"],
         "type": release_group["release_group"].get("type"),
         "listening_stats": listening_stats
     }
 
-    return render_template("entities/album.html",
-                           props=orjson.dumps(props).decode("utf-8"),
-                           title=release_group["release_group"]["name"])
+
+@album_bp.route("/<release_group_mbid>/", methods=["GET"])
+@web_listenstore_needed
+def album_entity(release_group_mbid):
+    """ Show an album page with all their relevant information """
+
+    if not is_valid_uuid(release_group_mbid):
+        raise BadRequest("Provided release group ID is invalid: %s" % release_group_mbid)
+
+    version = entity_page.get_datasets_version()
+    page = entity_page.get_cached_props(version, "album", release_group_mbid)
+    if page is None:
+        props = get_album_props(release_group_mbid)
+        page = {
+            "props": orjson.dumps(props).decode("utf-8"),
+            "title": props["release_group_metadata"]["release_group"]["name"]
+        }
+        entity_page.set_cached_props(version, "album", release_group_mbid, page)
+
+    return render_template("entities/album.html", props=page["props"], title=page["title"])
 
 
 @release_group_bp.route("/<release_group_mbid>/", methods=["GET"])
@@ -7,7 +7,7 @@ from flask_login import current_user
 from listenbrainz.webserver import ts_conn, db_conn
 from listenbrainz.webserver.decorators import web_listenstore_needed
 from listenbrainz.webserver.views.api_tools import is_valid_uuid
-from listenbrainz.webserver.views.playlist_api import fetch_playlist_recording_metadata
+from listenbrainz.webserver.views.playlist_api import serialize_playlist_jspf
 import listenbrainz.db.playlist as db_playlist
 import listenbrainz.db.user as db_user
 
@@ -26,15 +26,13 @@ def load_playlist(playlist_mbid: str):
     if current_user.is_authenticated:
         current_user_id = current_user.id
 
-    playlist = db_playlist.get_by_mbid(db_conn, ts_conn, playlist_mbid, True)
+    playlist = db_playlist.get_by_mbid(db_conn, ts_conn, playlist_mbid, False)
     if playlist is None or not playlist.is_visible_by(current_user_id):
         raise NotFound("Cannot find playlist: %s" % playlist_mbid)
 
-    fetch_playlist_recording_metadata(playlist)
-
     props = {
         "labs_api_url": current_app.config["LISTENBRAINZ_LABS_API_URL"],
-        "playlist": playlist.serialize_jspf(),
+        "playlist": serialize_playlist_jspf(playlist),
     }
 
     playlist_creator = db_user.get(db_conn, playlist.creator_id)
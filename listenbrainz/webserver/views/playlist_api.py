@@ -258,6 +258,22 @@ def fetch_playlist_recording_metadata(playlist: Playlist):
         raise APIInternalServerError("Failed to fetch metadata for a playlist. Please try again.")
 
 
+def serialize_playlist_jspf(playlist: Playlist):
+    """ Return the JSPF of a playlist loaded without its recordings, with the metadata of the recordings.
+
+        The render is served from the playlist render cache while the playlist is unchanged.
+    """
+    jspf = db_playlist.get_cached_jspf(playlist)
+    if jspf is not None:
+        return jspf
+
+    playlist.recordings = db_playlist.get_recordings_for_playlists(db_conn, ts_conn, [playlist.id])[playlist.id]
+    fetch_playlist_recording_metadata(playlist)
+    jspf = playlist.serialize_jspf()
+    db_playlist.set_cached_jspf(playlist, jspf)
+    return jspf
+
+
 @playlist_api_bp.route("/create", methods=["POST", "OPTIONS"])
 @crossdomain
 @ratelimit()
@@ -474,7 +490,8 @@ def get_playlist(playlist_mbid):
 
     fetch_metadata = parse_boolean_arg("fetch_metadata", True)
 
-    playlist = db_playlist.get_by_mbid(db_conn, ts_conn, playlist_mbid, True)
+    # the recordings are only loaded if the playlist isn't in the render cache
+    playlist = db_playlist.get_by_mbid(db_conn, ts_conn, playlist_mbid, not fetch_metadata)
     if playlist is None:
         raise APINotFound("Cannot find playlist: %s" % playlist_mbid)
 
@@ -486,7 +503,7 @@ def get_playlist(playlist_mbid):
         raise APINotFound("Cannot find playlist: %s" % playlist_mbid)
 
     if fetch_metadata:
-        fetch_playlist_recording_metadata(playlist)
+        return jsonify(serialize_playlist_jspf(playlist))
 
     return jsonify(playlist.serialize_jspf())
 
@@ -309,11 +309,11 @@ def _get_entity_stats(user_name: str, entity: str, count_key: str):
     offset = get_non_negative_param("offset", default=0)
     count = get_non_negative_param("count", default=DEFAULT_ITEMS_PER_GET)
 
-    stats = db_stats.get(user["id"], entity, stats_range, EntityRecord)
+    stats = db_stats.get(user["id"], entity, stats_range, EntityRecord, offset, min(count, MAX_ITEMS_PER_GET))
     if stats is None:
         raise APINoContent('')
 
-    entity_list, total_entity_count = _process_user_entity(stats, offset, count)
+    entity_list, total_entity_count = [x.dict() for x in stats.data.__root__], stats.count
     return jsonify({"payload": {
         "user_id": user_name,
         entity: entity_list,
@@ -990,11 +990,12 @@ def _get_sitewide_stats(entity: str):
     offset = get_non_negative_param("offset", default=0)
     count = get_non_negative_param("count", default=DEFAULT_ITEMS_PER_GET)
 
-    stats = db_stats.get(db_stats.SITEWIDE_STATS_USER_ID, entity, stats_range, EntityRecord)
+    stats = db_stats.get(db_stats.SITEWIDE_STATS_USER_ID, entity, stats_range, EntityRecord,
+                         offset, min(count, MAX_ITEMS_PER_GET))
     if stats is None:
         raise APINoContent("")
 
-    entity_list, total_entity_count = _process_user_entity(stats, offset, count)
+    entity_list, total_entity_count = [x.dict() for x in stats.data.__root__], stats.count
     return jsonify({
         "payload": {
             entity: entity_list,
@@ -1214,28 +1215,6 @@ def year_in_music(user_name: str, year: int = 2023):
     })
 
 
-def _process_user_entity(stats: StatApi[EntityRecord], offset: int, count: int) -> Tuple[list[dict], int]:
-    """ Process the statistics data according to query params
-
-        Args:
-            stats: the dictionary containing statistic data
-            offset: number of entities to skip from the beginning
-            count: number of entities to return
-
-        Returns:
-            entity_list, total_entity_count: a tuple of a list and integer
-                containing the entities processed according to the query params and
-                total number of entities respectively
-    """
-
-    count = min(count, MAX_ITEMS_PER_GET)
-    count = count + offset
-    total_entity_count = stats.count
-    entity_list = [x.dict() for x in stats.data.__root__[offset:count]]
-
-    return entity_list, total_entity_count
-
-
 def _validate_stats_user_params(user_name) -> Tuple[Dict, str]:
     """ Validate and return the user and common stats params """
     user = db_user.get_by_mb_id(db_conn, user_name)
@@ -0,0 +1,27 @@
+import unittest
+from types import SimpleNamespace
+
+from listenbrainz.webserver.views.user_timeline_event_api import merge_events
+
+
+class MergeEventsTestCase(unittest.TestCase):
+
+    def test_merge_events(self):
+        consumed = []
+
+        def source(name, timestamps):
+            for ts in timestamps:
+                consumed.append((name, ts))
+                yield SimpleNamespace(name=name, created=ts)
+
+        def mark(event):
+            event.marked = True
+            return event
+
+        page = merge_events([source("a", [10, 7, 3, 1]), source("b", [9, 8, 2]), []], 4, mark)
+
+        self.assertEqual([(event.name, event.created) for event in page], [("a", 10), ("b", 9), ("b", 8), ("a", 7)])
+        self.assertTrue(all(event.marked for event in page))
+        # the merge stops once the page is full, the rest of the sources are never produced
+        self.assertNotIn(("a", 3), consumed)
+        self.assertNotIn(("a", 1), consumed)
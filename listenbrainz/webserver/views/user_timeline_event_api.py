@@ -16,9 +16,14 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 
+import heapq
 import time
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import List, Dict, Iterable
+from functools import partial
+from itertools import chain, islice
+from operator import attrgetter
+from typing import List, Dict, Iterable, Iterator, NamedTuple, Callable, Optional, TypeVar
 
 import pydantic
 import orjson
@@ -26,21 +31,25 @@ from brainzutils.ratelimit import ratelimit
 from flask import Blueprint, jsonify, request, current_app
 
 import listenbrainz.db.user as db_user
+import listenbrainz.db.user_feed as db_user_feed
 import listenbrainz.db.user_relationship as db_user_relationship
 import listenbrainz.db.user_timeline_event as db_user_timeline_event
 from data.model.listen import APIListen
 from listenbrainz.db.model.user_timeline_event import RecordingRecommendationMetadata, APITimelineEvent, SimilarUserTimelineEvent, UserTimelineEventType, \
     APIFollowEvent, NotificationMetadata, APINotificationEvent, APIPinEvent, APICBReviewEvent, \
-    CBReviewTimelineMetadata, PersonalRecordingRecommendationMetadata, APIPersonalRecommendationEvent
+    CBReviewTimelineMetadata, PersonalRecordingRecommendationMetadata, APIPersonalRecommendationEvent, UserTimelineEvent, \
+    HiddenUserTimelineEvent
+from listenbrainz.db.model.pinned_recording import PinnedRecording
 from listenbrainz.db.msid_mbid_mapping import fetch_track_metadata_for_items
 from listenbrainz.db.model.review import CBReviewMetadata
-from listenbrainz.db.pinned_recording import get_pins_for_feed, get_pin_by_id
+from listenbrainz.db.pinned_recording import get_pin_by_id, get_pins_by_ids
 from listenbrainz.db.exceptions import DatabaseException
 from listenbrainz.domain.critiquebrainz import CritiqueBrainzService
 from listenbrainz.webserver import timescale_connection, db_conn, ts_conn
 from listenbrainz.webserver.decorators import crossdomain, api_listenstore_needed
 from listenbrainz.webserver.errors import APIBadRequest, APIInternalServerError, APIUnauthorized, APINotFound, \
     APIForbidden
+from listenbrainz.webserver.utils import run_concurrently
 from listenbrainz.webserver.views.api_tools import validate_auth_header, \
     _validate_get_endpoint_params
 
@@ -48,6 +57,19 @@ MAX_LISTEN_EVENTS_PER_USER = 2  # the maximum number of listens we want to retur
 MAX_LISTEN_EVENTS_OVERALL = 10  # the maximum number of listens we want to return in the feed overall across users
 DEFAULT_LISTEN_EVENT_WINDOW = timedelta(days=14) # to limit the search space of listen events and avoid timeouts
 DEFAULT_LISTEN_EVENT_WINDOW_NEW = timedelta(days=7) # to limit the search space of listen events and avoid timeouts
+# the number of users whose listens are fetched by one query of the listen feeds, the queries for
+# the groups of users run concurrently and their listens are merged
+LISTEN_EVENTS_USERS_PER_QUERY = 50
+
+T = TypeVar("T")
+
+
+class FeedEventRef(NamedTuple):
+    """ An event in the materialized feed of a user, which is only loaded if it makes it into the page. """
+    created: int
+    author_id: int
+    event_type: UserTimelineEventType
+    event_id: int
 
 user_timeline_event_api_bp = Blueprint('user_timeline_event_api_bp', __name__)
 
@@ -262,91 +284,33 @@ def user_feed(user_name: str):
     if min_ts is None and max_ts is None:
         max_ts = int(time.time())
 
-    users_following = db_user_relationship.get_following_for_user(db_conn, user['id'])
-
-    # TODO: Remove these listen events from event list after listen events endpoint is active.
-    # get all listen events
-    if len(users_following) == 0:
-        listen_events = []
-    else:
-        listen_events = get_listen_events(users_following, min_ts, max_ts)
-
-    # for events like "follow" and "recording recommendations", we want to show the user
-    # their own events as well
-    users_for_feed_events = users_following + [user]
-    follow_events = get_follow_events(
-        users_for_events=users_for_feed_events,
-        min_ts=min_ts or 0,
-        max_ts=max_ts or int(time.time()),
-        count=count,
-    )
-
-    recording_recommendation_events = get_recording_recommendation_events(
-        users_for_events=users_for_feed_events,
-        min_ts=min_ts or 0,
-        max_ts=max_ts or int(time.time()),
-        count=count,
-    )
-
-    personal_recording_recommendation_events = get_personal_recording_recommendation_events(
-        user=user,
-        min_ts=min_ts or 0,
-        max_ts=max_ts or int(time.time()),
-        count=count,
-    )
-
-    cb_review_events = get_cb_review_events(
-        users_for_events=users_for_feed_events,
-        min_ts=min_ts or 0,
-        max_ts=max_ts or int(time.time()),
-        count=count,
-    )
-
-    notification_events = get_notification_events(
-        user=user,
-        min_ts=min_ts or 0,
-        max_ts=max_ts or int(time.time()),
-        count=count,
-    )
-
-    recording_pin_events = get_recording_pin_events(
-        users_for_events=users_for_feed_events,
-        min_ts=min_ts or 0,
-        max_ts=max_ts or int(time.time()),
-        count=count,
-    )
-
-    hidden_events = db_user_timeline_event.get_hidden_timeline_events(db_conn, user['id'], count)
-    hidden_events_pin = {}
-    hidden_events_recommendation = {}
-
-    for hidden_event in hidden_events:
-        if hidden_event.event_type.value == UserTimelineEventType.RECORDING_RECOMMENDATION.value:
-            hidden_events_recommendation[hidden_event.event_id] = hidden_event
-        else:
-            hidden_events_pin[hidden_event.event_id] = hidden_event
-
-    for event in recording_recommendation_events:
-        if event.id in hidden_events_recommendation:
-            event.hidden = True
-
-    for event in recording_pin_events:
-        if event.id in hidden_events_pin:
-            event.hidden = True
+    def fetch_listen_events():
+        users_following = db_user_relationship.get_following_for_user(db_conn, user['id'])
+        # TODO: Remove these listen events from event list after listen events endpoint is active.
+        if len(users_following) == 0:
+            return []
+        return get_listen_events(users_following, min_ts, max_ts)
+
+    # all the other events are read from the user's materialized feed, which has the events of the users they
+    # follow and their own events
+    listen_events, feed_event_refs, hidden_events = run_concurrently([
+        fetch_listen_events,
+        partial(get_feed_event_refs, user, min_ts or 0, max_ts or int(time.time()), count),
+        partial(db_user_timeline_event.get_hidden_timeline_events, db_conn, user['id'], count),
+    ])
+
+    # only the feed events which make it into the page are loaded
+    page = merge_events([listen_events, feed_event_refs], count)
+    feed_events = load_feed_events([event for event in page if isinstance(event, FeedEventRef)])
+    listen_events = [event for event in page if not isinstance(event, FeedEventRef)]
 
     # TODO: add playlist event and like event
-    all_events = sorted(
-        listen_events + follow_events + recording_recommendation_events + recording_pin_events
-        + cb_review_events + notification_events + personal_recording_recommendation_events,
-        key=lambda event: -event.created,
-    )
+    all_events = merge_events([listen_events, feed_events], count, _hidden_event_marker(hidden_events))
 
     # Sadly, we need to serialize the event_type ourselves, otherwise, jsonify converts it badly.
     for index, event in enumerate(all_events):
         all_events[index].event_type = event.event_type.value
 
-    all_events = all_events[:count]
-
     return jsonify({'payload': {
         'count': len(all_events),
         'user_id': user_name,
@@ -780,42 +744,127 @@ def get_all_listen_events(
         max_ts = datetime.utcnow()
         min_ts = max_ts - DEFAULT_LISTEN_EVENT_WINDOW_NEW
 
-    listens = timescale_connection._ts.fetch_all_recent_listens_for_users(
-        users,
-        min_ts=min_ts,
-        max_ts=max_ts,
-        limit=limit
-    )
+    # every group of users can have up to limit listens in the page, but only the listens which make it into
+    # the page are converted to events
+    groups = [users[i:i + LISTEN_EVENTS_USERS_PER_QUERY] for i in range(0, len(users), LISTEN_EVENTS_USERS_PER_QUERY)]
+    listens = run_concurrently([
+        partial(timescale_connection._ts.fetch_all_recent_listens_for_users, group, min_ts=min_ts, max_ts=max_ts,
+                limit=limit)
+        for group in groups
+    ])
+    return merge_events([_similar_user_listen_events(group_listens) for group_listens in listens], limit)
 
-    events = []
+
+def _similar_user_listen_events(listens) -> Iterator[SimilarUserTimelineEvent]:
+    """ Converts listens to feed events as they are consumed. """
     for listen in listens:
         try:
             listen_dict = listen.to_api()
             api_listen = APIListen(**listen_dict)
-            events.append(SimilarUserTimelineEvent(
+            yield SimilarUserTimelineEvent(
                 event_type=UserTimelineEventType.LISTEN,
                 user_name=api_listen.user_name,
                 created=api_listen.listened_at,
                 metadata=api_listen,
                 hidden=False
-            ))
+            )
         except pydantic.ValidationError as e:
             current_app.logger.error('Validation error: ' + str(e), exc_info=True)
             continue
-    return events
 
 
-def get_follow_events(users_for_events: Iterable[dict], min_ts: int, max_ts: int, count: int) -> List[APITimelineEvent]:
-    """ Gets all follow events in the feed.
+def merge_events(sources: Iterable[Iterable[T]], count: int, mark: Optional[Callable[[T], T]] = None) -> List[T]:
+    """ Merge sources of feed events, each sorted by created time in descending order, into a page of events.
+
+    The sources are consumed lazily and the merge stops as soon as ``count`` events have been produced, so
+    a source which is a generator only converts the events which make it into the page.
+
+    Args:
+        sources: the sources to merge, their events must have a ``created`` attribute
+        count: the maximum number of events to return
+        mark: optional, a function applied to each event of the page as it is produced
     """
-    follow_events_db = db_user_relationship.get_follow_events(
-        db_conn,
-        user_ids=(user['id'] for user in users_for_events),
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count,
-    )
+    merged = heapq.merge(*sources, key=attrgetter("created"), reverse=True)
+    if mark is not None:
+        merged = map(mark, merged)
+    return list(islice(merged, count))
+
+
+def _hidden_event_marker(hidden_events: Iterable[HiddenUserTimelineEvent]) -> Callable[[APITimelineEvent], APITimelineEvent]:
+    """ Returns a function which marks an event as hidden if it is one of the given hidden events. """
+    hidden = {(hidden_event.event_type, hidden_event.event_id) for hidden_event in hidden_events}
 
+    def mark(event: APITimelineEvent) -> APITimelineEvent:
+        if event.id is not None and (event.event_type, event.id) in hidden:
+            event.hidden = True
+        return event
+
+    return mark
+
+
+def get_feed_event_refs(user: dict, min_ts: int, max_ts: int, count: int) -> List[FeedEventRef]:
+    """ Gets the latest events in the materialized feed of the user, all kinds of events except listens.
+    """
+    return [
+        FeedEventRef(
+            created=int(event['created'].timestamp()),
+            author_id=event['author_id'],
+            event_type=event['event_type'],
+            event_id=event['event_id'],
+        )
+        for event in db_user_feed.get_feed_events(db_conn, user['id'], min_ts, max_ts, count)
+    ]
+
+
+def load_feed_events(refs: List[FeedEventRef]) -> List[APITimelineEvent]:
+    """ Loads the events of the materialized feed of a user, the events of each type are loaded concurrently.
+
+    Returns:
+        the events in descending order of their created time, events which can't be loaded anymore are skipped
+    """
+    event_ids = defaultdict(list)
+    for ref in refs:
+        event_ids[ref.event_type].append(ref.event_id)
+    id_username_map = db_user.get_user_names_by_id(db_conn, [ref.author_id for ref in refs])
+    follows = [(ref.author_id, ref.event_id) for ref in refs if ref.event_type == UserTimelineEventType.FOLLOW]
+
+    loaders = {
+        UserTimelineEventType.FOLLOW: lambda: _follow_events_to_api(
+            db_user_relationship.get_follow_events_by_users(db_conn, follows)
+        ),
+        UserTimelineEventType.RECORDING_RECOMMENDATION: lambda: _recording_recommendation_events_to_api(
+            db_user_timeline_event.get_user_timeline_events_by_ids(
+                db_conn, event_ids[UserTimelineEventType.RECORDING_RECOMMENDATION]
+            ),
+            id_username_map
+        ),
+        UserTimelineEventType.CRITIQUEBRAINZ_REVIEW: lambda: _cb_review_events_to_api(
+            db_user_timeline_event.get_user_timeline_events_by_ids(
+                db_conn, event_ids[UserTimelineEventType.CRITIQUEBRAINZ_REVIEW]
+            ),
+            id_username_map
+        ),
+        UserTimelineEventType.NOTIFICATION: lambda: _notification_events_to_api(
+            db_user_timeline_event.get_user_timeline_events_by_ids(
+                db_conn, event_ids[UserTimelineEventType.NOTIFICATION]
+            )
+        ),
+        UserTimelineEventType.RECORDING_PIN: lambda: _recording_pin_events_to_api(
+            get_pins_by_ids(db_conn, event_ids[UserTimelineEventType.RECORDING_PIN]),
+            id_username_map
+        ),
+        UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION: lambda: _personal_recording_recommendation_events_to_api(
+            db_user_timeline_event.get_personal_recommendation_events_by_ids(
+                db_conn, event_ids[UserTimelineEventType.PERSONAL_RECORDING_RECOMMENDATION]
+            )
+        ),
+    }
+    events = run_concurrently([loader for event_type, loader in loaders.items() if event_type in event_ids])
+    return sorted(chain.from_iterable(events), key=lambda event: -event.created)
+
+
+def _follow_events_to_api(follow_events_db: Iterable[dict]) -> List[APITimelineEvent]:
+    """ Converts follow events to feed events. """
     events = []
     for event in follow_events_db:
         try:
@@ -838,16 +887,8 @@ def get_follow_events(users_for_events: Iterable[dict], min_ts: int, max_ts: int
     return events
 
 
-def get_notification_events(user: dict, min_ts: int, max_ts: int, count: int) -> List[APITimelineEvent]:
-    """ Gets notification events for the user in the feed."""
-    notification_events_db = db_user_timeline_event.get_user_notification_events(
-        db_conn,
-        user_ids=[user["id"]],
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count
-    )
-
+def _notification_events_to_api(notification_events_db: Iterable[UserTimelineEvent]) -> List[APITimelineEvent]:
+    """ Converts notification events to feed events. """
     events = []
     for event in notification_events_db:
         events.append(APITimelineEvent(
@@ -861,22 +902,11 @@ def get_notification_events(user: dict, min_ts: int, max_ts: int, count: int) ->
     return events
 
 
-def get_recording_recommendation_events(
-    users_for_events: Iterable[dict],
-    min_ts: int,
-    max_ts: int,
-    count: int
+def _recording_recommendation_events_to_api(
+    recording_recommendation_events_db: List[UserTimelineEvent],
+    id_username_map: Dict[int, str]
 ) -> List[APITimelineEvent]:
-    """ Gets all recording recommendation events in the feed. """
-
-    id_username_map = {user['id']: user['musicbrainz_id'] for user in users_for_events}
-    recording_recommendation_events_db = db_user_timeline_event.get_recording_recommendation_events_for_feed(
-        db_conn,
-        user_ids=(user['id'] for user in users_for_events),
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count,
-    )
+    """ Converts recording recommendation events to feed events, loading the metadata of the recordings. """
     _ = fetch_track_metadata_for_items(ts_conn, [e.metadata for e in recording_recommendation_events_db])
 
     events = []
@@ -901,18 +931,11 @@ def get_recording_recommendation_events(
     return events
 
 
-def get_cb_review_events(users_for_events: List[dict], min_ts: int, max_ts: int, count: int) -> List[APITimelineEvent]:
-    """ Gets all CritiqueBrainz review events in the feed.
-    """
-    id_username_map = {user["id"]: user["musicbrainz_id"] for user in users_for_events}
-    cb_review_events_db = db_user_timeline_event.get_cb_review_events(
-        db_conn,
-        user_ids=[user["id"] for user in users_for_events],
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count,
-    )
-
+def _cb_review_events_to_api(
+    cb_review_events_db: Iterable[UserTimelineEvent],
+    id_username_map: Dict[int, str]
+) -> List[APITimelineEvent]:
+    """ Converts CritiqueBrainz review events to feed events, loading the reviews from CritiqueBrainz. """
     review_ids, review_id_event_map = [], {}
     for event in cb_review_events_db:
         review_id = event.metadata.review_id
@@ -952,22 +975,11 @@ def get_cb_review_events(users_for_events: List[dict], min_ts: int, max_ts: int,
     return api_events
 
 
-def get_recording_pin_events(
-    users_for_events: List[dict],
-    min_ts: int,
-    max_ts: int,
-    count: int
+def _recording_pin_events_to_api(
+    recording_pin_events_db: List[PinnedRecording],
+    id_username_map: Dict[int, str]
 ) -> List[APITimelineEvent]:
-    """ Gets all recording pin events in the feed."""
-
-    id_username_map = {user['id']: user['musicbrainz_id'] for user in users_for_events}
-    recording_pin_events_db = get_pins_for_feed(
-        db_conn,
-        user_ids=id_username_map.keys(),
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count,
-    )
+    """ Converts recording pins to feed events, loading the metadata of the recordings. """
     recording_pin_events_db = fetch_track_metadata_for_items(ts_conn, recording_pin_events_db)
 
     events = []
@@ -993,22 +1005,10 @@ def get_recording_pin_events(
     return events
 
 
-def get_personal_recording_recommendation_events(
-    user: dict,
-    min_ts: int,
-    max_ts: int,
-    count: int
+def _personal_recording_recommendation_events_to_api(
+    personal_recording_recommendation_events_db: List[UserTimelineEvent]
 ) -> List[APITimelineEvent]:
-    """ Gets all personal recording recommendation events in the feed.
-    """
-
-    personal_recording_recommendation_events_db = db_user_timeline_event.get_personal_recommendation_events_for_feed(
-        db_conn,
-        user_id=user['id'],
-        min_ts=min_ts,
-        max_ts=max_ts,
-        count=count,
-    )
+    """ Converts personal recording recommendation events to feed events, loading the metadata of the recordings. """
     _ = fetch_track_metadata_for_items(ts_conn, [e.metadata for e in personal_recording_recommendation_events_db])
 
     events = []
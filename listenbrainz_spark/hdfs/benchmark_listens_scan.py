@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+""" Compare the bytes scanned by range bounded listen reads from the partitioned listens storage with reads
+from an unpartitioned copy of the same listens, laid out like the listens were stored before partitioning.
+
+The unpartitioned copy is written to a temporary HDFS directory and deleted at the end. The scanned bytes are
+the input bytes of the spark stages of each read, taken from the spark monitoring REST API.
+
+    python3 -m listenbrainz_spark.hdfs.benchmark_listens_scan
+"""
+import time
+import uuid
+from datetime import datetime
+
+import click
+import requests
+
+import listenbrainz_spark
+from listenbrainz_spark import config, hdfs_connection
+from listenbrainz_spark.hdfs.utils import delete_dir
+from listenbrainz_spark.stats import get_dates_for_stats_range
+from listenbrainz_spark.utils import get_listens_from_dump, read_files_from_HDFS
+
+UNPARTITIONED_COPY_PATH = "/temp/benchmark_unpartitioned_listens.parquet"
+STATS_RANGES = ["week", "month", "year", "all_time"]
+
+
+def get_input_bytes(job_group: str) -> int:
+    """ Sum the input bytes of all stages of the jobs in the given job group. """
+    context = listenbrainz_spark.context
+    base_url = f"{context.uiWebUrl}/api/v1/applications/{context.applicationId}"
+    jobs = requests.get(f"{base_url}/jobs").json()
+    stage_ids = {stage_id for job in jobs if job.get("jobGroup") == job_group for stage_id in job["stageIds"]}
+    total = 0
+    for stage in requests.get(f"{base_url}/stages").json():
+        if stage["stageId"] in stage_ids:
+            total += stage["inputBytes"]
+    return total
+
+
+def measure(name: str, df_factory) -> tuple[float, int, int]:
+    job_group = f"{name}-{uuid.uuid4()}"
+    listenbrainz_spark.context.setJobGroup(job_group, name)
+    start = time.monotonic()
+    count = df_factory().count()
+    elapsed = time.monotonic() - start
+    # the REST API is updated asynchronously after the jobs finish
+    time.sleep(1)
+    return elapsed, get_input_bytes(job_group), count
+
+
+def read_unpartitioned(from_date: datetime, to_date: datetime):
+    return read_files_from_HDFS(UNPARTITIONED_COPY_PATH) \
+        .where(f"listened_at >= to_timestamp('{from_date}')") \
+        .where(f"listened_at <= to_timestamp('{to_date}')")
+
+
+@click.command()
+def main():
+    listenbrainz_spark.init_spark_session("Listens scan benchmark")
+    hdfs_connection.init_hdfs(config.HDFS_HTTP_URI)
+
+    # the dumps store listens ordered by listened_at, keep that order in the copy
+    get_listens_from_dump() \
+        .orderBy("listened_at") \
+        .write \
+        .mode("overwrite") \
+        .parquet(config.HDFS_CLUSTER_URI + UNPARTITIONED_COPY_PATH)
+
+    try:
+        print(f"{'range':>10} {'layout':>12} {'listens':>12} {'seconds':>9} {'scanned MB':>11}")
+        for stats_range in STATS_RANGES:
+            from_date, to_date = get_dates_for_stats_range(stats_range)
+            for layout, factory in [
+                ("unpartitioned", lambda: read_unpartitioned(from_date, to_date)),
+                ("partitioned", lambda: get_listens_from_dump(from_date, to_date)),
+            ]:
+                elapsed, input_bytes, count = measure(f"{stats_range}-{layout}", factory)
+                print(f"{stats_range:>10} {layout:>12} {count:>12} {elapsed:>9.1f} {input_bytes / 1024 ** 2:>11.1f}")
+    finally:
+        delete_dir(UNPARTITIONED_COPY_PATH, recursive=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,14 @@ from datetime import datetime
 import tarfile
 
 from listenbrainz_spark import utils, path, schema
-from listenbrainz_spark.hdfs.upload import ListenbrainzDataUploader
-from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY
+from listenbrainz_spark.hdfs.upload import ListenbrainzDataUploader, count_parquet_files
+from listenbrainz_spark.hdfs.utils import upload_to_HDFS
+from listenbrainz_spark.path import FULL_DUMP_SAVE_PATH, INCREMENTAL_DUMPS_SAVE_PATH
 from listenbrainz_spark.tests import SparkNewTestCase
 
 from pyspark.sql.types import StructField, StructType, StringType
 
-from listenbrainz_spark.utils import get_listen_files_list, get_listens_from_dump
+from listenbrainz_spark.utils import get_listen_partitions, get_listens_from_dump
 
 
 class HDFSDataUploaderTestCase(SparkNewTestCase):
@@ -34,19 +35,53 @@ class HDFSDataUploaderTestCase(SparkNewTestCase):
     def test_upload_listens(self):
         full_dump_tar = self.create_temp_listens_tar('full-dump')
         self.uploader.upload_new_listens_full_dump(full_dump_tar.name)
-        self.assertListEqual(
-            get_listen_files_list(),
-            ["6.parquet", "5.parquet", "4.parquet", "3.parquet",
-             "2.parquet", "1.parquet", "0.parquet"]
-        )
+        self.assertGreater(len(get_listen_partitions(FULL_DUMP_SAVE_PATH)), 0)
+        self.assertListEqual(get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH), [])
+        full_dump_count = self.get_all_test_listens().count()
 
         incremental_dump_tar = self.create_temp_listens_tar('incremental-dump-1')
         self.uploader.upload_new_listens_incremental_dump(incremental_dump_tar.name)
-        self.assertListEqual(
-            get_listen_files_list(),
-            ["incremental.parquet", "6.parquet", "5.parquet", "4.parquet",
-             "3.parquet", "2.parquet", "1.parquet", "0.parquet"]
-        )
+        self.assertGreater(len(get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH)), 0)
+        # incremental-dump-1 has 9 listens
+        self.assertEqual(self.get_all_test_listens().count(), full_dump_count + 9)
+
+    def test_get_listens_from_dump_partitions(self):
+        """ Test that listens are filtered correctly when only the partitions overlapping the range are read """
+        full_dump_tar = self.create_temp_listens_tar('full-dump')
+        self.uploader.upload_new_listens_full_dump(full_dump_tar.name)
+        listens = self.get_all_test_listens()
+
+        year, month = get_listen_partitions(FULL_DUMP_SAVE_PATH)[-1]
+        start = datetime(year, month, 1)
+        expected = listens.where(f"listened_at >= to_timestamp('{start}')").count()
+        self.assertEqual(get_listens_from_dump(start).count(), expected)
+
+    def test_legacy_listens_layout(self):
+        """ Test that the numbered files of a full dump imported before the listens were partitioned are read
+        along with the partitioned incremental dumps imported after them, until the next full dump. """
+        upload_to_HDFS(os.path.join(path.LISTENBRAINZ_NEW_DATA_DIRECTORY, "0.parquet"),
+                       self.path_to_data_file("rec_listens.parquet"))
+        self.assertTrue(utils.is_legacy_listens_layout())
+        legacy_count = get_listens_from_dump().count()
+
+        self.uploader.upload_new_listens_incremental_dump(self.create_temp_listens_tar('incremental-dump-1').name)
+        self.assertGreater(len(get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH)), 0)
+        # incremental-dump-1 has 9 listens
+        self.assertEqual(get_listens_from_dump().count(), legacy_count + 9)
+
+        self.uploader.upload_new_listens_full_dump(self.create_temp_listens_tar('full-dump').name)
+        self.assertFalse(utils.is_legacy_listens_layout())
+        self.assertGreater(len(get_listen_partitions(FULL_DUMP_SAVE_PATH)), 0)
+
+    def test_compact_incremental_dumps(self):
+        self.uploader.upload_new_listens_incremental_dump(self.create_temp_listens_tar('incremental-dump-1').name)
+        self.uploader.upload_new_listens_incremental_dump(self.create_temp_listens_tar('incremental-dump-2').name)
+        partitions = get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH)
+
+        self.uploader.compact_incremental_dumps()
+        self.assertListEqual(get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH), partitions)
+        self.assertEqual(count_parquet_files(INCREMENTAL_DUMPS_SAVE_PATH), len(partitions))
+        self.assertEqual(self.get_all_test_listens().count(), 17)
 
     def test_upload_incremental_listens(self):
         """ Test incremental listen imports work correctly when there are no
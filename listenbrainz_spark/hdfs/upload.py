@@ -12,12 +12,24 @@ from listenbrainz_spark.hdfs.utils import delete_dir
 from listenbrainz_spark.hdfs.utils import path_exists
 from listenbrainz_spark.hdfs.utils import upload_to_HDFS
 from listenbrainz_spark.hdfs.utils import rename
+from listenbrainz_spark.hdfs.utils import hdfs_walk
 from listenbrainz_spark.hdfs import ListenbrainzHDFSUploader, TEMP_DIR_PATH as HDFS_TEMP_DIR
 from listenbrainz_spark.path import INCREMENTAL_DUMPS_SAVE_PATH
 from listenbrainz_spark.utils import read_files_from_HDFS
 
 logger = logging.getLogger(__name__)
 
+# the incremental dumps are compacted once they are spread over more files than this
+MAX_INCREMENTAL_DUMP_FILES = 500
+
+
+def count_parquet_files(hdfs_path: str) -> int:
+    """ Count the parquet files stored under the given HDFS directory. """
+    count = 0
+    for _, _, files in hdfs_walk(hdfs_path):
+        count += sum(1 for name in files if name.endswith(".parquet"))
+    return count
+
 
 class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
 
@@ -75,25 +87,47 @@ class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
         # read it in spark in next step
         hdfs_path = self.upload_archive_to_temp(archive, ".parquet")
 
-        # read the parquet file from the temporary path and append
-        # it to incremental.parquet for permanent storage
-        read_files_from_HDFS(hdfs_path) \
-            .repartition(1) \
-            .write \
-            .mode("append") \
-            .parquet(INCREMENTAL_DUMPS_SAVE_PATH)
+        # incremental dumps stored before the listens were partitioned cannot be appended to, convert them first
+        if path_exists(INCREMENTAL_DUMPS_SAVE_PATH) and not utils.get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH):
+            self.compact_incremental_dumps()
+
+        # read the parquet file from the temporary path and append it to the
+        # partitions of incremental.parquet for permanent storage
+        utils.write_partitioned_listens(read_files_from_HDFS(hdfs_path), INCREMENTAL_DUMPS_SAVE_PATH, mode="append")
 
         # delete parquet from hdfs temporary path
         delete_dir(hdfs_path, recursive=True)
 
+        if count_parquet_files(INCREMENTAL_DUMPS_SAVE_PATH) > MAX_INCREMENTAL_DUMP_FILES:
+            self.compact_incremental_dumps()
+
+    def compact_incremental_dumps(self):
+        """ Rewrite the incremental dumps so that each partition has as few files as possible. Each import
+        appends a file to every partition it has listens for, which slows down reading them over time. """
+        logger.info("Compacting incremental dumps...")
+        t0 = time.monotonic()
+        tmp_path = os.path.join(HDFS_TEMP_DIR, "incremental_compaction.parquet")
+        listens_df = read_files_from_HDFS(INCREMENTAL_DUMPS_SAVE_PATH).select(*schema.listens_new_schema.fieldNames())
+        utils.write_partitioned_listens(listens_df, tmp_path)
+        delete_dir(INCREMENTAL_DUMPS_SAVE_PATH, recursive=True)
+        rename(tmp_path, INCREMENTAL_DUMPS_SAVE_PATH)
+        logger.info(f"Done! Time taken: {time.monotonic() - t0:.2f}")
+
     def upload_new_listens_full_dump(self, archive: str):
         """ Upload new format parquet listens dumps to of a full
-        dump to HDFS.
+        dump to HDFS, partitioned by the year and month of the listens.
 
             Args:
                   archive: path to parquet listens dump to be uploaded
         """
         src_path = self.upload_archive_to_temp(archive, ".parquet")
+        partitioned_path = os.path.join(HDFS_TEMP_DIR, "full.parquet")
+
+        logger.info(f"Partitioning the listens from {src_path} into {partitioned_path}")
+        t0 = time.monotonic()
+        utils.write_partitioned_listens(read_files_from_HDFS(src_path), partitioned_path)
+        logger.info(f"Done! Time taken: {time.monotonic() - t0:.2f}")
+
         dest_path = path.LISTENBRAINZ_NEW_DATA_DIRECTORY
         # Delete existing dumps if any
         if path_exists(dest_path):
@@ -101,15 +135,12 @@ class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
             delete_dir(dest_path, recursive=True)
             logger.info('Done!')
 
-        logger.info(f"Moving the processed files from {src_path} to {dest_path}")
+        logger.info(f"Moving the partitioned files from {partitioned_path} to {path.FULL_DUMP_SAVE_PATH}")
         t0 = time.monotonic()
 
-        # Check if parent directory exists, if not create a directory
-        dest_path_parent = str(Path(dest_path).parent)
-        if not path_exists(dest_path_parent):
-            create_dir(dest_path_parent)
-
-        rename(src_path, dest_path)
+        create_dir(dest_path)
+        rename(partitioned_path, path.FULL_DUMP_SAVE_PATH)
+        delete_dir(src_path, recursive=True)
         utils.logger.info(f"Done! Time taken: {time.monotonic() - t0:.2f}")
 
     def upload_mlhd_dump_chunk(self, archive: str):
@@ -7,7 +7,10 @@ LISTENBRAINZ_NEW_DATA_DIRECTORY = os.path.join('/', 'data', 'listenbrainz-new')
 MLHD_PLUS_RAW_DATA_DIRECTORY = os.path.join("/", "mlhd-raw")
 MLHD_PLUS_DATA_DIRECTORY = os.path.join("/", "mlhd")  # processed MLHD+ dump data
 
-# path to save incremental dumps
+# path to save the listens of the full dump, partitioned by the year and month of listened_at
+FULL_DUMP_SAVE_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "full.parquet")
+
+# path to save incremental dumps, partitioned by the year and month of listened_at
 INCREMENTAL_DUMPS_SAVE_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "incremental.parquet")
 
 # Directory containing RDD checkpoints to break lineage while using iterative algorithms.
@@ -102,3 +105,6 @@ RECORDING_ARTIST_GENRE_DATAFRAME = "/artist_genre"
 RECORDING_RELEASE_GROUP_GENRE_DATAFRAME = "/release_group_genre"
 
 MLHD_RECORDING_POPULARITY_DATAFRAME = "/mlhd_popularity_recording"
+
+# per user, per day partial aggregates of listens for user entity stats
+USER_ENTITY_PARTIALS_DIRECTORY = os.path.join("/", "stats", "user_entity_partials")
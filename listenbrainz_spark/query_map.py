@@ -4,6 +4,7 @@ import listenbrainz_spark.recommendations.recording.recommend
 import listenbrainz_spark.recommendations.recording.discovery
 import listenbrainz_spark.recommendations.recording.train_models
 import listenbrainz_spark.request_consumer.jobs.import_dump
+import listenbrainz_spark.request_consumer.batch
 import listenbrainz_spark.stats.sitewide.entity
 import listenbrainz_spark.stats.sitewide.listening_activity
 import listenbrainz_spark.stats.user.daily_activity
@@ -85,6 +86,7 @@ functions = {
     'releases.fresh': listenbrainz_spark.fresh_releases.fresh_releases.main,
     'troi.playlists': listenbrainz_spark.troi.periodic_jams.main,
     'tags.default': listenbrainz_spark.tags.tags.main,
+    'batch.run': listenbrainz_spark.request_consumer.batch.run_batch,
 }
 
 
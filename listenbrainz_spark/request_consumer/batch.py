@@ -0,0 +1,156 @@
+""" Run a batch of spark requests, sharing the dataframes they read.
+
+The requests of a batch are run in dependency order, and the requests which depend on the same date range
+are run together so that the listens of the range are read from HDFS and persisted once for all of them.
+The metadata dataframes are shared by all the requests of the batch. Imports change the data the other
+requests read and echo messages mark the start or end of a group of requests for the spark reader, so
+requests are never moved across these and the shared dataframes are released after each import.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from listenbrainz_spark import config, hdfs_connection
+from listenbrainz_spark.utils import shared_dataframes
+
+logger = logging.getLogger(__name__)
+
+# requests for these queries are run in the position they were requested in
+BARRIER_QUERY_PREFIXES = ("import.", "echo.")
+
+# queries which read the data written by other queries, the latter are run first if both are in the batch
+QUERY_DEPENDENCIES = {
+    "cf.recommendations.recording.train_model": ["cf.recommendations.recording.create_dataframes"],
+    "cf.recommendations.recording.recommendations": [
+        "cf.recommendations.recording.create_dataframes",
+        "cf.recommendations.recording.train_model",
+    ],
+    "similarity.similar_users": ["cf.recommendations.recording.create_dataframes"],
+}
+
+# params which determine the range of listens a query reads
+RANGE_PARAMS = ("stats_range", "year", "days")
+
+
+def is_barrier(request: Dict) -> bool:
+    return request["query"].startswith(BARRIER_QUERY_PREFIXES)
+
+
+def get_range_key(request: Dict) -> Optional[Tuple[str, str]]:
+    """ Return the param which determines the listens read by the request and its value, if any. """
+    params = request.get("params") or {}
+    for name in RANGE_PARAMS:
+        if name in params:
+            return name, str(params[name])
+    return None
+
+
+def _plan_segment(requests: List[Dict]) -> List[Tuple[Optional[Tuple[str, str]], List[Dict]]]:
+    """ Order requests not separated by a barrier by the dependencies of their queries and group
+    the requests of each dependency level by range. """
+    queries = {request["query"] for request in requests}
+
+    def level(query: str) -> int:
+        dependencies = [q for q in QUERY_DEPENDENCIES.get(query, []) if q in queries]
+        return 1 + max(level(q) for q in dependencies) if dependencies else 0
+
+    levels = {}
+    for request in requests:
+        groups = levels.setdefault(level(request["query"]), OrderedDict())
+        groups.setdefault(get_range_key(request), []).append(request)
+
+    return [group for _, groups in sorted(levels.items()) for group in groups.items()]
+
+
+def plan_batch(requests: List[Dict]) -> List[Tuple[Optional[Tuple[str, str]], List[Dict]]]:
+    """ Split the requests of a batch into groups of requests to run together.
+
+        Returns:
+            a list of (range key, requests) in the order the groups should be run
+    """
+    plan = []
+    segment = []
+    for request in requests:
+        if is_barrier(request):
+            plan.extend(_plan_segment(segment))
+            plan.append((None, [request]))
+            segment = []
+        else:
+            segment.append(request)
+    plan.extend(_plan_segment(segment))
+    return plan
+
+
+def run_request(request: Dict, report: List[Dict]) -> Iterator[Dict]:
+    """ Run one request of the batch and record its wall time and the shared dataframes it reused in the report.
+    The time includes publishing the messages of the request because those are generated lazily. """
+    # imported here because the query map imports this module for the batch query, importing it at the top
+    # would be circular
+    from listenbrainz_spark.query_map import get_query_handler
+
+    query = request["query"]
+    params = request.get("params") or {}
+    entry = {"query": query, "params": params, "status": "done"}
+    hits, misses = shared_dataframes.hits, shared_dataframes.misses
+    start = time.monotonic()
+    try:
+        handler = get_query_handler(query)
+        messages = handler(**params)
+        if messages:
+            yield from messages
+    except Exception as e:
+        logger.error("Error in the query handler for query '%s' in batch: %s", query, str(e), exc_info=True)
+        entry["status"] = "failed"
+    entry["time"] = time.monotonic() - start
+    entry["reused"] = shared_dataframes.hits - hits
+    entry["loaded"] = shared_dataframes.misses - misses
+    report.append(entry)
+
+
+def log_report(report: List[Dict]):
+    lines = [f"{'query':<50} {'status':>8} {'seconds':>9} {'reused':>7} {'loaded':>7}  params"]
+    for entry in report:
+        lines.append(f"{entry['query']:<50} {entry['status']:>8} {entry.get('time', 0):>9.1f} "
+                     f"{entry.get('reused', 0):>7} {entry.get('loaded', 0):>7}  {entry['params']}")
+    reused = sum(entry.get("reused", 0) for entry in report)
+    loaded = sum(entry.get("loaded", 0) for entry in report)
+    lines.append(f"Shared dataframes loaded: {loaded}, reused: {reused}")
+    logger.info("Batch report:\n%s", "\n".join(lines))
+
+
+def run_batch(requests: List[Dict]) -> Iterator[Dict]:
+    """ Run the requests of a batch and yield the messages of all the requests.
+
+        Args:
+            requests: list of requests, each a dict with the query and its params as sent by request_manage
+    """
+    report = []
+    failed = set()
+    shared_dataframes.enabled = True
+    try:
+        for range_key, group in plan_batch(requests):
+            logger.info("Running %d requests of the batch for range %s", len(group), range_key)
+            for request in group:
+                query = request["query"]
+                failed_dependencies = [q for q in QUERY_DEPENDENCIES.get(query, []) if q in failed]
+                if failed_dependencies:
+                    logger.error("Skipping query '%s' in batch because %s failed", query, failed_dependencies)
+                    report.append({"query": query, "params": request.get("params") or {}, "status": "skipped"})
+                    failed.add(query)
+                    continue
+
+                # the batch may run for hours, reconnect to HDFS for every request like the request consumer does
+                hdfs_connection.init_hdfs(config.HDFS_HTTP_URI)
+                yield from run_request(request, report)
+                if report[-1]["status"] != "done":
+                    failed.add(query)
+
+                if query.startswith("import."):
+                    shared_dataframes.release()
+
+            shared_dataframes.release("listens")
+    finally:
+        shared_dataframes.release()
+        shared_dataframes.enabled = False
+        log_report(report)
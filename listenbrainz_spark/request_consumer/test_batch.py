@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from listenbrainz_spark.request_consumer.batch import plan_batch, run_batch
+from listenbrainz_spark.utils import shared_dataframes
+
+
+def request(query, **params):
+    return {"query": query, "params": params}
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_plan_batch_groups_by_range(self):
+        requests = [
+            request("stats.user.entity", entity="artists", stats_range="week", database="a"),
+            request("stats.user.entity", entity="artists", stats_range="month", database="b"),
+            request("stats.sitewide.entity", entity="artists", stats_range="week"),
+            request("stats.user.daily_activity", stats_range="month", database="c"),
+        ]
+        self.assertEqual(plan_batch(requests), [
+            (("stats_range", "week"), [requests[0], requests[2]]),
+            (("stats_range", "month"), [requests[1], requests[3]]),
+        ])
+
+    def test_plan_batch_dependencies(self):
+        requests = [
+            request("cf.recommendations.recording.recommendations", users=[], recommendation_raw_limit=1000),
+            request("cf.recommendations.recording.train_model", ranks=[10]),
+            request("similarity.similar_users", max_num_users=25),
+            request("cf.recommendations.recording.create_dataframes", days=180, job_type="similar_users",
+                    minimum_listens_threshold=0),
+        ]
+        self.assertEqual(plan_batch(requests), [
+            (("days", "180"), [requests[3]]),
+            (None, [requests[1], requests[2]]),
+            (None, [requests[0]]),
+        ])
+
+    def test_plan_batch_barriers(self):
+        requests = [
+            request("stats.user.entity", entity="artists", stats_range="week", database="a"),
+            request("import.pg_metadata_tables"),
+            request("stats.user.entity", entity="releases", stats_range="month", database="b"),
+            request("echo.echo", message={"action": "year_in_music_end"}),
+            request("stats.user.entity", entity="artists", stats_range="month", database="c"),
+        ]
+        self.assertEqual(plan_batch(requests), [
+            (("stats_range", "week"), [requests[0]]),
+            (None, [requests[1]]),
+            (("stats_range", "month"), [requests[2]]),
+            (None, [requests[3]]),
+            (("stats_range", "month"), [requests[4]]),
+        ])
+
+    @patch("listenbrainz_spark.request_consumer.batch.hdfs_connection")
+    @patch("listenbrainz_spark.query_map.get_query_handler")
+    def test_run_batch(self, mock_get_query_handler, _):
+        handlers = {
+            "cf.recommendations.recording.create_dataframes": MagicMock(side_effect=ValueError),
+            "cf.recommendations.recording.train_model": MagicMock(),
+            "stats.user.entity": MagicMock(return_value=iter([{"type": "user_entity"}])),
+        }
+        mock_get_query_handler.side_effect = lambda query: handlers[query]
+
+        messages = list(run_batch([
+            request("cf.recommendations.recording.create_dataframes", days=180, job_type="recommendation_recording",
+                    minimum_listens_threshold=0),
+            request("cf.recommendations.recording.train_model", ranks=[10]),
+            request("stats.user.entity", entity="artists", stats_range="week", database="a"),
+        ]))
+
+        self.assertEqual(messages, [{"type": "user_entity"}])
+        # the model depends on the dataframes which failed
+        handlers["cf.recommendations.recording.train_model"].assert_not_called()
+        handlers["stats.user.entity"].assert_called_once_with(entity="artists", stats_range="week", database="a")
+        self.assertFalse(shared_dataframes.enabled)
+        self.assertEqual(shared_dataframes.values, {})
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+""" Compare the blocked top-K similar users calculation with the previous dense correlation matrix implementation.
+
+Generates synthetic playcounts with a skewed recording popularity in spark local mode and times both
+implementations for each number of users. The dense implementation collects a users x users matrix on the
+driver, so it is skipped above --dense-max-users.
+
+    python3 -m listenbrainz_spark.similarity.benchmark_user --users 10000,50000,100000 --master "local[*]"
+"""
+import math
+import time
+from operator import itemgetter
+
+import click
+import numpy as np
+import pandas as pd
+from pyspark.ml.stat import Correlation
+from pyspark.mllib.linalg.distributed import CoordinateMatrix, MatrixEntry
+from pyspark.sql import SparkSession
+
+import listenbrainz_spark
+from listenbrainz_spark.similarity.user import get_similar_users
+
+
+def generate_playcounts(num_users: int, recordings_per_user: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    num_recordings = num_users * 5
+    users = np.repeat(np.arange(1, num_users + 1), recordings_per_user)
+    recordings = rng.zipf(1.3, len(users)) % num_recordings
+    # a user can only have one playcount per recording
+    pairs = np.unique(users * num_recordings + recordings)
+    return pd.DataFrame({
+        "spark_user_id": pairs // num_recordings,
+        "recording_id": pairs % num_recordings,
+        "playcount": rng.integers(1, 20, len(pairs)).astype(np.float64),
+    })
+
+
+def dense_similar_users(playcounts_df, max_num_users):
+    """ The previous implementation, a dense pearson correlation matrix thresholded in python. """
+    tuple_mapped_rdd = playcounts_df.rdd.map(lambda x: MatrixEntry(x["recording_id"], x["spark_user_id"], x["playcount"]))
+    indexed_row_matrix = CoordinateMatrix(tuple_mapped_rdd).toIndexedRowMatrix()
+    vectors_mapped_rdd = indexed_row_matrix.rows.map(lambda r: (r.index, r.vector.asML()))
+    vectors_df = listenbrainz_spark.session.createDataFrame(vectors_mapped_rdd, ['index', 'vector'])
+    matrix = Correlation.corr(vectors_df, 'vector', 'pearson').first()['pearson(vector)'].toArray()
+
+    rows, cols = matrix.shape
+    similar_users = []
+    for x in range(rows):
+        row = []
+        for y in range(cols):
+            value = float(matrix[x, y])
+            if x == y or math.isnan(value) or value < 0:
+                continue
+            row.append((x, y, value))
+        similar_users.extend(sorted(row, key=itemgetter(2), reverse=True)[:max_num_users])
+    return similar_users
+
+
+@click.command()
+@click.option("--users", default="10000,50000,100000", help="comma separated numbers of users to benchmark")
+@click.option("--recordings-per-user", default=100, help="approximate number of recordings listened by each user")
+@click.option("--max-num-users", default=25, help="number of similar users to calculate for each user")
+@click.option("--dense-max-users", default=10000, help="largest number of users to run the dense implementation for")
+@click.option("--master", default="local[*]", help="spark master url")
+def main(users, recordings_per_user, max_num_users, dense_max_users, master):
+    listenbrainz_spark.session = SparkSession.builder \
+        .master(master) \
+        .appName("Similar users benchmark") \
+        .config("spark.driver.memory", "8g") \
+        .getOrCreate()
+    listenbrainz_spark.context = listenbrainz_spark.session.sparkContext
+    listenbrainz_spark.context.setLogLevel("ERROR")
+
+    print(f"{'users':>8} {'playcounts':>11} {'implementation':>15} {'seconds':>9} {'pairs':>10} {'max diff':>10}")
+    for num_users in [int(x) for x in users.split(",")]:
+        playcounts = generate_playcounts(num_users, recordings_per_user)
+        playcounts_df = listenbrainz_spark.session.createDataFrame(playcounts).cache()
+        playcounts_df.count()
+
+        start = time.monotonic()
+        blocked = get_similar_users(playcounts_df, max_num_users).collect()
+        elapsed = time.monotonic() - start
+        print(f"{num_users:>8} {len(playcounts):>11} {'blocked':>15} {elapsed:>9.1f} {len(blocked):>10} {'':>10}")
+
+        if num_users <= dense_max_users:
+            start = time.monotonic()
+            dense = dense_similar_users(playcounts_df, max_num_users)
+            elapsed = time.monotonic() - start
+
+            blocked_scores = {(row.spark_user_id, row.other_spark_user_id): row.similarity for row in blocked}
+            common = [abs(blocked_scores[(x, y)] - value) for x, y, value in dense if (x, y) in blocked_scores]
+            max_diff = max(common, default=0.0)
+            print(f"{num_users:>8} {len(playcounts):>11} {'dense':>15} {elapsed:>9.1f} {len(dense):>10} {max_diff:>10.2e}")
+
+        playcounts_df.unpersist()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from unittest import mock
+
+import numpy as np
+
+import listenbrainz_spark
+from listenbrainz_spark.similarity.user import normalize_user_vectors, similar_users_for_block, get_similar_users
+from listenbrainz_spark.tests import SparkNewTestCase
+
+
+class SimilarUsersTestCase(SparkNewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(42)
+        # recordings x users, spark user ids start from 1 so user 0 has no listens
+        self.playcounts = np.zeros((40, 20))
+        mask = rng.random(self.playcounts.shape) < 0.3
+        self.playcounts[mask] = rng.integers(1, 20, mask.sum())
+        self.playcounts[:, 0] = 0
+        # a user with constant playcounts has an undefined correlation
+        self.playcounts[:, 7] = 3
+        self.playcounts = self.playcounts[self.playcounts.sum(axis=1) > 0]
+
+    def get_expected(self, max_num_users):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = np.corrcoef(self.playcounts, rowvar=False)
+        expected = {}
+        for x in range(correlation.shape[0]):
+            row = [
+                (y, correlation[x, y]) for y in range(correlation.shape[1])
+                if x != y and not np.isnan(correlation[x, y]) and correlation[x, y] >= 0
+            ]
+            row.sort(key=lambda item: item[1], reverse=True)
+            for y, value in row[:max_num_users]:
+                expected[(x, y)] = value
+        return expected
+
+    def get_vectors(self):
+        recordings, users = np.nonzero(self.playcounts)
+        # recording ids need not be contiguous
+        return normalize_user_vectors(users, recordings * 3 + 11, self.playcounts[recordings, users])
+
+    def assertSimilarUsers(self, similar_users, expected):
+        received = {(x, y): value for x, y, value in similar_users}
+        self.assertEqual(received.keys(), expected.keys())
+        for key, value in expected.items():
+            self.assertAlmostEqual(received[key], value, places=5)
+
+    def test_similar_users_for_block(self):
+        vectors = self.get_vectors()
+        similar_users = []
+        for start in range(0, 20, 6):
+            similar_users.extend(similar_users_for_block(vectors, start, min(start + 6, 20), 5))
+        self.assertSimilarUsers(similar_users, self.get_expected(5))
+
+        # most similar users first
+        for x in range(20):
+            scores = [value for user_id, _, value in similar_users if user_id == x]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_similar_users_for_block_dense(self):
+        # store the vectors of all recordings with at least 2 listeners in the dense matrix
+        with mock.patch("listenbrainz_spark.similarity.user.MIN_DENSE_LISTENERS", 2):
+            vectors = self.get_vectors()
+        self.assertGreater(vectors["dense"].shape[0], 0)
+        self.assertSimilarUsers(similar_users_for_block(vectors, 0, 20, 5), self.get_expected(5))
+
+    def test_get_similar_users(self):
+        recordings, users = np.nonzero(self.playcounts)
+        playcounts_df = listenbrainz_spark.session.createDataFrame(
+            [(int(u), int(r), float(self.playcounts[r, u])) for r, u in zip(recordings, users)],
+            ["spark_user_id", "recording_id", "playcount"]
+        )
+        similar_users = [tuple(row) for row in get_similar_users(playcounts_df, 3).collect()]
+        self.assertSimilarUsers(similar_users, self.get_expected(3))
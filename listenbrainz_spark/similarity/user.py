@@ -1,13 +1,10 @@
 import logging
-from operator import itemgetter
-import math
 from typing import List, Tuple
-from pyspark.sql.dataframe import DataFrame
-from numpy import ndarray
 
-from pyspark.mllib.linalg.distributed import CoordinateMatrix, MatrixEntry
-from pyspark.ml.stat import Correlation
+import numpy as np
+from pyspark.sql.dataframe import DataFrame
 from pyspark.sql.functions import struct, collect_list
+from pyspark.sql.types import StructType, StructField, IntegerType, DoubleType
 
 import listenbrainz_spark
 from listenbrainz_spark import SparkSessionNotInitializedException, utils, path
@@ -16,6 +13,17 @@ from listenbrainz_spark.exceptions import PathNotFoundException, FileNotFetchedE
 
 logger = logging.getLogger(__name__)
 
+# the maximum number of cells of the similarity matrix calculated at once by a task
+MAX_SIMILARITY_CELLS_PER_BLOCK = 20_000_000
+# the maximum number of playcount products expanded at once while calculating a block
+MAX_PRODUCTS_PER_CHUNK = 10_000_000
+# the maximum number of cells of the dense matrix of the vectors of the most listened recordings
+MAX_DENSE_CELLS = 25_000_000
+# the minimum number of listeners for a recording to be stored in the dense matrix
+MIN_DENSE_LISTENERS = 100
+# users whose playcount variance is below this fraction of their sum of squares are considered constant
+VARIANCE_TOLERANCE = 1e-12
+
 
 def create_messages(similar_users_df: DataFrame) -> dict:
     """
@@ -48,45 +56,188 @@ def create_messages(similar_users_df: DataFrame) -> dict:
     }
 
 
-def threshold_similar_users(matrix: ndarray, max_num_users: int) -> List[Tuple[int, int, float]]:
-    """ Determine the minimum and maximum values in the matriz, scale
-        the result to the range of [0.0 - 1.0] and limit each user to max of
-        max_num_users other users.
+def get_user_vectors(playcounts_df) -> dict:
+    """ Collect the playcounts into sparse user vectors normalized such that the pearson correlation of two users
+    can be calculated from the dot product of their vectors.
+
+    The correlation of users u and v over the n recordings in the dataset is
+
+        corr(u, v) = (S(u, v) - s(u) * s(v) / n) / (d(u) * d(v))
+
+    where S(u, v) is the dot product of the playcount vectors, s(u) is the sum of the playcounts of user u and
+    d(u) = sqrt(Q(u) - s(u)^2 / n) where Q(u) is the sum of the squares of the playcounts. Dividing each playcount
+    of u by d(u) and letting z(u) = s(u) / (d(u) * sqrt(n)), this becomes y(u) . y(v) - z(u) * z(v). As all
+    playcounts are positive, users who have not listened to any common recording always have a negative
+    correlation, so only the sparse dot products of the normalized vectors y need to be calculated.
+
+    Users whose playcounts do not vary have an undefined correlation with everyone and are excluded.
+
+    Returns:
+        a dict of numpy arrays: the normalized vectors of the most listened recordings as a dense recordings x
+        users matrix, those of the other recordings in both user major (user_indptr, user_recordings, user_values)
+        and recording major (recording_indptr, recording_users, recording_values) compressed sparse form, z and
+        valid, a boolean mask of the users included.
     """
-    rows, cols = matrix.shape
-    similar_users = list()
-
-    for x in range(rows):
-        row = []
-        for y in range(cols):
-            value = float(matrix[x, y])
-            if x == y or math.isnan(value) or value < 0:
-                continue
-            row.append((x, y, value))
-        similar_users.extend(sorted(row, key=itemgetter(2), reverse=True)[:max_num_users])
+    playcounts = playcounts_df.select("spark_user_id", "recording_id", "playcount").toPandas()
+    return normalize_user_vectors(
+        playcounts["spark_user_id"].to_numpy(np.int64),
+        playcounts["recording_id"].to_numpy(np.int64),
+        playcounts["playcount"].to_numpy(np.float64)
+    )
 
-    return similar_users
+
+def normalize_user_vectors(users: np.ndarray, recording_ids: np.ndarray, values: np.ndarray) -> dict:
+    """ Build the normalized user vectors described in get_user_vectors from the coordinates of the playcounts. """
+    # recording ids need not be contiguous, map them to 0..n-1
+    recording_ids, recordings = np.unique(recording_ids, return_inverse=True)
+    num_recordings = len(recording_ids)
+    num_users = int(users.max()) + 1 if len(users) else 0
+
+    sums = np.bincount(users, weights=values, minlength=num_users)
+    squares = np.bincount(users, weights=values * values, minlength=num_users)
+    variances = squares - sums * sums / max(num_recordings, 1)
+    # guard against floating point noise for users with constant playcounts
+    valid = variances > VARIANCE_TOLERANCE * np.maximum(squares, 1.0)
+    inv_deviations = np.zeros(num_users)
+    inv_deviations[valid] = 1.0 / np.sqrt(variances[valid])
+    z = sums * inv_deviations / np.sqrt(max(num_recordings, 1))
+
+    included = valid[users]
+    users, recordings = users[included], recordings[included]
+    values = values[included] * inv_deviations[users]
+
+    # the number of products of a recording grows with the square of its listeners, so the vectors of the most
+    # listened recordings are kept as a dense matrix and multiplied using BLAS instead.
+    listeners = np.bincount(recordings, minlength=num_recordings)
+    max_dense_recordings = MAX_DENSE_CELLS // max(num_users, 1)
+    popular = np.argsort(-listeners, kind="stable")[:max_dense_recordings]
+    popular = popular[listeners[popular] >= MIN_DENSE_LISTENERS]
+    dense_index = np.full(num_recordings, -1)
+    dense_index[popular] = np.arange(len(popular))
+
+    is_dense = dense_index[recordings] >= 0
+    dense = np.zeros((len(popular), num_users), dtype=np.float32)
+    dense[dense_index[recordings[is_dense]], users[is_dense]] = values[is_dense]
+    users, recordings, values = users[~is_dense], recordings[~is_dense], values[~is_dense]
+
+    by_user = np.lexsort((recordings, users))
+    by_recording = np.lexsort((users, recordings))
+    return {
+        "dense": dense,
+        "user_indptr": np.concatenate(([0], np.cumsum(np.bincount(users, minlength=num_users)))),
+        "user_recordings": recordings[by_user],
+        "user_values": values[by_user],
+        "recording_indptr": np.concatenate(([0], np.cumsum(np.bincount(recordings, minlength=num_recordings)))),
+        "recording_users": users[by_recording],
+        "recording_values": values[by_recording],
+        "z": z,
+        "valid": valid,
+    }
 
 
-def get_vectors_df(playcounts_df):
+def similar_users_for_block(vectors: dict, start: int, end: int, max_num_users: int) -> List[Tuple[int, int, float]]:
+    """ Calculate the top max_num_users most similar users, with a non-negative correlation, of the users with
+    spark_user_id in [start, end) using the normalized vectors returned by get_user_vectors.
+
+    The dot products of the block's users with all other users are accumulated into a dense block of the
+    similarity matrix, expanding the products of the less listened recordings in common in bounded chunks
+    and adding the matrix product of the dense vectors of the popular recordings.
+
+    Returns:
+        a list of (spark_user_id, other_spark_user_id, similarity) tuples, most similar first for each user
     """
-    Each row of playcounts_df has the following columns: recording_id, spark_user_id and a play count denoting how many times
-    a user has played that recording. However, the correlation matrix requires a dataframe having a column of user
-    vectors. Spark has various representations built-in for storing sparse matrices. Of these, two are Coordinate
-    Matrix and Indexed Row Matrix. A coordinate matrix stores the matrix as tuples of (i, j, x) where matrix[i, j] = x.
-    An Indexed Row Matrix stores it as tuples of row index and vectors.
-
-    Our playcounts_df is similar in structure to a coordinate matrix. We begin with mapping each row of the
-    playcounts_df to a MatrixEntry and then create a matrix of these entries. The recording_ids are rows, user_ids are
-    columns and the playcounts are the values in the matrix. We convert the coordinate matrix to indexed row matrix
-    form. Spark ML and MLlib have different representations of vectors, hence we need to manually convert between the
-    two. Finally, we take the rows and create a dataframe from them.
+    user_indptr = vectors["user_indptr"]
+    recording_indptr = vectors["recording_indptr"]
+    recording_users = vectors["recording_users"]
+    recording_values = vectors["recording_values"]
+    z = vectors["z"]
+    valid = vectors["valid"]
+
+    num_users = len(z)
+    block_size = end - start
+    similarity = np.zeros(block_size * num_users)
+
+    lo, hi = user_indptr[start], user_indptr[end]
+    entry_users = np.repeat(np.arange(block_size), np.diff(user_indptr[start:end + 1]))
+    entry_recordings = vectors["user_recordings"][lo:hi]
+    entry_values = vectors["user_values"][lo:hi]
+    # every entry of the block is multiplied with the entries of all the listeners of its recording
+    counts = recording_indptr[entry_recordings + 1] - recording_indptr[entry_recordings]
+    total_products = np.cumsum(counts)
+    boundaries = [0]
+    if len(total_products):
+        splits = np.searchsorted(total_products, np.arange(MAX_PRODUCTS_PER_CHUNK, total_products[-1], MAX_PRODUCTS_PER_CHUNK))
+        boundaries.extend(int(x) + 1 for x in np.unique(splits))
+    boundaries.append(len(counts))
+
+    for chunk_start, chunk_end in zip(boundaries, boundaries[1:]):
+        if chunk_start >= chunk_end:
+            continue
+        chunk_counts = counts[chunk_start:chunk_end]
+        num_products = int(chunk_counts.sum())
+        offsets = np.arange(num_products) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        positions = np.repeat(recording_indptr[entry_recordings[chunk_start:chunk_end]], chunk_counts) + offsets
+        rows = np.repeat(entry_users[chunk_start:chunk_end], chunk_counts)
+        weights = np.repeat(entry_values[chunk_start:chunk_end], chunk_counts) * recording_values[positions]
+        similarity += np.bincount(
+            rows * num_users + recording_users[positions],
+            weights=weights,
+            minlength=block_size * num_users
+        )
+
+    dense = vectors["dense"]
+    similarity = similarity.reshape(block_size, num_users) + dense[:, start:end].T @ dense
+    similarity -= np.outer(z[start:end], z)
+    similarity[:, ~valid] = -np.inf
+    similarity[np.arange(block_size), np.arange(start, end)] = -np.inf
+
+    k = min(max_num_users, num_users)
+    if k <= 0:
+        return []
+    candidates = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+
+    similar_users = []
+    for row in range(block_size):
+        if not valid[start + row]:
+            continue
+        others = candidates[row]
+        scores = similarity[row, others]
+        order = np.argsort(-scores, kind="stable")
+        for other, score in zip(others[order], scores[order]):
+            if score < 0:
+                break
+            similar_users.append((start + row, int(other), float(score)))
+    return similar_users
+
+
+def get_similar_users(playcounts_df, max_num_users: int) -> DataFrame:
+    """ Calculate the top max_num_users similar users of each user in the playcounts dataframe.
+
+    The normalized user vectors are broadcast to the executors and each task calculates a block of rows of
+    the similarity matrix, so the memory used per task is bounded by MAX_SIMILARITY_CELLS_PER_BLOCK and the full
+    matrix is never materialized.
+
+    Returns:
+        a dataframe with spark_user_id, other_spark_user_id and similarity columns
     """
-    tuple_mapped_rdd = playcounts_df.rdd.map(lambda x: MatrixEntry(x["recording_id"], x["spark_user_id"], x["playcount"]))
-    coordinate_matrix = CoordinateMatrix(tuple_mapped_rdd)
-    indexed_row_matrix = coordinate_matrix.toIndexedRowMatrix()
-    vectors_mapped_rdd = indexed_row_matrix.rows.map(lambda r: (r.index, r.vector.asML()))
-    return listenbrainz_spark.session.createDataFrame(vectors_mapped_rdd, ['index', 'vector'])
+    vectors = get_user_vectors(playcounts_df)
+    num_users = len(vectors["z"])
+    block_size = max(1, MAX_SIMILARITY_CELLS_PER_BLOCK // max(num_users, 1))
+    blocks = [(start, min(start + block_size, num_users)) for start in range(0, num_users, block_size)]
+
+    schema = StructType([
+        StructField("spark_user_id", IntegerType(), nullable=False),
+        StructField("other_spark_user_id", IntegerType(), nullable=False),
+        StructField("similarity", DoubleType(), nullable=False),
+    ])
+    if not blocks:
+        return listenbrainz_spark.session.createDataFrame([], schema)
+
+    broadcast_vectors = listenbrainz_spark.context.broadcast(vectors)
+    similar_users_rdd = listenbrainz_spark.context \
+        .parallelize(blocks, len(blocks)) \
+        .flatMap(lambda block: similar_users_for_block(broadcast_vectors.value, block[0], block[1], max_num_users))
+    return listenbrainz_spark.session.createDataFrame(similar_users_rdd, schema)
 
 
 def get_similar_users_df(max_num_users: int):
@@ -107,10 +258,7 @@ def get_similar_users_df(max_num_users: int):
         logger.error(str(err), exc_info=True)
         raise
 
-    vectors_df = get_vectors_df(playcounts_df)
-
-    similarity_matrix = Correlation.corr(vectors_df, 'vector', 'pearson').first()['pearson(vector)'].toArray()
-    similar_users = threshold_similar_users(similarity_matrix, max_num_users)
+    similar_users_df = get_similar_users(playcounts_df, max_num_users)
 
     # Due to an unresolved bug in Spark (https://issues.apache.org/jira/browse/SPARK-10925), we cannot join twice on
     # the same dataframe. Hence, we create a modified dataframe with the columns renamed.
@@ -118,10 +266,7 @@ def get_similar_users_df(max_num_users: int):
         .withColumnRenamed('spark_user_id', 'other_spark_user_id')\
         .withColumnRenamed('user_id', 'other_user_id')
 
-    similar_users_df = listenbrainz_spark.session.createDataFrame(
-        similar_users,
-        ['spark_user_id', 'other_spark_user_id', 'similarity']
-    )\
+    similar_users_df = similar_users_df\
         .join(users_df, 'spark_user_id', 'inner')\
         .join(other_users_df, 'other_spark_user_id', 'inner')\
         .select('user_id', struct('other_user_id', 'similarity').alias('similar_user'))\
@@ -1,6 +1,6 @@
 import json
 import logging
-from datetime import datetime
+from datetime import datetime, time
 from typing import Iterator, Optional, Dict, List
 
 from more_itertools import chunked
@@ -16,6 +16,7 @@ from listenbrainz_spark.path import RELEASE_METADATA_CACHE_DATAFRAME, ARTIST_COU
 from listenbrainz_spark.stats import get_dates_for_stats_range
 from listenbrainz_spark.stats.user import USERS_PER_MESSAGE
 from listenbrainz_spark.stats.user.artist import get_artists
+from listenbrainz_spark.stats.user.partials import entity_partials_map, get_listens_partials, aggregate_listens
 from listenbrainz_spark.stats.user.recording import get_recordings
 from listenbrainz_spark.stats.user.release import get_releases
 from listenbrainz_spark.stats.user.release_group import get_release_groups
@@ -76,7 +77,12 @@ def get_entity_stats_for_range(
     database: str = None
 ):
     """ Calculate entity stats for all users' listens between the start and the end datetime. """
-    listens_df = get_listens_from_dump(from_date, to_date)
+    if entity in entity_partials_map and from_date.time() == time.min:
+        listens_df = get_listens_partials(entity, from_date, to_date)
+    else:
+        listens_df = get_listens_from_dump(from_date, to_date)
+        if entity in entity_partials_map:
+            listens_df = aggregate_listens(listens_df, entity)
     table = f"user_{entity}_{stats_range}"
     listens_df.createOrReplaceTempView(table)
 
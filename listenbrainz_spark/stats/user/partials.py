@@ -0,0 +1,158 @@
+""" Per user, per day partial aggregates of the listens used to calculate user entity stats.
+
+The partials of an entity store the number of listens of each user on each day for every combination of the
+listen columns that the entity stats query groups by. Stats for a range are calculated by summing the partials
+of the days in the range instead of aggregating all listens in it again.
+
+The partials are kept in HDFS, partitioned by day, and each row records the listen file it was aggregated from.
+Each time the partials are used, the listen files imported since the last update are aggregated and appended. When
+a listen file that was aggregated earlier is gone or was rewritten, which happens when a new full dump is
+imported or the incremental dumps are compacted, the partials are rebuilt from all listens.
+"""
+import logging
+import os
+from datetime import datetime, time
+from typing import Dict
+
+from pyspark.sql import DataFrame, functions
+
+import listenbrainz_spark
+from listenbrainz_spark import config, hdfs_connection
+from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY, INCREMENTAL_DUMPS_SAVE_PATH, \
+    FULL_DUMP_SAVE_PATH, USER_ENTITY_PARTIALS_DIRECTORY
+from listenbrainz_spark.schema import listens_new_schema
+from listenbrainz_spark.utils import read_files_from_HDFS
+
+logger = logging.getLogger(__name__)
+
+# the listen columns that the stats query of each entity groups by. releases and release groups are calculated
+# from the same columns so they share the partials.
+partial_columns = {
+    "artists": ["artist_name", "artist_credit_mbids"],
+    "releases": ["release_name", "release_mbid", "artist_name", "artist_credit_mbids"],
+    "recordings": ["recording_name", "recording_mbid", "artist_name", "artist_credit_mbids", "release_name",
+                   "release_mbid"],
+}
+
+entity_partials_map = {
+    "artists": "artists",
+    "releases": "releases",
+    "release_groups": "releases",
+    "recordings": "recordings",
+}
+
+
+def get_listen_sources() -> Dict[str, str]:
+    """ Return the listen files currently imported in HDFS, as a dict of a source id to the path of the file.
+
+    The source id includes the modification time of the file because the files of a full dump are always named
+    the same.
+    """
+    sources = {}
+    # numbered files of a full dump imported before the listens were partitioned
+    if hdfs_connection.client.status(LISTENBRAINZ_NEW_DATA_DIRECTORY, strict=False):
+        for name, status in hdfs_connection.client.list(LISTENBRAINZ_NEW_DATA_DIRECTORY, status=True):
+            if status["type"] == "FILE" and name.endswith(".parquet"):
+                path = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, name)
+                sources[f"{path}@{status['modificationTime']}"] = path
+
+    for directory in [FULL_DUMP_SAVE_PATH, INCREMENTAL_DUMPS_SAVE_PATH]:
+        if not hdfs_connection.client.status(directory, strict=False):
+            continue
+        for (root, _), _, files in hdfs_connection.client.walk(directory, status=True):
+            for name, status in files:
+                if name.endswith(".parquet"):
+                    path = os.path.join(root, name)
+                    sources[f"{path}@{status['modificationTime']}"] = path
+    return sources
+
+
+def aggregate_listens(listens_df: DataFrame, entity: str, by_day: bool = False,
+                      by_source: bool = False) -> DataFrame:
+    """ Count the listens of each user for each combination of the columns used by the entity's stats, and
+    on each day if by_day is True and in each listen file if by_source is True. """
+    columns = ["user_id", *partial_columns[entity_partials_map[entity]]]
+    if by_day:
+        columns.append(functions.to_date("listened_at").alias("day"))
+    if by_source:
+        columns.append("source")
+    return listens_df.groupBy(*columns).agg(functions.count("*").alias("listen_count"))
+
+
+def read_sources(sources: Dict[str, str]) -> DataFrame:
+    """ Read the listens of the given listen files, adding the id of the file each listen was read from in the
+    source column. """
+    if not sources:
+        return listenbrainz_spark.session.createDataFrame([], listens_new_schema) \
+            .withColumn("source", functions.lit(None).cast("string"))
+
+    files_df = listenbrainz_spark.session.createDataFrame(
+        [(path, source) for source, path in sources.items()],
+        "path string, source string"
+    )
+    # input_file_name is the full uri of the file, strip the scheme and authority to match the path
+    file_path = functions.regexp_replace(functions.input_file_name(), r"^[a-z]+://[^/]*", "")
+    return listenbrainz_spark.sql_context.read \
+        .parquet(*[config.HDFS_CLUSTER_URI + path for path in sources.values()]) \
+        .select(*listens_new_schema.fieldNames(), file_path.alias("path")) \
+        .join(functions.broadcast(files_df), "path") \
+        .drop("path")
+
+
+def update_partials(partials: str):
+    """ Aggregate the listen files imported since the last update into the partials, or rebuild them entirely
+    if listen files aggregated earlier have been replaced or deleted.
+
+    The rows of the partials are aggregated per listen file and store the id of their file, so that the partials
+    and the listen files aggregated into them are updated in the same write. If a write fails, the listen files
+    it aggregated are not recorded either and are aggregated again on the next update.
+    """
+    partials_path = os.path.join(USER_ENTITY_PARTIALS_DIRECTORY, partials)
+    entity = next(entity for entity, name in entity_partials_map.items() if name == partials)
+
+    current = get_listen_sources()
+    if hdfs_connection.client.status(partials_path, strict=False):
+        sources_df = read_files_from_HDFS(partials_path).select("source").distinct()
+        aggregated = {row.source for row in sources_df.collect()}
+    else:
+        aggregated = None
+
+    if aggregated is None or not aggregated.issubset(current.keys()):
+        logger.info("Rebuilding %s user entity partials from all listens", partials)
+        new_sources = current
+        mode = "overwrite"
+    else:
+        new_sources = {source: path for source, path in current.items() if source not in aggregated}
+        if not new_sources:
+            return
+        logger.info("Aggregating %d new listen files into %s user entity partials", len(new_sources), partials)
+        mode = "append"
+
+    aggregate_listens(read_sources(new_sources), entity, by_day=True, by_source=True) \
+        .write \
+        .partitionBy("day") \
+        .mode(mode) \
+        .parquet(config.HDFS_CLUSTER_URI + partials_path)
+
+
+def get_listens_partials(entity: str, from_date: datetime, to_date: datetime) -> DataFrame:
+    """ Return the listens between from_date and to_date aggregated per user for the entity's stats, by merging
+    the partials of each day in the range.
+
+    from_date must be at the start of a day. The day of to_date is included unless to_date is at the start of
+    a day, in which case the range ends at the end of the previous day.
+    """
+    partials = entity_partials_map[entity]
+    update_partials(partials)
+
+    partials_path = os.path.join(USER_ENTITY_PARTIALS_DIRECTORY, partials)
+    partials_df = read_files_from_HDFS(partials_path) \
+        .where(functions.col("day") >= functions.lit(from_date.date()))
+    if to_date.time() == time.min:
+        partials_df = partials_df.where(functions.col("day") < functions.lit(to_date.date()))
+    else:
+        partials_df = partials_df.where(functions.col("day") <= functions.lit(to_date.date()))
+
+    return partials_df \
+        .groupBy("user_id", *partial_columns[partials]) \
+        .agg(functions.sum("listen_count").alias("listen_count"))
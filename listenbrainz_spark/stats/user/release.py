@@ -10,7 +10,7 @@ def get_releases(table: str, cache_tables: List[str], number_of_results: int):
     which belong to a particular release).
 
     Args:
-        table: name of the temporary table
+        table: name of the temporary table of listens aggregated per user with a listen_count column
         number_of_results: number of top results to keep per user.
 
     Returns:
@@ -37,6 +37,7 @@ def get_releases(table: str, cache_tables: List[str], number_of_results: int):
                  , rel.artists
                  , rel.caa_id
                  , rel.caa_release_mbid
+                 , l.listen_count
               FROM {table} l
          LEFT JOIN {cache_table} rel
                 ON rel.release_mbid = l.release_mbid
@@ -49,7 +50,7 @@ def get_releases(table: str, cache_tables: List[str], number_of_results: int):
                 , artists
                 , caa_id
                 , caa_release_mbid
-                , count(*) as listen_count
+                , sum(listen_count) as listen_count
               FROM gather_release_data
              WHERE release_name != ''
                AND release_name IS NOT NULL
@@ -10,7 +10,7 @@ def get_release_groups(table: str, cache_tables: List[str], number_of_results: i
     which belong to a particular release).
 
     Args:
-        table: name of the temporary table
+        table: name of the temporary table of listens aggregated per user with a listen_count column
         number_of_results: number of top results to keep per user.
 
     Returns:
@@ -40,6 +40,7 @@ def get_release_groups(table: str, cache_tables: List[str], number_of_results: i
                  , rg.artists
                  , rg.caa_id
                  , rg.caa_release_mbid
+                 , l.listen_count
               FROM {table} l
          LEFT JOIN {rel_cache_table} rel
                 ON rel.release_mbid = l.release_mbid
@@ -54,7 +55,7 @@ def get_release_groups(table: str, cache_tables: List[str], number_of_results: i
                  , caa_id
                  , caa_release_mbid
                  , artists
-                 , count(*) as listen_count
+                 , sum(listen_count) as listen_count
               FROM gather_release_data
              WHERE release_group_name != ''
                AND release_group_name IS NOT NULL
@@ -0,0 +1,62 @@
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+from listenbrainz_spark.constants import LAST_FM_FOUNDING_YEAR
+from listenbrainz_spark.path import USER_ENTITY_PARTIALS_DIRECTORY
+from listenbrainz_spark.stats.user.partials import get_listens_partials, aggregate_listens, get_listen_sources, \
+    update_partials
+from listenbrainz_spark.stats.user.tests import StatsTestCase
+from listenbrainz_spark.utils import get_listens_from_dump, read_files_from_HDFS
+
+
+class UserEntityPartialsTestCase(StatsTestCase):
+
+    @staticmethod
+    def collect(df):
+        return sorted((tuple(row) for row in df.collect()), key=repr)
+
+    @staticmethod
+    def get_partials_sources(partials):
+        partials_path = os.path.join(USER_ENTITY_PARTIALS_DIRECTORY, partials)
+        return {row.source for row in read_files_from_HDFS(partials_path).select("source").distinct().collect()}
+
+    def assertPartialsEqualListens(self, entity, from_date, to_date):
+        expected = aggregate_listens(get_listens_from_dump(from_date, to_date), entity)
+        received = get_listens_partials(entity, from_date, to_date)
+        self.assertListEqual(self.collect(expected), self.collect(received))
+
+    def test_get_listens_partials(self):
+        from_date = datetime(LAST_FM_FOUNDING_YEAR, 1, 1)
+        to_date = datetime(2021, 8, 9, 12, 22, 43)
+        for entity in ["artists", "releases", "recordings"]:
+            self.assertPartialsEqualListens(entity, from_date, to_date)
+
+        # the partials are only built once, ranges are calculated from the same partials
+        sources = self.get_partials_sources("artists")
+        self.assertSetEqual(sources, set(get_listen_sources().keys()))
+        self.assertPartialsEqualListens("artists", datetime(2021, 8, 2), datetime(2021, 8, 9))
+        self.assertSetEqual(self.get_partials_sources("artists"), sources)
+
+        # only the newly imported incremental dump is aggregated and appended
+        inc_dump_tar = self.create_temp_listens_tar("incremental-dump-1")
+        self.uploader.upload_new_listens_incremental_dump(inc_dump_tar.name)
+        self.assertPartialsEqualListens("artists", from_date, to_date)
+        self.assertGreater(self.get_partials_sources("artists"), sources)
+
+    @patch("listenbrainz_spark.stats.user.partials.aggregate_listens")
+    def test_failed_update_is_retried(self, mock_aggregate):
+        """ Test that the listen files of a failed update are aggregated on the next update, and only once """
+        from_date = datetime(LAST_FM_FOUNDING_YEAR, 1, 1)
+        to_date = datetime(2021, 8, 9, 12, 22, 43)
+        mock_aggregate.side_effect = aggregate_listens
+        self.assertPartialsEqualListens("artists", from_date, to_date)
+
+        inc_dump_tar = self.create_temp_listens_tar("incremental-dump-1")
+        self.uploader.upload_new_listens_incremental_dump(inc_dump_tar.name)
+        mock_aggregate.side_effect = Exception("write failed")
+        with self.assertRaises(Exception):
+            update_partials("artists")
+
+        mock_aggregate.side_effect = aggregate_listens
+        self.assertPartialsEqualListens("artists", from_date, to_date)
@@ -2,7 +2,7 @@ import errno
 import logging
 import os
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from py4j.protocol import Py4JJavaError
 from pyspark.sql import DataFrame, functions
@@ -18,7 +18,7 @@ from listenbrainz_spark.exceptions import (DataFrameNotAppendedException,
                                            HDFSDirectoryNotDeletedException,
                                            PathNotFoundException,
                                            ViewNotRegisteredException)
-from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY, INCREMENTAL_DUMPS_SAVE_PATH
+from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY, INCREMENTAL_DUMPS_SAVE_PATH, FULL_DUMP_SAVE_PATH
 from listenbrainz_spark.schema import listens_new_schema
 
 logger = logging.getLogger(__name__)
@@ -93,12 +93,73 @@ def register_dataframe(df, table_name):
         raise ViewNotRegisteredException(err.java_exception, table_name)
 
 
+class SharedDataFrames:
+    """ Dataframes shared by the queries of a request batch.
+
+    While enabled, the first query that loads some listens or metadata persists the dataframe and the later
+    queries that load the same data reuse it, until it is released. Outside of batches it is disabled and
+    the data is loaded afresh every time.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, load):
+        """ Return the value stored for the key, calling load to create it if it hasn't been loaded yet.
+
+            Args:
+                key: a tuple whose first element is the kind of the value, used to release values selectively
+                load: function without arguments which loads the value
+        """
+        if not self.enabled:
+            return load()
+        if key in self.values:
+            self.hits += 1
+            return self.values[key]
+        self.misses += 1
+        value = load()
+        if isinstance(value, DataFrame):
+            value = value.persist()
+        self.values[key] = value
+        return value
+
+    def release(self, kind: str = None):
+        """ Unpersist and forget the values of the given kind, or all values if no kind is specified. """
+        for key in list(self.values):
+            if kind is None or key[0] == kind:
+                value = self.values.pop(key)
+                if isinstance(value, DataFrame):
+                    value.unpersist()
+
+
+shared_dataframes = SharedDataFrames()
+
+# metadata dataframes imported from postgres, these only change when the metadata tables are imported again
+SHARED_DATAFRAME_PATHS = {
+    path.RELEASE_METADATA_CACHE_DATAFRAME,
+    path.RELEASE_GROUP_METADATA_CACHE_DATAFRAME,
+    path.ARTIST_COUNTRY_CODE_DATAFRAME,
+    path.RECORDING_LENGTH_DATAFRAME,
+    path.RECORDING_ARTIST_DATAFRAME,
+    path.ARTIST_CREDIT_MBID_DATAFRAME,
+}
+
+
 def read_files_from_HDFS(path):
     """ Loads the dataframe stored at the given path in HDFS.
 
         Args:
             path (str): An HDFS path.
     """
+    if path in SHARED_DATAFRAME_PATHS:
+        return shared_dataframes.get(("metadata", path), lambda: _read_files_from_HDFS(path))
+    return _read_files_from_HDFS(path)
+
+
+def _read_files_from_HDFS(path):
     # if we point spark to a directory, it will read each file in the directory as a
     # parquet file and return the dataframe. so if a non-parquet file in also present
     # in the same directory, we will get the not a parquet file error
@@ -111,6 +172,76 @@ def read_files_from_HDFS(path):
         raise FileNotFetchedException(err.java_exception, path)
 
 
+# listens are stored partitioned by these columns, derived from listened_at
+LISTEN_PARTITION_COLUMNS = ["year", "month"]
+# the listens of each month are spread by user over this many tasks and files, so that a busy month isn't
+# written by a single task
+LISTEN_PARTITION_BUCKETS = 8
+
+
+def partition_listens(df: DataFrame) -> DataFrame:
+    """ Add the partition columns to a dataframe of listens and group its rows by partition and user so that
+    each partition is written to a few large files, ordered by user_id to let parquet skip row groups when
+    reading the listens of specific users. """
+    bucket = functions.pmod(functions.hash("user_id"), functions.lit(LISTEN_PARTITION_BUCKETS))
+    return df \
+        .withColumn("year", functions.year("listened_at")) \
+        .withColumn("month", functions.month("listened_at")) \
+        .repartition(*LISTEN_PARTITION_COLUMNS, bucket) \
+        .sortWithinPartitions("user_id", "listened_at")
+
+
+def write_partitioned_listens(df: DataFrame, path: str, mode: str = "overwrite"):
+    """ Write a dataframe of listens to the given HDFS path partitioned by the year and month of listened_at. """
+    partition_listens(df) \
+        .write \
+        .partitionBy(*LISTEN_PARTITION_COLUMNS) \
+        .mode(mode) \
+        .parquet(config.HDFS_CLUSTER_URI + path)
+
+
+def get_listen_partitions(path: str) -> List[Tuple[int, int]]:
+    """ Return the (year, month) partitions of the partitioned listens stored at the given path, sorted. """
+    partitions = []
+    if not hdfs_connection.client.status(path, strict=False):
+        return partitions
+    for year_dir in hdfs_connection.client.list(path):
+        if not year_dir.startswith("year="):
+            continue
+        for month_dir in hdfs_connection.client.list(os.path.join(path, year_dir)):
+            if month_dir.startswith("month="):
+                partitions.append((int(year_dir[len("year="):]), int(month_dir[len("month="):])))
+    return sorted(partitions)
+
+
+def is_legacy_listens_layout() -> bool:
+    """ Whether the listens of the full dump are stored as numbered parquet files directly inside the listens
+    directory, as they were before the listens were partitioned. """
+    return bool(hdfs_connection.client.status(os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "0.parquet"), strict=False))
+
+
+def get_legacy_listen_files() -> List[str]:
+    """ Return the paths of the numbered parquet files of a full dump imported before the listens were
+    partitioned, oldest listens first. """
+    return [
+        os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, name)
+        for name in reversed(get_listen_files_list())
+        if name != "incremental.parquet"
+    ]
+
+
+def _read_listens(path: str, start: Optional[datetime], end: Optional[datetime]) -> DataFrame:
+    """ Read the listens stored at the path, skipping the partitions outside the range if they are partitioned. """
+    df = read_files_from_HDFS(path)
+    if "year" in df.columns and "month" in df.columns:
+        partition = functions.col("year") * 100 + functions.col("month")
+        if start:
+            df = df.where(partition >= start.year * 100 + start.month)
+        if end:
+            df = df.where(partition <= end.year * 100 + end.month)
+    return df.select(*listens_new_schema.fieldNames())
+
+
 def get_listen_files_list() -> List[str]:
     """ Get list of name of parquet files containing the listens.
     The list of file names is in order of newest to oldest listens.
@@ -155,18 +286,25 @@ def get_listens_from_dump(start: datetime = None, end: datetime = None) -> DataF
         Returns:
             dataframe of listens with listened_at between start and end
     """
+    return shared_dataframes.get(("listens", start, end), lambda: _load_listens_from_dump(start, end))
+
+
+def _load_listens_from_dump(start: Optional[datetime], end: Optional[datetime]) -> DataFrame:
     df = listenbrainz_spark.session.createDataFrame([], listens_new_schema)
 
-    # full dump directory always exists because the incremental dumps are stored in a nested dir inside it
-    # therefore to check existence of full dump, we instead need to check whether a parquet file of the full
-    # dump exists. since files are number from 0, we check for 0.parquet
-    full_dump_test_path = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "0.parquet")
-    if hdfs_connection.client.status(full_dump_test_path, strict=False):
-        full_df = read_files_from_HDFS(LISTENBRAINZ_NEW_DATA_DIRECTORY)
-        df = df.union(full_df)
+    # listens are stored partitioned by year and month, only the partitions overlapping the range are read.
+    # listens imported before the partitioning was introduced are numbered parquet files of the full dump in
+    # the listens directory, to check for those we check whether 0.parquet exists. those are read by path
+    # because the listens directory also contains the partitioned incremental dumps.
+    if is_legacy_listens_layout():
+        legacy_df = listenbrainz_spark.sql_context.read.parquet(
+            *[config.HDFS_CLUSTER_URI + file_path for file_path in get_legacy_listen_files()]
+        )
+        df = df.union(legacy_df.select(*listens_new_schema.fieldNames()))
+    elif hdfs_connection.client.status(FULL_DUMP_SAVE_PATH, strict=False):
+        df = df.union(_read_listens(FULL_DUMP_SAVE_PATH, start, end))
     if hdfs_connection.client.status(INCREMENTAL_DUMPS_SAVE_PATH, strict=False):
-        inc_df = read_files_from_HDFS(INCREMENTAL_DUMPS_SAVE_PATH)
-        df = df.union(inc_df)
+        df = df.union(_read_listens(INCREMENTAL_DUMPS_SAVE_PATH, start, end))
 
     if start:
         df = df.where(f"listened_at >= to_timestamp('{start}')")
@@ -180,10 +318,19 @@ def get_latest_listen_ts() -> datetime:
     """" Get the listened_at time of the latest listen present
      in the imported dumps
      """
-    latest_listen_file = get_listen_files_list()[0]
-    df = read_files_from_HDFS(
-        os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, latest_listen_file)
-    )
+    return shared_dataframes.get(("latest_listen_ts",), _load_latest_listen_ts)
+
+
+def _load_latest_listen_ts() -> datetime:
+    if is_legacy_listens_layout():
+        latest_listen_file = get_listen_files_list()[0]
+        df = read_files_from_HDFS(
+            os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, latest_listen_file)
+        )
+    else:
+        # only read the latest month for which listens are stored
+        year, month = max(get_listen_partitions(FULL_DUMP_SAVE_PATH) + get_listen_partitions(INCREMENTAL_DUMPS_SAVE_PATH))
+        df = _load_listens_from_dump(datetime(year, month, 1), None)
     return df \
         .select('listened_at') \
         .agg(functions.max('listened_at').alias('latest_listen_ts'))\
@@ -121,3 +121,23 @@ class UtilsTestCase(SparkNewTestCase):
         self.upload_test_listens()
         self.assertEqual(utils.get_latest_listen_ts(), datetime(2021, 8, 9, 12, 22, 43))
         self.delete_uploaded_listens()
+
+    def test_shared_dataframes(self):
+        self.upload_test_listens()
+        start, end = datetime(2021, 8, 1), datetime(2021, 8, 31)
+        try:
+            utils.shared_dataframes.enabled = True
+            hits = utils.shared_dataframes.hits
+            df = utils.get_listens_from_dump(start, end)
+            self.assertIs(utils.get_listens_from_dump(start, end), df)
+            self.assertTrue(df.is_cached)
+            self.assertIsNot(utils.get_listens_from_dump(start), df)
+            self.assertEqual(utils.shared_dataframes.hits, hits + 1)
+
+            utils.shared_dataframes.release("listens")
+            self.assertFalse(df.is_cached)
+            self.assertIsNot(utils.get_listens_from_dump(start, end), df)
+        finally:
+            utils.shared_dataframes.release()
+            utils.shared_dataframes.enabled = False
+            self.delete_uploaded_listens()
@@ -96,6 +96,12 @@ class MusicBrainzEntityMetadataCache(BulkInsertTable, ABC):
         with conn.cursor() as curs:
             curs.execute(query, (tuple(recording_mbids),))
 
+    def invalidate_cached_rows(self, recording_mbids: List[uuid.UUID]):
+        """Called after the rows for the given recording MBIDs have been updated and committed, subclasses
+        can override it to invalidate any copies of the rows cached outside the database.
+        """
+        pass
+
     def config_postgres_join_limit(self, curs):
         """
         Because of the size of query we need to hint to postgres that it should continue to
@@ -141,6 +147,7 @@ class MusicBrainzEntityMetadataCache(BulkInsertTable, ABC):
                         self.delete_rows(batch_recording_mbids)
                         insert_rows(lb_curs, self.table_name, rows)
                         conn.commit()
+                        self.invalidate_cached_rows(batch_recording_mbids)
                         log(f"{self.table_name} update: inserted %d rows. %.1f%%" % (count, 100 * count / total_rows))
                         rows = []
 
@@ -149,6 +156,7 @@ class MusicBrainzEntityMetadataCache(BulkInsertTable, ABC):
                     self.delete_rows(batch_recording_mbids)
                     insert_rows(lb_curs, self.table_name, rows)
                     conn.commit()
+                    self.invalidate_cached_rows(batch_recording_mbids)
 
         log(f"{self.table_name} update: inserted %d rows. %.1f%%" % (count, 100 * count / total_rows))
         log(f"{self.table_name} update: Done!")
@@ -1,8 +1,10 @@
 import uuid
+from typing import List
 
 import psycopg2
 import psycopg2.extras
 import ujson
+from brainzutils import cache
 
 import config
 from mapping.canonical_recording_release_redirect import CanonicalRecordingReleaseRedirect
@@ -12,6 +14,11 @@ from mapping.utils import log
 
 MB_METADATA_CACHE_TIMESTAMP_KEY = "mb_metadata_cache_last_update_timestamp"
 
+# prefix of the keys of the shaped recording metadata cached in redis by the listenbrainz webserver and the key
+# of their current version, keep in sync with listenbrainz/db/recording_metadata.py
+RECORDING_METADATA_CACHE_KEY_PREFIX = "recording_metadata."
+RECORDING_METADATA_CACHE_VERSION_KEY = "recording_metadata_version"
+
 
 class MusicBrainzMetadataCache(MusicBrainzEntityMetadataCache):
     """
@@ -596,6 +603,11 @@ class MusicBrainzMetadataCache(MusicBrainzEntityMetadataCache):
     def get_delete_rows_query(self):
         return f"DELETE FROM {self.table_name} WHERE recording_mbid IN %s"
 
+    def invalidate_cached_rows(self, recording_mbids: List[uuid.UUID]):
+        version = cache.get(RECORDING_METADATA_CACHE_VERSION_KEY, decode=False)
+        prefix = f"{RECORDING_METADATA_CACHE_KEY_PREFIX}{int(version) if version else 0}."
+        cache.delete_many([prefix + str(mbid) for mbid in recording_mbids])
+
 
 def create_mb_metadata_cache(use_lb_conn: bool):
     """
@@ -604,16 +616,20 @@ def create_mb_metadata_cache(use_lb_conn: bool):
         Arguments:
             use_lb_conn: whether to use LB conn or not
     """
+    cache.init(host=config.REDIS_HOST, port=config.REDIS_PORT, namespace=config.REDIS_NAMESPACE)
     create_metadata_cache(
         MusicBrainzMetadataCache,
         MB_METADATA_CACHE_TIMESTAMP_KEY,
         [CanonicalRecordingReleaseRedirect],
         use_lb_conn
     )
+    # every recording may have changed after the table swap, move the webserver to a new set of keys
+    cache.increment(RECORDING_METADATA_CACHE_VERSION_KEY)
 
 
 def incremental_update_mb_metadata_cache(use_lb_conn: bool):
     """ Update the MB metadata cache incrementally """
+    cache.init(host=config.REDIS_HOST, port=config.REDIS_PORT, namespace=config.REDIS_NAMESPACE)
     incremental_update_metadata_cache(MusicBrainzMetadataCache, MB_METADATA_CACHE_TIMESTAMP_KEY, use_lb_conn)
 
 